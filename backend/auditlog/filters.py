@@ -0,0 +1,48 @@
+import django_filters
+from django import forms
+from django.db import connections
+from django_filters.constants import EMPTY_VALUES
+
+from .models import AuditLog
+
+
+class PayloadKeyFilter(django_filters.CharFilter):
+    """
+    payload__<llave>=valor. En PostgreSQL se filtra por contención
+    (payload @> '{"llave": valor}'), que usa el índice GIN jsonb_path_ops;
+    en otros motores se compara la llave.
+    """
+    def __init__(self, key: str, *args, **kwargs):
+        self.key = key
+        super().__init__(*args, field_name="payload", **kwargs)
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        if connections[qs.db].vendor == "postgresql":
+            return qs.filter(payload__contains={self.key: value})
+        return qs.filter(**{f"payload__{self.key}": value})
+
+
+class PayloadIdFilter(PayloadKeyFilter):
+    # Los ids se guardan como números en el payload
+    field_class = forms.IntegerField
+
+
+class AuditLogFilter(django_filters.FilterSet):
+    # Rango sobre ts: en PostgreSQL solo se leen las particiones de esos meses
+    from_date = django_filters.DateTimeFilter(field_name="ts", lookup_expr="gte")
+    to_date = django_filters.DateTimeFilter(field_name="ts", lookup_expr="lte")
+    payload__badge_code = PayloadKeyFilter("badge_code")
+    payload__code_persistente = PayloadKeyFilter("code_persistente")
+    payload__case_id = PayloadIdFilter("case_id")
+    payload__citizen_id = PayloadIdFilter("citizen_id")
+    payload__topic_id = PayloadIdFilter("topic_id")
+
+    class Meta:
+        model = AuditLog
+        fields = [
+            "action", "entity", "user", "from_date", "to_date",
+            "payload__badge_code", "payload__code_persistente", "payload__case_id",
+            "payload__citizen_id", "payload__topic_id",
+        ]
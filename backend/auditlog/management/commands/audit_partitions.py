@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from auditlog.models import AuditLog
+from auditlog.partitions import (
+    create_upcoming, expire_partitions, is_partitioned, month_bound, monthly_partitions, retention_cutoff,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mantiene las particiones mensuales de la bitácora: crea los meses "
+        "siguientes y separa (o borra con --drop) los que salen de la retención. "
+        "Sin particiones (otros motores) solo aplica la retención borrando filas. "
+        "Idempotente: seguro para cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=None,
+                            help="Meses a crear por adelantado (por defecto AUDIT_PARTITION_AHEAD_MONTHS).")
+        parser.add_argument("--retention-months", type=int, default=None,
+                            help="Meses que se conservan, incluido el actual; 0 = sin retención "
+                                 "(por defecto AUDIT_RETENTION_MONTHS).")
+        parser.add_argument("--drop", action="store_true", help="Borra las particiones vencidas en lugar de separarlas.")
+        parser.add_argument("--dry-run", action="store_true", help="Solo muestra lo que se haría.")
+        parser.add_argument("--batch-size", type=int, default=10_000, help="Filas por DELETE sin particiones.")
+
+    def handle(self, *args, **options):
+        ahead = options["ahead"] if options["ahead"] is not None else getattr(settings, "AUDIT_PARTITION_AHEAD_MONTHS", 3)
+        keep = options["retention_months"]
+        if keep is None:
+            keep = getattr(settings, "AUDIT_RETENTION_MONTHS", 0)
+        dry_run = options["dry_run"]
+
+        if not is_partitioned():
+            self.stdout.write("La bitácora no está particionada (solo PostgreSQL): se omite la creación de meses.")
+            if keep > 0:
+                self._delete_expired(keep, options["batch_size"], dry_run)
+            return
+
+        if dry_run:
+            existing = monthly_partitions()
+            self.stdout.write(f"Particiones actuales: {len(existing)}")
+        else:
+            for name in create_upcoming(ahead):
+                self.stdout.write(f"Creada {name}")
+
+        if keep <= 0:
+            self.stdout.write(self.style.SUCCESS("Sin retención configurada."))
+            return
+        cutoff = retention_cutoff(keep)
+        if dry_run:
+            expired = [name for month, name in sorted(monthly_partitions().items()) if month < cutoff]
+            verb = "se borrarían" if options["drop"] else "se separarían"
+        else:
+            expired = expire_partitions(keep, drop=options["drop"])
+            verb = "borradas" if options["drop"] else "separadas"
+        for name in expired:
+            self.stdout.write(f"{name}: {verb}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Particiones {verb}: {len(expired)} (se conserva desde {cutoff:%Y-%m})"
+        ))
+
+    def _delete_expired(self, keep, batch_size, dry_run):
+        cutoff = retention_cutoff(keep)
+        expired = AuditLog.objects.filter(ts__lt=month_bound(cutoff))
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(f"Registros que se borrarían (antes de {cutoff:%Y-%m}): {expired.count()}"))
+            return
+        total = 0
+        while True:
+            ids = list(expired.order_by().values_list("id", flat=True)[:batch_size])
+            if not ids:
+                break
+            total += AuditLog.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Registros borrados (antes de {cutoff:%Y-%m}): {total}"))
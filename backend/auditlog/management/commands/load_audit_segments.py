@@ -0,0 +1,96 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from auditlog.models import AuditLog
+from auditlog.sinks import read_segment, segment_paths, segment_started
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Carga a la tabla AuditLog los segmentos JSONL de la bitácora "
+        "(JSONLFileSink, AUDIT_FILE_DIR) para una investigación. "
+        "Cargar dos veces el mismo segmento duplica los registros."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("segments", nargs="*", help="Nombres, globs o rutas de segmentos (por defecto todos).")
+        parser.add_argument("--dir", default=None, help="Directorio de segmentos (por defecto AUDIT_FILE_DIR).")
+        parser.add_argument("--from", dest="date_from", default=None, help="Solo registros desde esta fecha (YYYY-MM-DD).")
+        parser.add_argument("--to", dest="date_to", default=None, help="Solo registros hasta esta fecha inclusive (YYYY-MM-DD).")
+        parser.add_argument("--action", action="append", default=[], help="Solo estas acciones (repetible).")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Solo cuenta los registros que se cargarían.")
+
+    def _bound(self, value, name):
+        if value is None:
+            return None
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"--{name} inválido: {value} (use YYYY-MM-DD)")
+        return day
+
+    def handle(self, *args, **options):
+        directory = options["dir"] or getattr(settings, "AUDIT_FILE_DIR", settings.BASE_DIR / "audit")
+        tz = timezone.get_current_timezone()
+        day_from, day_to = self._bound(options["date_from"], "from"), self._bound(options["date_to"], "to")
+        start = timezone.make_aware(datetime.combine(day_from, time.min), tz) if day_from else None
+        end = timezone.make_aware(datetime.combine(day_to + timedelta(days=1), time.min), tz) if day_to else None
+        actions = set(options["action"])
+
+        paths = segment_paths(directory, options["segments"])
+        if end is not None:
+            # Un segmento que empezó después del rango no puede tener registros del rango
+            paths = [p for p in paths if (segment_started(p) or end) <= end]
+        if not paths:
+            self.stdout.write(self.style.WARNING("No hay segmentos que cargar."))
+            return
+
+        total = 0
+        for path in paths:
+            loaded = skipped = 0
+            batch = []
+            for record in read_segment(path):
+                if record is None:
+                    skipped += 1
+                    continue
+                ts = parse_datetime(record["ts"])
+                if (start and ts < start) or (end and ts >= end) or (actions and record["action"] not in actions):
+                    continue
+                batch.append(AuditLog(
+                    ts=ts,
+                    user_id=record.get("user_id"),
+                    action=record["action"],
+                    entity=record.get("entity", ""),
+                    entity_id=record.get("entity_id", ""),
+                    payload=record.get("payload"),
+                    ip=record.get("ip"),
+                ))
+                if len(batch) >= options["batch_size"]:
+                    loaded += self._save(batch, options["dry_run"])
+                    batch = []
+            loaded += self._save(batch, options["dry_run"])
+            total += loaded
+            note = f" ({skipped} línea(s) incompletas omitidas)" if skipped else ""
+            self.stdout.write(f"{path.name}: {loaded} registro(s){note}")
+
+        verb = "se cargarían" if options["dry_run"] else "cargados"
+        self.stdout.write(self.style.SUCCESS(f"Total {verb}: {total}"))
+
+    def _save(self, batch, dry_run) -> int:
+        if not batch or dry_run:
+            return len(batch)
+        # Usuarios eliminados desde que se escribió el segmento: el registro queda sin usuario
+        user_ids = {log.user_id for log in batch if log.user_id is not None}
+        existing = set(User.objects.filter(id__in=user_ids).values_list("id", flat=True)) if user_ids else set()
+        for log in batch:
+            if log.user_id not in existing:
+                log.user_id = None
+        AuditLog.objects.bulk_create(batch)
+        return len(batch)
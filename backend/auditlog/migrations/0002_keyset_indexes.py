@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-17 19:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditlog', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['ts', 'id'], name='auditlog_ts_id_idx'),
+        ),
+    ]
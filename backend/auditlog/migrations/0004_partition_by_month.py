@@ -0,0 +1,109 @@
+# Generated by Django 5.0.6 on 2026-10-17 20:40
+
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.db import migrations
+
+TABLE = "auditlog_auditlog"
+OLD = f"{TABLE}_old"
+SEQUENCE = f"{TABLE}_id_seq"
+# Meses creados por adelantado al migrar; después los crea manage.py audit_partitions
+AHEAD_MONTHS = 3
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _rebuild(schema_editor, partitioned: bool):
+    """
+    Recrea auditlog_auditlog (particionada por mes o normal) con las mismas
+    columnas, índices y llaves foráneas, y copia las filas.
+    """
+    execute = schema_editor.execute
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('p', 'f')",
+            [TABLE],
+        )
+        constraints = cursor.fetchall()
+        pk_name = next(name for name, kind, _ in constraints if kind == "p")
+        foreign_keys = [(name, definition) for name, kind, definition in constraints if kind == "f"]
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s",
+            [TABLE],
+        )
+        indexes = [(name, definition) for name, definition in cursor.fetchall() if name != pk_name]
+        cursor.execute(f"SELECT min(ts) FROM {TABLE}")
+        first = cursor.fetchone()[0]
+
+    # La tabla actual pasa a _old y libera los nombres de índices, llaves y secuencia
+    execute(f"ALTER TABLE {TABLE} RENAME TO {OLD}")
+    for name, _ in indexes:
+        execute(f'DROP INDEX "{name}"')
+    for name, _ in foreign_keys:
+        execute(f'ALTER TABLE {OLD} DROP CONSTRAINT "{name}"')
+    execute(f'ALTER TABLE {OLD} DROP CONSTRAINT "{pk_name}"')
+    execute(f"ALTER TABLE {OLD} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+    execute(f"ALTER TABLE {OLD} ALTER COLUMN id DROP DEFAULT")
+    execute(f"DROP SEQUENCE IF EXISTS {SEQUENCE}")
+
+    if partitioned:
+        # Antes de PostgreSQL 17 una tabla particionada no admite IDENTITY: secuencia propia
+        execute(f"CREATE TABLE {TABLE} (LIKE {OLD} INCLUDING DEFAULTS INCLUDING STORAGE) PARTITION BY RANGE (ts)")
+        execute(f"CREATE SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id")
+        execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCE}')")
+        execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT "{pk_name}" PRIMARY KEY (id, ts)')
+        execute(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+        # Un mes por cada uno con datos, hasta AHEAD_MONTHS después del actual (UTC)
+        today = datetime.now(dt_timezone.utc).date()
+        last = date(today.year, today.month, 1)
+        for _ in range(AHEAD_MONTHS):
+            last = _next_month(last)
+        start = first.date() if first else today
+        month = date(start.year, start.month, 1)
+        while month <= last:
+            following = _next_month(month)
+            execute(
+                f"CREATE TABLE {TABLE}_p{month:%Y_%m} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{following.isoformat()} 00:00:00+00')"
+            )
+            month = following
+    else:
+        execute(f"CREATE TABLE {TABLE} (LIKE {OLD} INCLUDING DEFAULTS INCLUDING STORAGE)")
+        execute(f"ALTER TABLE {TABLE} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY")
+        execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT "{pk_name}" PRIMARY KEY (id)')
+
+    for _, definition in indexes:
+        execute(definition)
+    for name, definition in foreign_keys:
+        execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT "{name}" {definition}')
+
+    execute(f"INSERT INTO {TABLE} SELECT * FROM {OLD}")
+    execute(f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), COALESCE((SELECT max(id) FROM {TABLE}), 0) + 1, false)")
+    # Si _old estaba particionada, sus particiones se borran con ella
+    execute(f"DROP TABLE {OLD}")
+
+
+def partition_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    _rebuild(schema_editor, partitioned=True)
+
+
+def unpartition_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    _rebuild(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditlog', '0003_auditlog_ts_event_time'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_table, unpartition_table),
+    ]
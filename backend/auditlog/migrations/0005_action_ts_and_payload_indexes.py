@@ -0,0 +1,41 @@
+# Generated by Django 5.0.6 on 2026-10-17 20:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_payload_index(apps, schema_editor):
+    # jsonb_path_ops: índice más chico que el GIN por defecto, solo para contención (@>)
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS auditlog_payload_gin "
+        "ON auditlog_auditlog USING gin (payload jsonb_path_ops)"
+    )
+
+
+def drop_payload_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS auditlog_payload_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditlog', '0004_partition_by_month'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['action', 'ts'], name='auditlog_action_ts_idx'),
+        ),
+        migrations.RunPython(create_payload_index, drop_payload_index),
+    ]
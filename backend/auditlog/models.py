@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -8,15 +9,22 @@ class AuditLog(models.Model):
     Bitácora mínima de acciones relevantes.
     """
     user = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name="audit_logs")
-    action = models.CharField(max_length=64, db_index=True)               # p.ej. 'login', 'user_created', 'case_created', 'visit_checkin', 'visit_checkout', 'report_download'
+    action = models.CharField(max_length=64)                              # p.ej. 'login', 'user_created', 'case_created', 'visit_checkin', 'visit_checkout', 'report_download'
     entity = models.CharField(max_length=64, blank=True, default="", db_index=True)  # p.ej. 'User', 'VisitCase', 'Visit', 'Report'
     entity_id = models.CharField(max_length=64, blank=True, default="", db_index=True)
     payload = models.JSONField(null=True, blank=True)                      # datos útiles (no sensibles)
     ip = models.GenericIPAddressField(null=True, blank=True)
-    ts = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Hora del evento (no del INSERT): la escritura puede ser diferida o cargada de un segmento
+    ts = models.DateTimeField(default=timezone.now, editable=False, db_index=True)
 
     class Meta:
         ordering = ["-ts"]
+        indexes = [
+            models.Index(fields=["ts", "id"], name="auditlog_ts_id_idx"),
+            # "acción X en un rango de fechas"; también cubre el filtro por action solo
+            models.Index(fields=["action", "ts"], name="auditlog_action_ts_idx"),
+        ]
+        # En PostgreSQL además: GIN (payload jsonb_path_ops) para los filtros payload__* (migración 0005)
         verbose_name = "Registro de bitácora"
         verbose_name_plural = "Bitácora"
 
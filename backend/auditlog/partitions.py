@@ -0,0 +1,177 @@
+"""
+Particiones mensuales de la bitácora (solo PostgreSQL).
+
+La migración 0004 convierte auditlog_auditlog en una tabla particionada por
+rango de ts: una partición por mes (UTC) llamada auditlog_auditlog_pAAAA_MM y
+una partición DEFAULT para lo que caiga en un mes aún no creado. PostgreSQL
+exige la columna de partición en la llave primaria, así que en la BD es
+(id, ts); para Django la llave sigue siendo id (secuencia única).
+
+manage.py audit_partitions (cron diario):
+- crea los meses siguientes (AUDIT_PARTITION_AHEAD_MONTHS);
+- separa (DETACH) los meses fuera de AUDIT_RETENTION_MONTHS, o los borra con
+  --drop. Una partición separada queda como tabla suelta para respaldarla
+  (pg_dump) y borrarla a mano; las filas de esos meses que estaban en la
+  DEFAULT pasan a una tabla suelta del mismo nombre.
+
+Las consultas filtradas por ts (from_date/to_date en la API) solo leen las
+particiones del rango.
+"""
+import re
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection as default_connection, transaction
+from django.utils import timezone
+
+TABLE = "auditlog_auditlog"
+DEFAULT_PARTITION = f"{TABLE}_default"
+PARTITION_RE = re.compile(rf"^{TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bound(month: date) -> datetime:
+    return datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+def _set_lock_timeout(cursor):
+    # Solo para la transacción actual: si un export u otra sesión retiene la
+    # tabla, el DDL falla en lugar de quedar en cola frenando lecturas y escrituras
+    timeout = int(getattr(settings, "AUDIT_PARTITION_LOCK_TIMEOUT_MS", 5000))
+    cursor.execute(f"SET LOCAL lock_timeout = {timeout}")
+
+
+def is_partitioned(connection=default_connection) -> bool:
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def monthly_partitions(connection=default_connection) -> dict:
+    """
+    {primer día del mes: nombre} de las particiones adjuntas.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = %s AND pg_table_is_visible(parent.oid)",
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    out = {}
+    for name in names:
+        match = PARTITION_RE.match(name)
+        if match:
+            out[date(int(match[1]), int(match[2]), 1)] = name
+    return out
+
+
+def create_partition(month: date, connection=default_connection) -> bool:
+    """
+    Crea la partición del mes (False si ya existía). Si la DEFAULT ya recibió
+    filas de ese mes, se mueven a la partición nueva.
+
+    Siempre se crea como tabla suelta y se adjunta con ATTACH PARTITION, que
+    sobre la tabla padre solo pide SHARE UPDATE EXCLUSIVE (CREATE TABLE ...
+    PARTITION OF pide ACCESS EXCLUSIVE y detiene toda la bitácora). Los
+    bloqueos se toman en el mismo orden que un INSERT (padre y luego DEFAULT)
+    para no cruzarse con él.
+    """
+    if month in monthly_partitions(connection):
+        return False
+    qn = connection.ops.quote_name
+    table, default, name = qn(TABLE), qn(DEFAULT_PARTITION), qn(partition_name(month))
+    bounds = [month_bound(month), month_bound(add_months(month, 1))]
+    # Los límites van como literales: DDL no admite parámetros
+    values = "FOR VALUES FROM ('{}') TO ('{}')".format(*(b.isoformat() for b in bounds))
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        _set_lock_timeout(cursor)
+        cursor.execute(f"LOCK TABLE {table} IN SHARE UPDATE EXCLUSIVE MODE")
+        # ATTACH revisa la DEFAULT con ACCESS EXCLUSIVE: se pide desde el inicio
+        # (sin escalar el bloqueo) y así no entran filas del mes mientras se mueven
+        cursor.execute(f"LOCK TABLE {default} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING STORAGE)")
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {default} WHERE ts >= %s AND ts < %s RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved",
+            bounds,
+        )
+        cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {name} {values}")
+    return True
+
+
+def create_upcoming(ahead: int, today=None, connection=default_connection) -> list[str]:
+    """
+    Asegura las particiones del mes actual y de los `ahead` siguientes.
+    """
+    current = month_start(today or timezone.now())
+    months = [add_months(current, i) for i in range(ahead + 1)]
+    return [partition_name(m) for m in months if create_partition(m, connection)]
+
+
+def retention_cutoff(keep_months: int, today=None) -> date:
+    """
+    Primer mes que se conserva: el actual y los keep_months - 1 anteriores.
+    """
+    return add_months(month_start(today or timezone.now()), -(keep_months - 1))
+
+
+def expire_partitions(keep_months: int, drop: bool = False, today=None, connection=default_connection) -> list[str]:
+    """
+    Separa (o borra, con drop) las particiones anteriores a la retención.
+    Las filas de esos meses que quedaron en la DEFAULT (meses sin partición)
+    se mueven a una tabla suelta del mes al separar, o se borran con drop.
+    """
+    cutoff = month_bound(retention_cutoff(keep_months, today))
+    qn = connection.ops.quote_name
+    table, default = qn(TABLE), qn(DEFAULT_PARTITION)
+    expired = []
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        _set_lock_timeout(cursor)
+        for month, name in sorted(monthly_partitions(connection).items()):
+            if month_bound(month) >= cutoff:
+                break
+            if drop:
+                cursor.execute(f"DROP TABLE {qn(name)}")
+            else:
+                cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {qn(name)}")
+            expired.append(name)
+
+        if drop:
+            cursor.execute(f"DELETE FROM {default} WHERE ts < %s", [cutoff])
+            return expired
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', ts AT TIME ZONE 'UTC') FROM {default} WHERE ts < %s",
+            [cutoff],
+        )
+        for (month,) in sorted(cursor.fetchall()):
+            month = month_start(month)
+            name = partition_name(month)
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {qn(name)} (LIKE {table} INCLUDING DEFAULTS INCLUDING STORAGE)")
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {default} WHERE ts >= %s AND ts < %s RETURNING *) "
+                f"INSERT INTO {qn(name)} SELECT * FROM moved",
+                [month_bound(month), month_bound(add_months(month, 1))],
+            )
+            expired.append(name)
+    return expired
@@ -1,4 +1,4 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from visits.models import VisitCase, Visit
@@ -6,6 +6,8 @@ from .utils import log_action
 
 User = get_user_model()
 
+_UNKNOWN = object()
+
 @receiver(post_save, sender=User)
 def audit_user_created(sender, instance: User, created, **kwargs):
     if created:
@@ -28,8 +30,22 @@ def audit_case_created(sender, instance: VisitCase, created, **kwargs):
             payload={"code_persistente": instance.code_persistente, "citizen_id": instance.citizen_id, "topic_id": instance.topic_id},
         )
 
+@receiver(post_init, sender=Visit)
+def remember_visit_checkout(sender, instance: Visit, **kwargs):
+    # checkout_at con que se cargó (o creó) la visita; sin tocar campos diferidos
+    instance._loaded_checkout_at = instance.__dict__.get("checkout_at", _UNKNOWN)
+
 @receiver(post_save, sender=Visit)
-def audit_visit_saved(sender, instance: Visit, created, **kwargs):
+def audit_visit_saved(sender, instance: Visit, created, update_fields=None, **kwargs):
+    """
+    Check-in y check-out por el ORM fuera de visits/services.py (admin, shell).
+    Los servicios registran su propia bitácora con usuario e IP y marcan las
+    instancias con _audit_logged para no duplicarla.
+    """
+    previous = getattr(instance, "_loaded_checkout_at", _UNKNOWN)
+    instance._loaded_checkout_at = instance.checkout_at
+    if getattr(instance, "_audit_logged", False):
+        return
     if created:
         # Check-in
         log_action(
@@ -39,13 +55,16 @@ def audit_visit_saved(sender, instance: Visit, created, **kwargs):
             entity_id=str(instance.id),
             payload={"badge_code": instance.badge_code, "case_id": instance.case_id},
         )
-    else:
-        # Si tiene checkout, registramos check-out
-        if instance.checkout_at:
-            log_action(
-                user=None,  # lo registraremos también desde la vista con el usuario e IP (doble capa)
-                action="visit_checkout",
-                entity="Visit",
-                entity_id=str(instance.id),
-                payload={"badge_code": instance.badge_code, "case_id": instance.case_id},
-            )
+        return
+    if not instance.checkout_at or (update_fields is not None and "checkout_at" not in update_fields):
+        return
+    # Solo la transición de NULL a una hora: editar una visita cerrada no es otra salida.
+    # Si checkout_at no se cargó (diferido) solo cuenta un guardado explícito de ese campo.
+    if previous is None or (previous is _UNKNOWN and update_fields is not None):
+        log_action(
+            user=None,
+            action="visit_checkout",
+            entity="Visit",
+            entity_id=str(instance.id),
+            payload={"badge_code": instance.badge_code, "case_id": instance.case_id},
+        )
@@ -0,0 +1,210 @@
+"""
+Destinos de la bitácora. audit_writer (auditlog/writer.py) entrega cada lote
+a dispatch(), que lo pasa a cada sink de AUDIT_SINKS (rutas con punto):
+
+    AUDIT_SINKS=auditlog.sinks.DatabaseSink                  tabla AuditLog (por defecto)
+    AUDIT_SINKS=auditlog.sinks.JSONLFileSink                 solo archivos
+    AUDIT_SINKS=auditlog.sinks.DatabaseSink,auditlog.sinks.JSONLFileSink
+
+Un sink es cualquier clase con write(logs) y close(); recibe instancias de
+AuditLog sin guardar. El fallo de un sink no afecta a los demás.
+
+JSONLFileSink escribe una línea JSON por registro, solo agregando, en
+AUDIT_FILE_DIR. Cada proceso tiene su propio segmento
+(audit-<inicio>-<host>-<pid>-<n>.jsonl); al pasar AUDIT_FILE_MAX_MB o
+AUDIT_FILE_ROTATE_SECONDS se cierra, se comprime a .jsonl.gz y se abre otro.
+Los segmentos se cargan a la tabla con manage.py load_audit_segments.
+"""
+import atexit
+import gzip
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+import orjson
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "audit-"
+SEGMENT_SUFFIX = ".jsonl"
+SEGMENT_TS_FORMAT = "%Y%m%dT%H%M%S"
+
+
+def log_record(log) -> dict:
+    """
+    AuditLog -> dict de una línea del segmento (y de vuelta con AuditLog(**record)).
+    """
+    return {
+        "ts": log.ts,
+        "user_id": log.user_id,
+        "action": log.action,
+        "entity": log.entity,
+        "entity_id": log.entity_id,
+        "payload": log.payload,
+        "ip": log.ip,
+    }
+
+
+class DatabaseSink:
+    def write(self, logs: list):
+        from .models import AuditLog
+
+        AuditLog.objects.bulk_create(logs)
+
+    def close(self):
+        pass
+
+
+class JSONLFileSink:
+    def __init__(self, directory=None, *, max_bytes: int | None = None, rotate_seconds: float | None = None):
+        self.directory = Path(directory or getattr(settings, "AUDIT_FILE_DIR", settings.BASE_DIR / "audit"))
+        self.max_bytes = max_bytes or int(getattr(settings, "AUDIT_FILE_MAX_MB", 64) * 1024 * 1024)
+        self.rotate_seconds = rotate_seconds or getattr(settings, "AUDIT_FILE_ROTATE_SECONDS", 3600)
+        self._lock = threading.Lock()
+        self._stream = None
+        self._path = None
+        self._opened = 0.0
+        self._pid = None
+        self._seq = 0
+
+    def _open(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        started = datetime.now(dt_timezone.utc)
+        self._seq += 1
+        name = f"{SEGMENT_PREFIX}{started:{SEGMENT_TS_FORMAT}}-{socket.gethostname()}-{os.getpid()}-{self._seq}{SEGMENT_SUFFIX}"
+        self._path = self.directory / name
+        # Solo agregar y con búfer de línea: cada registro llega al archivo al escribirse
+        self._stream = open(self._path, "a", buffering=1, encoding="utf-8")
+        self._opened = time.monotonic()
+        self._pid = os.getpid()
+
+    def _should_rotate(self) -> bool:
+        return (
+            self._stream.tell() >= self.max_bytes
+            or time.monotonic() - self._opened >= self.rotate_seconds
+        )
+
+    def _rotate(self):
+        """
+        Cierra el segmento actual y lo deja comprimido (.jsonl.gz).
+        """
+        stream, path = self._stream, self._path
+        self._stream = self._path = None
+        stream.close()
+        if path.stat().st_size == 0:
+            path.unlink()
+            return
+        with open(path, "rb") as src, gzip.open(f"{path}.gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        path.unlink()
+
+    def write(self, logs: list):
+        lines = "".join(
+            orjson.dumps(log_record(log), default=str, option=orjson.OPT_UTC_Z).decode() + "\n"
+            for log in logs
+        )
+        with self._lock:
+            if self._stream is not None and self._pid != os.getpid():
+                # Proceso hijo tras un fork: el segmento es del padre
+                self._stream = self._path = None
+            if self._stream is not None and self._should_rotate():
+                self._rotate()
+            if self._stream is None:
+                self._open()
+            self._stream.write(lines)
+
+    def close(self):
+        with self._lock:
+            if self._stream is not None and self._pid == os.getpid():
+                self._rotate()
+
+
+def segment_paths(directory, patterns=()) -> list[Path]:
+    """
+    Segmentos de `directory` (comprimidos y abiertos) que coinciden con
+    `patterns` (nombres, globs o rutas), en orden de nombre = orden de inicio.
+    """
+    directory = Path(directory)
+    if not patterns:
+        patterns = [f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}", f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}.gz"]
+    found = set()
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_file():
+            found.add(path)
+        else:
+            found.update(p for p in directory.glob(pattern) if p.is_file())
+    return sorted(found, key=lambda p: p.name)
+
+
+def segment_started(path: Path) -> datetime | None:
+    stamp = path.name[len(SEGMENT_PREFIX):].split("-", 1)[0]
+    try:
+        return datetime.strptime(stamp, SEGMENT_TS_FORMAT).replace(tzinfo=dt_timezone.utc)
+    except ValueError:
+        return None
+
+
+def read_segment(path: Path):
+    """
+    Registros (dict) de un segmento. Una línea incompleta (segmento abierto o
+    proceso interrumpido) se entrega como None.
+    """
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as stream:
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                yield orjson.loads(line)
+            except orjson.JSONDecodeError:
+                yield None
+
+
+_sinks = None
+_sinks_config = None
+_sinks_lock = threading.Lock()
+
+
+def get_sinks() -> list:
+    """
+    Instancias de AUDIT_SINKS, creadas una vez por proceso (y de nuevo si el
+    setting cambia).
+    """
+    global _sinks, _sinks_config
+    config = tuple(getattr(settings, "AUDIT_SINKS", ("auditlog.sinks.DatabaseSink",)))
+    if _sinks_config != config:
+        with _sinks_lock:
+            if _sinks_config != config:
+                close_sinks()
+                _sinks = [import_string(path)() for path in config]
+                _sinks_config = config
+    return _sinks
+
+
+def dispatch(logs: list):
+    for sink in get_sinks():
+        try:
+            sink.write(logs)
+        except Exception:
+            logger.exception("El sink %s no pudo guardar %s registros de bitácora", type(sink).__name__, len(logs))
+
+
+def close_sinks():
+    for sink in _sinks or ():
+        try:
+            sink.close()
+        except Exception:
+            logger.exception("No se pudo cerrar el sink %s", type(sink).__name__)
+
+
+# Registrado al importar, antes que el cierre de audit_writer: atexit corre en
+# orden inverso, así el escritor vacía su cola antes de cerrar los archivos
+atexit.register(close_sinks)
@@ -1,5 +1,363 @@
-from django.test import TestCase
+import csv
+import gzip
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import skipUnless
+
+import orjson
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from catalog.models import Topic
+from visits.models import Citizen, Visit, VisitCase
+from .models import AuditLog
+from .partitions import (
+    add_months, create_partition, expire_partitions, is_partitioned, month_bound, monthly_partitions,
+    partition_name, retention_cutoff,
+)
+from .sinks import JSONLFileSink, close_sinks, read_segment, segment_paths
+from .utils import log_action
+from .writer import AuditWriter
+
+User = get_user_model()
+
+LOGS_URL = "/api/auditlog/logs/"
+
 
 class AuditlogSmokeTest(TestCase):
     def test_smoke(self):
         self.assertTrue(True)
+
+
+class CursorPaginationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="supervisor", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        AuditLog.objects.bulk_create([AuditLog(action="login", entity="User") for _ in range(7)])
+        # Tres registros con el mismo ts para ejercitar el desempate por id
+        now = timezone.now()
+        for i, log in enumerate(AuditLog.objects.order_by("id")):
+            log.ts = now - timedelta(minutes=min(i, 3))
+            log.save(update_fields=["ts"])
+        self.expected = list(AuditLog.objects.order_by("-ts", "-id").values_list("id", flat=True))
+
+    def test_walks_all_pages_without_count(self):
+        seen, url, pages = [], f"{LOGS_URL}?pagination=cursor&page_size=3", []
+        while url:
+            with self.assertNumQueries(1):
+                data = self.client.get(url).data
+            self.assertNotIn("count", data)
+            pages.append(data)
+            seen += [row["id"] for row in data["results"]]
+            url = data["next"]
+        self.assertEqual(seen, self.expected)
+        self.assertIsNone(pages[0]["previous"])
+
+        back = self.client.get(pages[1]["previous"]).data
+        self.assertEqual([r["id"] for r in back["results"]], self.expected[:3])
+        self.assertIsNone(back["previous"])
+
+    def test_page_mode_unchanged_and_bad_cursor(self):
+        data = self.client.get(LOGS_URL).data
+        self.assertEqual(data["count"], len(self.expected))
+        self.assertEqual(self.client.get(f"{LOGS_URL}?cursor=basura").status_code, 404)
+
+
+class AuditWriterTest(SimpleTestCase):
+    def make_writer(self, **kwargs):
+        self.batches, self.sink_threads = [], set()
+
+        def sink(batch):
+            self.sink_threads.add(threading.current_thread().name)
+            self.batches.append(list(batch))
+
+        writer = AuditWriter(sink, **kwargs)
+        self.addCleanup(writer.close)
+        return writer
+
+    def test_batches_by_size_and_by_time(self):
+        writer = self.make_writer(batch_size=3, flush_ms=50)
+        writer.enqueue(list(range(7)))
+        time.sleep(0.3)
+        self.assertEqual(self.batches, [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertEqual(self.sink_threads, {"audit-writer"})
+
+    def test_flush_and_close_drain_the_queue(self):
+        writer = self.make_writer(batch_size=100, flush_ms=60_000)
+        writer.enqueue([1, 2])
+        self.assertTrue(writer.flush())
+        self.assertEqual(self.batches, [[1, 2]])
+        writer.enqueue([3])
+        writer.close()
+        self.assertEqual(self.batches, [[1, 2], [3]])
+
+    def test_full_queue_writes_inline(self):
+        release = threading.Event()
+        writer = self.make_writer(batch_size=1, flush_ms=10, queue_size=2)
+        blocked = writer.sink
+        writer.sink = lambda batch: release.wait(5) or blocked(batch)
+        writer.enqueue([1])  # el hilo queda ocupado con este
+        time.sleep(0.05)
+        writer.sink = blocked
+        writer.enqueue([2, 3, 4, 5])
+        self.assertEqual(self.batches, [[4, 5]])
+        self.assertEqual(self.sink_threads, {threading.current_thread().name})
+        release.set()
+
+
+class AuditDeliveryTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="recepcion", password="x")
+        topic = Topic.objects.create(code="TRAM-301", name="Licencia", unit="Catastro")
+        citizen = Citizen.objects.create(dpi="7000001", name="Luis")
+        self.case = VisitCase.objects.create(citizen=citizen, topic=topic, code_persistente="CASE-A")
+        AuditLog.objects.all().delete()
+
+    def test_async_mode_enqueues_after_commit(self):
+        batches = []
+        writer = AuditWriter(batches.append, batch_size=10, flush_ms=10)
+        self.addCleanup(writer.close)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            writer.submit([AuditLog(action="login")], asynchronous=True)
+            self.assertEqual(batches, [])
+        self.assertEqual(len(callbacks), 1)
+        self.assertTrue(writer.flush())
+        self.assertEqual([log.action for log in batches[0]], ["login"])
+
+    def test_log_action_writes_inline_without_async(self):
+        with self.settings(AUDIT_ASYNC=False), self.assertNumQueries(1):
+            log_action(user=self.user, action="login", entity="User", entity_id=self.user.id)
+        self.assertEqual(AuditLog.objects.get().user_id, self.user.id)
+
+    def test_visit_signal_does_not_duplicate_service_logs(self):
+        visit = Visit.objects.create(case=self.case, intake_user=self.user, target_unit="Catastro")
+        marked = Visit(case=self.case, intake_user=self.user, target_unit="Catastro")
+        marked._audit_logged = True
+        marked.save()
+        self.assertEqual(list(AuditLog.objects.values_list("action", "entity_id")), [("visit_checkin", str(visit.id))])
+
+        visit.checkout_at = timezone.now()
+        visit.save(update_fields=["checkout_at"])
+        visit.reason = "Corrección"
+        visit.save()  # editar una visita cerrada no es otra salida
+        self.assertEqual(AuditLog.objects.filter(action="visit_checkout").count(), 1)
+
+    def test_full_save_checkout_is_audited_once(self):
+        visit = Visit.objects.create(case=self.case, intake_user=self.user, target_unit="Catastro")
+        visit = Visit.objects.get(pk=visit.pk)  # como el admin: instancia recién cargada
+        visit.checkout_at = timezone.now()
+        visit.save()
+        visit.reason = "Corrección"
+        visit.save()
+        Visit.objects.get(pk=visit.pk).save()
+        self.assertEqual(AuditLog.objects.filter(action="visit_checkout").count(), 1)
+
+
+class JSONLFileSinkTest(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.user = User.objects.create_user(username="auditor", password="x")
+
+    def logs(self, n, action="visit_checkin", **kwargs):
+        return [AuditLog(action=action, entity="Visit", entity_id=str(i), payload={"badge_code": f"VIS-{i}"}, **kwargs)
+                for i in range(n)]
+
+    def test_rotates_by_size_and_compresses_segments(self):
+        sink = JSONLFileSink(self.dir, max_bytes=300)
+        for _ in range(4):
+            sink.write(self.logs(2))
+        open_segments = [p for p in segment_paths(self.dir) if p.suffix == ".jsonl"]
+        self.assertEqual(len(open_segments), 1)
+        sink.close()
+        segments = segment_paths(self.dir)
+        self.assertGreater(len(segments), 1)
+        self.assertTrue(all(p.suffix == ".gz" for p in segments))
+        records = [r for p in segments for r in read_segment(p)]
+        self.assertEqual(len(records), 8)
+        self.assertEqual(records[0]["payload"], {"badge_code": "VIS-0"})
+        self.assertTrue(records[0]["ts"].endswith("Z"))
+
+    def test_rotates_by_age(self):
+        sink = JSONLFileSink(self.dir, rotate_seconds=0.05)
+        sink.write(self.logs(1))
+        time.sleep(0.1)
+        sink.write(self.logs(1))
+        self.assertEqual(len(list(self.dir.glob("*.jsonl.gz"))), 1)
+        sink.close()
+
+    def test_configured_sinks_receive_log_action(self):
+        sinks = ["auditlog.sinks.DatabaseSink", "auditlog.sinks.JSONLFileSink"]
+        with self.settings(AUDIT_SINKS=sinks, AUDIT_FILE_DIR=self.dir):
+            log_action(user=self.user, action="login", entity="User", entity_id=self.user.id)
+            close_sinks()
+        self.assertEqual(AuditLog.objects.filter(action="login").count(), 1)
+        [segment] = segment_paths(self.dir)
+        self.assertEqual([r["user_id"] for r in read_segment(segment)], [self.user.id])
+
+    def test_load_command_filters_and_skips_partial_lines(self):
+        ghost = User.objects.create_user(username="ghost", password="x")
+        sink = JSONLFileSink(self.dir)
+        old = timezone.now() - timedelta(days=40)
+        sink.write(self.logs(2, user=self.user) + self.logs(1, user=ghost) + self.logs(1, ts=old))
+        sink.write(self.logs(2, action="visit_checkout"))
+        sink.close()
+        ghost.delete()
+        with open(self.dir / "audit-20260101T000000-host-1-1.jsonl", "w") as f:
+            f.write('{"ts": "2026-01-01T00:00:00Z", "action": "login"}\n{"ts": "2026-')
+        AuditLog.objects.all().delete()
+
+        out = StringIO()
+        since = (timezone.localdate() - timedelta(days=1)).isoformat()
+        call_command("load_audit_segments", "--dir", str(self.dir), "--from", since, "--action", "visit_checkin", stdout=out)
+        self.assertIn("Total cargados: 3", out.getvalue())
+        self.assertEqual(
+            sorted(AuditLog.objects.values_list("user_id", flat=True), key=str),
+            sorted([self.user.id, self.user.id, None], key=str),
+        )
+
+        out = StringIO()
+        call_command("load_audit_segments", "audit-20260101*", "--dir", str(self.dir), "--dry-run", stdout=out)
+        self.assertIn("1 línea(s) incompletas omitidas", out.getvalue())
+        self.assertIn("Total se cargarían: 1", out.getvalue())
+
+
+class AuditPartitionsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="supervisor", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        self.months = [month_bound(add_months(date(now.year, now.month, 1), -n)) for n in range(4)]
+        AuditLog.objects.all().delete()
+        AuditLog.objects.bulk_create([AuditLog(action="login", ts=ts + timedelta(days=1)) for ts in self.months])
+
+    def test_month_arithmetic(self):
+        self.assertEqual(add_months(date(2026, 11, 1), 2), date(2027, 1, 1))
+        self.assertEqual(add_months(date(2026, 1, 1), -1), date(2025, 12, 1))
+        self.assertEqual(retention_cutoff(3, today=date(2026, 2, 14)), date(2025, 12, 1))
+        self.assertEqual(partition_name(date(2026, 2, 1)), "auditlog_auditlog_p2026_02")
+
+    def test_date_range_filter(self):
+        params = {"from_date": self.months[2].isoformat(), "to_date": self.months[0].isoformat()}
+        self.assertEqual(self.client.get(LOGS_URL, params).data["count"], 2)
+
+    @skipUnless(connection.vendor != "postgresql", "en PostgreSQL la tabla está particionada")
+    def test_retention_deletes_rows_without_partitions(self):
+        out = StringIO()
+        call_command("audit_partitions", "--retention-months", "2", "--dry-run", stdout=out)
+        self.assertIn("se borrarían", out.getvalue())
+        self.assertEqual(AuditLog.objects.count(), 4)
+        call_command("audit_partitions", "--retention-months", "2", "--batch-size", "1", stdout=StringIO())
+        self.assertEqual(sorted(AuditLog.objects.values_list("ts", flat=True)),
+                         [ts + timedelta(days=1) for ts in sorted(self.months[:2])])
+
+    @skipUnless(connection.vendor == "postgresql", "particiones solo en PostgreSQL")
+    def test_partitions_are_created_moved_and_detached(self):
+        self.assertTrue(is_partitioned())
+        # Meses anteriores a la migración: sus filas están en DEFAULT y se mueven
+        oldest = self.months[3].date()
+        self.assertTrue(create_partition(oldest))
+        self.assertEqual(AuditLog.objects.filter(ts__lt=self.months[2]).count(), 1)
+        future = add_months(self.months[0].date(), 12)
+        AuditLog.objects.create(action="login", ts=month_bound(future) + timedelta(hours=1))  # cae en DEFAULT
+        self.assertTrue(create_partition(future))
+        self.assertFalse(create_partition(future))
+        self.assertIn(future, monthly_partitions())
+
+        expired = expire_partitions(2, drop=True)
+        self.assertEqual(expired, [partition_name(oldest)])
+        self.assertEqual(AuditLog.objects.count(), 3)
+
+    @skipUnless(connection.vendor == "postgresql", "particiones solo en PostgreSQL")
+    def test_detach_keeps_default_rows_of_expired_months(self):
+        # Los meses anteriores a la migración no tienen partición: sus filas están en DEFAULT
+        expired = expire_partitions(2)
+        names = [partition_name(m.date()) for m in (self.months[3], self.months[2])]
+        self.assertEqual(expired, names)
+        self.assertEqual(AuditLog.objects.count(), 2)
+        with connection.cursor() as cursor:
+            for name in names:
+                cursor.execute(f"SELECT count(*) FROM {connection.ops.quote_name(name)}")
+                self.assertEqual(cursor.fetchone()[0], 1)
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="auditor", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        AuditLog.objects.all().delete()
+        AuditLog.objects.bulk_create(
+            [AuditLog(action="visit_checkin", entity="Visit", entity_id=str(i), user=self.user,
+                      payload={"badge_code": f"VIS-{i}", "nota": "línea, con coma"}, ip="10.0.0.1")
+             for i in range(5)]
+            + [AuditLog(action="login", entity="User")]
+        )
+
+    def content(self, res):
+        self.assertEqual(res.status_code, 200)
+        body = b"".join(res.streaming_content)
+        return gzip.decompress(body) if res.get("Content-Encoding") == "gzip" else body
+
+    def test_ndjson_applies_list_filters(self):
+        res = self.client.get(f"{LOGS_URL}export/", {"action": "visit_checkin"})
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        self.assertIn("attachment;", res["Content-Disposition"])
+        rows = [orjson.loads(line) for line in self.content(res).splitlines()]
+        listed = self.client.get(LOGS_URL, {"action": "visit_checkin", "page_size": 100}).data["results"]
+        self.assertEqual(rows, [dict(row) for row in listed])
+        self.assertEqual(AuditLog.objects.filter(action="auditlog_export").get().user_id, self.user.id)
+
+    def test_csv_with_gzip(self):
+        res = self.client.get(f"{LOGS_URL}export/", {"format": "csv", "entity": "Visit"}, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", res["Vary"])
+        rows = list(csv.reader(self.content(res).decode().splitlines()))
+        self.assertEqual(rows[0], ["id", "ts", "user", "user_username", "action", "entity", "entity_id", "payload", "ip"])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][3], "auditor")
+        self.assertEqual(rows[1][7], '{"badge_code":"VIS-4","nota":"línea, con coma"}')
+
+    def test_requires_authentication(self):
+        res = APIClient().get(f"{LOGS_URL}export/", {"format": "csv"})
+        self.assertEqual(res.status_code, 401)
+
+
+class PayloadFilterTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="auditor", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        AuditLog.objects.all().delete()
+        AuditLog.objects.bulk_create([
+            AuditLog(action="visit_checkin", entity="Visit", entity_id="1", payload={"badge_code": "VIS-2026-001234", "case_id": 7}),
+            AuditLog(action="visit_checkout", entity="Visit", entity_id="1", payload={"badge_code": "VIS-2026-001234", "case_id": 7}),
+            AuditLog(action="visit_checkin", entity="Visit", entity_id="2", payload={"badge_code": "VIS-2026-001235", "case_id": 8}),
+            AuditLog(action="case_created", entity="VisitCase", entity_id="7", payload={"code_persistente": "C-7", "citizen_id": 3}),
+            AuditLog(action="login", entity="User"),
+        ])
+
+    def ids(self, **params):
+        res = self.client.get(LOGS_URL, params)
+        self.assertEqual(res.status_code, 200, res.data)
+        return sorted(row["entity_id"] + ":" + row["action"] for row in res.data["results"])
+
+    def test_payload_key_filters(self):
+        self.assertEqual(self.ids(payload__badge_code="VIS-2026-001234"), ["1:visit_checkin", "1:visit_checkout"])
+        self.assertEqual(self.ids(payload__case_id="8"), ["2:visit_checkin"])
+        self.assertEqual(self.ids(payload__citizen_id="3", action="case_created"), ["7:case_created"])
+        self.assertEqual(self.ids(payload__case_id="7", action="visit_checkout"), ["1:visit_checkout"])
+
+    def test_invalid_id_is_rejected(self):
+        self.assertEqual(self.client.get(LOGS_URL, {"payload__case_id": "siete"}).status_code, 400)
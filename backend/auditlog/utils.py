@@ -1,20 +1,40 @@
 from typing import Any, Optional
 from .models import AuditLog
+from .writer import audit_writer
+
+def _build(*, user=None, action:str, entity:str="", entity_id:str="", payload:Optional[dict]=None, ip:str=None) -> AuditLog:
+    return AuditLog(
+        user=user if (user and getattr(user, "is_authenticated", False)) else None,
+        action=action,
+        entity=entity,
+        entity_id=str(entity_id or ""),
+        payload=payload or None,
+        ip=ip,
+    )
 
 def log_action(*, user=None, action:str, entity:str="", entity_id:str="", payload:Optional[dict]=None, ip:str=None):
     """
     Uso:
         log_action(user=request.user, action="visit_checkout", entity="Visit", entity_id=str(visit.id), payload={...}, ip=get_client_ip(request))
+
+    La escritura la hace audit_writer (auditlog/writer.py): en segundo plano
+    con AUDIT_ASYNC, en línea si no.
+    """
+    try:
+        audit_writer.submit([_build(user=user, action=action, entity=entity, entity_id=entity_id, payload=payload, ip=ip)])
+    except Exception:
+        # La bitácora nunca debe romper el flujo principal
+        pass
+
+def log_actions(entries: list[dict]):
+    """
+    Variante por lotes de log_action: un solo INSERT para varios registros.
+    Cada entrada acepta las mismas llaves que log_action.
     """
+    if not entries:
+        return
     try:
-        AuditLog.objects.create(
-            user=user if (user and getattr(user, "is_authenticated", False)) else None,
-            action=action,
-            entity=entity,
-            entity_id=str(entity_id or ""),
-            payload=payload or None,
-            ip=ip,
-        )
+        audit_writer.submit([_build(**e) for e in entries])
     except Exception:
         # La bitácora nunca debe romper el flujo principal
         pass
@@ -2,11 +2,16 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from rest_framework import viewsets, mixins
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter, SearchFilter
+from core.pagination import KeysetOrPagePagination
+from .export import CSVRenderer, NDJSONRenderer, export_response
+from .filters import AuditLogFilter
 from .models import AuditLog
 from .serializers import AuditLogSerializer
+from .utils import log_action, get_client_ip
 
 from drf_spectacular.utils import (
     extend_schema, extend_schema_view, OpenApiParameter, OpenApiResponse,
@@ -18,10 +23,31 @@ class AuditLogViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets
     serializer_class = AuditLogSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
-    filterset_fields = ["action", "entity", "user"]
+    filterset_class = AuditLogFilter
     search_fields = ["entity", "entity_id", "user__username", "ip"]
     ordering_fields = ["ts"]
     ordering = ["-ts"]
+    pagination_class = KeysetOrPagePagination
+    cursor_ordering = ("-ts", "-id")
+
+    @extend_schema(
+        summary="Exportar bitácora (NDJSON o CSV)",
+        description="Todos los registros que cumplen los filtros del listado, sin paginar y por tramos "
+                    "(gzip si el cliente lo acepta). ?format=ndjson (por defecto) o ?format=csv.",
+        responses={(200, NDJSONRenderer.media_type): OpenApiTypes.STR, (200, CSVRenderer.media_type): OpenApiTypes.STR},
+    )
+    @action(detail=False, methods=["get"], url_path="export", renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        fmt = request.accepted_renderer.format
+        queryset = self.filter_queryset(self.get_queryset())
+        log_action(
+            user=request.user,
+            action="auditlog_export",
+            entity="AuditLog",
+            payload={"query": request.GET.dict(), "format": fmt},
+            ip=get_client_ip(request),
+        )
+        return export_response(request, queryset, fmt)
 
 
 class AuditlogPlaceholderAPIView(APIView):
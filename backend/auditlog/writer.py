@@ -0,0 +1,181 @@
+"""
+Escritura de la bitácora fuera del camino de la petición.
+
+log_action/log_actions (auditlog/utils.py) entregan los AuditLog a
+audit_writer.submit(), que los pasa a los sinks de AUDIT_SINKS
+(auditlog/sinks.py):
+
+- AUDIT_ASYNC activo: al confirmarse la transacción (on_commit; un rollback no
+  deja bitácora) los registros pasan a una cola acotada en memoria. Un hilo por
+  proceso los inserta con bulk_create cada AUDIT_BATCH_SIZE registros o cada
+  AUDIT_FLUSH_MS milisegundos, lo que ocurra primero.
+- Cola llena (AUDIT_QUEUE_SIZE): el registro se escribe en línea; la petición
+  se demora pero no se pierde nada.
+- Al terminar el proceso (atexit) se vacía la cola; si el hilo no responde a
+  tiempo, lo pendiente se escribe en el hilo que cierra.
+- AUDIT_ASYNC inactivo (dev y pruebas, ver core/settings/dev.py): escritura en
+  línea, como antes.
+
+Un lote que falla en un sink se registra en el log y se descarta: la bitácora
+nunca debe romper el flujo principal.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .sinks import dispatch
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class AuditWriter:
+    def __init__(self, sink=dispatch, *, batch_size: int | None = None,
+                 flush_ms: float | None = None, queue_size: int | None = None):
+        self.sink = sink
+        self._batch_size = batch_size
+        self._flush_ms = flush_ms
+        self._queue_size = queue_size
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._atexit = False
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, "AUDIT_ASYNC", False)
+
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size or getattr(settings, "AUDIT_BATCH_SIZE", 200)
+
+    @property
+    def flush_seconds(self) -> float:
+        return (self._flush_ms or getattr(settings, "AUDIT_FLUSH_MS", 500)) / 1000
+
+    def submit(self, logs: list, asynchronous: bool | None = None):
+        if not logs:
+            return
+        if not (self.enabled if asynchronous is None else asynchronous):
+            self.sink(logs)
+            return
+        transaction.on_commit(lambda: self.enqueue(logs))
+
+    def enqueue(self, logs: list):
+        q = self._ensure_started()
+        for i, log in enumerate(logs):
+            try:
+                q.put_nowait(log)
+            except queue.Full:
+                # Contrapresión: lo que no cabe se escribe en línea
+                self.sink(logs[i:])
+                return
+
+    def _ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid and self._thread.is_alive():
+            return self._queue
+        with self._lock:
+            if self._pid != pid or not self._thread.is_alive():
+                # Primer uso en este proceso (o tras un fork: el hilo no se hereda)
+                size = self._queue_size or getattr(settings, "AUDIT_QUEUE_SIZE", 10_000)
+                self._queue = queue.Queue(maxsize=size)
+                self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                                name="audit-writer", daemon=True)
+                self._thread.start()
+                if not self._atexit:
+                    atexit.register(self.close)
+                    self._atexit = True
+                self._pid = pid
+        return self._queue
+
+    def _run(self, q):
+        batch, deadline = [], None
+        try:
+            while True:
+                timeout = None if not batch else max(0.0, deadline - time.monotonic())
+                try:
+                    item = q.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+                if item is _STOP:
+                    break
+                if isinstance(item, threading.Event):
+                    self._write(batch)
+                    batch = []
+                    item.set()
+                    continue
+                if item is not None:
+                    if not batch:
+                        deadline = time.monotonic() + self.flush_seconds
+                    batch.append(item)
+                if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                    self._write(batch)
+                    batch = []
+            self._write(batch)
+        finally:
+            connection.close()
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            self.sink(batch)
+        except Exception:
+            logger.exception("Fallo en el escritor de bitácora")
+        # Tras un error de BD (o vencido CONN_MAX_AGE) el siguiente lote reconecta
+        connection.close_if_unusable_or_obsolete()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Escribe lo encolado hasta ahora (pruebas, comandos). True si terminó a tiempo.
+        """
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        """
+        Detiene el hilo vaciando la cola. Lo que quede se escribe aquí mismo.
+        """
+        thread, q = self._thread, self._queue
+        if thread is None or self._pid != os.getpid():
+            return
+        if thread.is_alive():
+            try:
+                q.put(_STOP, timeout=timeout)
+                thread.join(timeout)
+            except queue.Full:
+                pass
+        if thread.is_alive():
+            # El hilo sigue ocupado: lo pendiente se escribe en este hilo
+            pending = []
+            while True:
+                try:
+                    item = q.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is not _STOP:
+                    pending.append(item)
+            if pending:
+                self.sink(pending)
+        self._thread = self._queue = None
+        self._pid = None
+
+
+audit_writer = AuditWriter()
@@ -0,0 +1,115 @@
+"""
+Caché en memoria del catálogo de temas (por proceso/worker).
+
+- Guarda los Topic activos ordenados por nombre, con índices por id y código.
+- Cada guardado/borrado de Topic incrementa CatalogVersion("topics") e invalida
+  la copia local (catalog/signals.py).
+- Los demás workers comparan su versión con la fila de CatalogVersion como
+  máximo cada CATALOG_VERSION_CHECK_SECONDS; entre revisiones, las lecturas no
+  hacen consultas.
+
+Uso:
+    from catalog.cache import topic_catalog
+    topic = topic_catalog.get(topic_id)      # Topic activo o None
+    topics = topic_catalog.active()          # lista ordenada por nombre
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+TOPICS = "topics"
+
+
+def current_version(name: str = TOPICS) -> int:
+    from .models import CatalogVersion
+
+    return CatalogVersion.objects.filter(name=name).values_list("version", flat=True).first() or 0
+
+
+def bump_version(name: str = TOPICS) -> None:
+    from .models import CatalogVersion
+
+    if CatalogVersion.objects.filter(name=name).update(version=F("version") + 1):
+        return
+    try:
+        with transaction.atomic():
+            CatalogVersion.objects.create(name=name, version=1)
+    except IntegrityError:
+        # Otro proceso creó la fila en paralelo
+        CatalogVersion.objects.filter(name=name).update(version=F("version") + 1)
+
+
+class TopicCatalog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None   # (versión, [Topic], {id: Topic}, {code: Topic})
+        self._checked_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def _load(self):
+        from .models import Topic
+
+        version = current_version()
+        topics = list(Topic.objects.filter(is_active=True).order_by("name", "id"))
+        return version, topics, {t.id: t for t in topics}, {t.code.upper(): t for t in topics}
+
+    def _current(self):
+        interval = getattr(settings, "CATALOG_VERSION_CHECK_SECONDS", 5)
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < interval:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or current_version() != snapshot[0]:
+                snapshot = self._snapshot = self._load()
+            self._checked_at = now
+        return snapshot
+
+    @property
+    def version(self) -> int:
+        return self._current()[0]
+
+    def active(self) -> list:
+        """
+        Temas activos ordenados por nombre (copias; se pueden modificar sin afectar la caché).
+        """
+        return [copy.copy(t) for t in self._current()[1]]
+
+    def get(self, topic_id):
+        topic = self._current()[2].get(topic_id)
+        return copy.copy(topic) if topic else None
+
+    def get_by_code(self, code: str):
+        topic = self._current()[3].get((code or "").upper())
+        return copy.copy(topic) if topic else None
+
+    def in_bulk(self, ids) -> dict:
+        by_id = self._current()[2]
+        return {i: copy.copy(by_id[i]) for i in ids if i in by_id}
+
+    def find(self, param: str, limit: int = 10):
+        """
+        Equivalente en memoria de: id exacto > código exacto > nombre contiene (sin
+        distinguir mayúsculas). Retorna (tema | None, candidatos).
+        """
+        _, topics, by_id, _ = self._current()
+        if not param:
+            return None, []
+        if param.isdigit() and int(param) in by_id:
+            return copy.copy(by_id[int(param)]), []
+        needle = param.casefold()
+        rows = [t for t in topics if t.code.upper() == param.upper() or needle in t.name.casefold()][:limit]
+        if len(rows) == 1:
+            return copy.copy(rows[0]), []
+        return None, [copy.copy(t) for t in rows]
+
+
+topic_catalog = TopicCatalog()
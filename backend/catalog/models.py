@@ -20,3 +20,19 @@ class Topic(models.Model):
 
     def __str__(self):
         return f"{self.code} - {self.name}"
+
+
+class CatalogVersion(models.Model):
+    """
+    Versión de cada catálogo cacheado en memoria (ver catalog/cache.py).
+    Se incrementa en cada cambio; los demás procesos la comparan para invalidar.
+    """
+    name = models.CharField(max_length=32, unique=True)
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Versión de catálogo"
+        verbose_name_plural = "Versiones de catálogo"
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
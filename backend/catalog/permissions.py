@@ -1,5 +1,7 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+from users.roles import has_role
+
 ADMIN_GROUP = "admin"
 SUPERVISOR_GROUP = "supervisor"
 
@@ -16,9 +18,5 @@ class TopicPermission(BasePermission):
         if request.method in SAFE_METHODS:
             return True
 
-        # Métodos de escritura:
-        return (
-            request.user.groups.filter(name=ADMIN_GROUP).exists() or
-            request.user.groups.filter(name=SUPERVISOR_GROUP).exists() or
-            request.user.is_superuser
-        )
+        # Métodos de escritura (roles resueltos una vez por petición, ver users/roles.py):
+        return request.user.is_superuser or has_role(request, ADMIN_GROUP, SUPERVISOR_GROUP)
@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_version, topic_catalog
+from .models import Topic
+
+
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+def topic_changed(sender, instance: Topic, **kwargs):
+    # Los demás workers detectan el cambio por la versión; este invalida de inmediato
+    bump_version()
+    topic_catalog.invalidate()
+    transaction.on_commit(topic_catalog.invalidate)
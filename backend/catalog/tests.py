@@ -1,5 +1,60 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .cache import bump_version, current_version, topic_catalog
+from .models import Topic
+
+User = get_user_model()
+
 
 class CatalogSmokeTest(TestCase):
     def test_smoke(self):
         self.assertTrue(True)
+
+
+class TopicCatalogCacheTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="admin", password="x", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.a = Topic.objects.create(code="TRAM-101", name="Constancia", unit="Secretaría")
+        self.b = Topic.objects.create(code="TRAM-102", name="Boleto de ornato", unit="Tesorería")
+        Topic.objects.create(code="TRAM-103", name="Inactivo", unit="Tesorería", is_active=False)
+
+    def test_active_served_without_queries(self):
+        topic_catalog.active()
+        with self.assertNumQueries(0):
+            res = self.client.get("/api/catalog/topics/active/")
+            self.assertEqual(topic_catalog.get(self.a.id).code, "TRAM-101")
+            self.assertEqual(topic_catalog.find("ornato")[0].id, self.b.id)
+        self.assertEqual([t["code"] for t in res.data["results"]], ["TRAM-102", "TRAM-101"])
+
+    def test_save_bumps_version_and_invalidates(self):
+        before = current_version()
+        self.a.is_active = False
+        self.a.save()
+        self.assertEqual(current_version(), before + 1)
+        self.assertIsNone(topic_catalog.get(self.a.id))
+
+    def test_other_worker_change_is_seen_after_version_check(self):
+        topic_catalog.active()
+        # Simula el cambio hecho por otro worker: fila nueva + versión, sin señal local
+        Topic.objects.bulk_create([Topic(code="TRAM-104", name="Nuevo", unit="Catastro")])
+        bump_version()
+        with self.settings(CATALOG_VERSION_CHECK_SECONDS=0):
+            self.assertIsNotNone(topic_catalog.get_by_code("tram-104"))
+
+    def test_active_conditional_get(self):
+        topic_catalog.active()
+        res = self.client.get("/api/catalog/topics/active/")
+        etag = res["ETag"]
+        with self.assertNumQueries(0):
+            res = self.client.get("/api/catalog/topics/active/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+
+        self.b.name = "Boleto de ornato 2026"
+        self.b.save()
+        res = self.client.get("/api/catalog/topics/active/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res["ETag"], etag)
@@ -5,6 +5,8 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 
 from .models import Topic
+from .cache import topic_catalog
+from core.conditional import conditional
 from .serializers import TopicSerializer
 from .permissions import TopicPermission
 from .filters import TopicFilter
@@ -33,14 +35,15 @@ class TopicViewSet(viewsets.ModelViewSet):
     ordering = ["name"]
 
     @action(detail=False, methods=["get"], url_path="active")
+    @conditional(lambda view, request: topic_catalog.version)
     def active(self, request):
         """
-        Listado rápido de activos (ayuda UX).
+        Listado rápido de activos (ayuda UX). Se sirve desde la caché del catálogo, sin consultas.
         """
-        qs = self.get_queryset().filter(is_active=True)
-        page = self.paginate_queryset(qs)
+        topics = topic_catalog.active()
+        page = self.paginate_queryset(topics)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
-        ser = self.get_serializer(qs, many=True)
+        ser = self.get_serializer(topics, many=True)
         return Response(ser.data, status=200)
\ No newline at end of file
@@ -14,3 +14,11 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_asgi_application()
+
+# Precarga en segundo plano del índice de autocompletar ciudadanos
+from django.conf import settings  # noqa: E402
+
+if settings.CITIZEN_SUGGEST_WARM_ON_STARTUP:
+    from visits.suggest import citizen_index  # noqa: E402
+
+    citizen_index.warm_async()
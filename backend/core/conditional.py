@@ -0,0 +1,65 @@
+"""
+GET condicional (ETag / If-None-Match) para vistas DRF.
+
+El validador es una función barata que NO serializa la respuesta (una versión
+de catálogo, max(updated_at) + count, etc.). Si coincide con If-None-Match se
+responde 304 sin ejecutar la vista; si no, la vista corre y se agrega el ETag.
+
+Uso (acciones de ViewSet o métodos get de APIView):
+
+    @conditional(lambda view, request: topic_catalog.version)
+    def active(self, request): ...
+
+Se envía Cache-Control: private, no-cache para que el navegador revalide
+siempre con If-None-Match y reutilice su copia ante un 304 (el SPA no cambia).
+"""
+import hashlib
+from functools import wraps
+
+from rest_framework import status
+from rest_framework.response import Response
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    raw = "|".join(str(p) for p in parts)
+    return '"%s"' % hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+
+
+def _matches(header: str, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Comparación débil: se ignora el prefijo W/ que agregan algunos proxies (gzip)
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def conditional(validator):
+    """
+    validator(view, request) -> valor hashable (o None para no usar ETag).
+    El ETag combina el validador con la ruta y los parámetros de la petición.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            value = validator(self, request)
+            if value is None:
+                return view_method(self, request, *args, **kwargs)
+
+            etag = make_etag(request.path, request.META.get("QUERY_STRING", ""), value)
+            if _matches(request.headers.get("If-None-Match", ""), etag):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+            response["ETag"] = etag
+            response["Cache-Control"] = CACHE_CONTROL
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,186 @@
+"""
+Campos parciales (sparse fieldsets) en respuestas de lectura.
+
+    ?fields=id,badge_code,checkin_at,case.citizen.name   solo esos campos
+    ?omit=case.citizen.phone,reason                       todos menos esos
+
+Las rutas con punto bajan a los serializadores anidados ("case" completo o
+"case.citizen.name" solo el nombre). Un campo desconocido responde 400.
+
+Uso en la vista:
+
+    class CitizenViewSet(SparseFieldsetMixin, viewsets.GenericViewSet):
+        fieldset_actions = ("list", "retrieve")
+
+y en el serializador (y en los anidados que se quieran recortar):
+
+    class CitizenSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer): ...
+
+Con un fieldset, la vista también reduce el queryset: select_related solo de
+las relaciones pedidas y only() con las columnas que el serializador va a leer.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
+from rest_framework import serializers
+
+FIELDS_PARAM = "fields"
+OMIT_PARAM = "omit"
+
+# Para @extend_schema(parameters=FIELDSET_PARAMETERS) en las acciones que lo soportan
+FIELDSET_PARAMETERS = [
+    OpenApiParameter(FIELDS_PARAM, OpenApiTypes.STR, OpenApiParameter.QUERY,
+                     description="Campos a incluir, separados por coma; rutas anidadas con punto (case.citizen.name)."),
+    OpenApiParameter(OMIT_PARAM, OpenApiTypes.STR, OpenApiParameter.QUERY,
+                     description="Campos a excluir, mismo formato que 'fields'."),
+]
+
+
+def parse_paths(raw: str | None) -> dict | None:
+    """
+    "id,case.citizen.name" -> {"id": None, "case": {"citizen": {"name": None}}}
+    None = campo completo; dict = selección dentro del campo anidado.
+    """
+    if raw is None:
+        return None
+    tree = {}
+    for path in raw.split(","):
+        parts = [p for p in path.strip().split(".") if p]
+        if not parts:
+            continue
+        node = tree
+        for part in parts[:-1]:
+            if part in node and node[part] is None:
+                break  # ya se pidió completo
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = None
+    return tree
+
+
+class Fieldset:
+    def __init__(self, include: dict | None = None, omit: dict | None = None, path: str = ""):
+        self.include = include
+        self.omit = omit
+        self.path = path
+
+    @classmethod
+    def from_request(cls, request):
+        params = request.query_params
+        include, omit = parse_paths(params.get(FIELDS_PARAM)), parse_paths(params.get(OMIT_PARAM))
+        if not include and not omit:
+            return None
+        return cls(include or None, omit or None)
+
+    def names(self, available) -> list:
+        """
+        Campos de `available` que quedan, en su orden original.
+        """
+        requested = set(self.include or ()) | set(self.omit or ())
+        unknown = requested - set(available)
+        if unknown:
+            raise serializers.ValidationError({
+                FIELDS_PARAM: [f"Campo desconocido: {self.path}{name}" for name in sorted(unknown)]
+            })
+        return [
+            name for name in available
+            if (self.include is None or name in self.include)
+            and not (self.omit and name in self.omit and self.omit[name] is None)
+        ]
+
+    def child(self, name: str):
+        """
+        Fieldset del campo anidado `name` (None si se usa completo).
+        """
+        include = self.include.get(name) if self.include else None
+        omit = self.omit.get(name) if self.omit else None
+        if include is None and omit is None:
+            return None
+        return Fieldset(include, omit, f"{self.path}{name}.")
+
+    def apply(self, fields: dict) -> dict:
+        out = {}
+        for name in self.names(fields):
+            field = fields[name]
+            child = self.child(name)
+            if child is not None:
+                target = getattr(field, "child", field)
+                if not isinstance(target, SparseFieldsetSerializerMixin):
+                    raise serializers.ValidationError({FIELDS_PARAM: [f"{self.path}{name} no tiene subcampos."]})
+                target.fieldset = child
+            out[name] = field
+        return out
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Acepta fieldset=Fieldset(...) y recorta sus campos (y los de sus anidados).
+    """
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        self.fieldset = fieldset
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = getattr(self, "fieldset", None)
+        return fieldset.apply(fields) if fieldset is not None else fields
+
+
+def _collect(serializer, model, prefix: str, only: list, related: list) -> bool:
+    for field in serializer.fields.values():
+        source = field.source
+        if source == "*" or "." in source:
+            return False  # el campo necesita el objeto completo
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            return False
+        only.append(prefix + source)
+        if isinstance(field, serializers.BaseSerializer):
+            if isinstance(field, serializers.ListSerializer) or not model_field.many_to_one and not model_field.one_to_one:
+                return False
+            related.append(prefix + source)
+            if not _collect(field, model_field.related_model, f"{prefix}{source}__", only, related):
+                return False
+    return True
+
+
+def restrict_queryset(queryset, serializer, extra=()):
+    """
+    select_related/only según los campos que quedaron en el serializador (más
+    `extra`, p. ej. los del cursor). Si algún campo no se puede mapear a
+    columnas, el queryset queda igual.
+    """
+    only, related = list(extra), []
+    if not _collect(serializer, queryset.model, "", only, related):
+        return queryset
+    return queryset.select_related(None).select_related(*related).only(*only)
+
+
+class SparseFieldsetMixin:
+    """
+    Para ViewSets: aplica ?fields= / ?omit= al serializador y al queryset en las
+    acciones de lectura listadas en fieldset_actions.
+    """
+    fieldset_actions = ("list", "retrieve")
+
+    def get_fieldset(self):
+        if getattr(self, "action", None) not in self.fieldset_actions:
+            return None
+        if not hasattr(self, "_fieldset"):
+            self._fieldset = Fieldset.from_request(self.request)
+        return self._fieldset
+
+    def get_serializer(self, *args, **kwargs):
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            kwargs.setdefault("fieldset", fieldset)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return queryset
+        extra = [f.lstrip("-") for f in getattr(self, "cursor_ordering", None) or ()]
+        return restrict_queryset(queryset, self.get_serializer_class()(fieldset=fieldset), extra)
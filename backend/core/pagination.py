@@ -0,0 +1,172 @@
+"""
+Paginación de listados.
+
+Por defecto se comporta como PageNumberPagination (?page=N, con count).
+Con ?pagination=cursor (o al seguir un enlace que ya trae ?cursor=) cambia a
+paginación por llave (keyset): el cursor guarda los valores del último registro
+y la página siguiente se obtiene con un WHERE sobre el orden de la vista, sin
+OFFSET ni COUNT(*), así que la página N cuesta lo mismo que la primera.
+
+La vista declara el orden estable del modo cursor (debe terminar en un campo
+único, normalmente id):
+
+    pagination_class = KeysetOrPagePagination
+    cursor_ordering = ("-checkin_at", "-id")
+
+En modo cursor se ignora ?ordering; la respuesta es {next, previous, results}.
+"""
+import base64
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _encode(values: list) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode(token: str) -> list:
+    padded = token + "=" * (-len(token) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+
+
+def _attr(obj, field: str):
+    for part in field.split("__"):
+        obj = obj[part] if isinstance(obj, dict) else getattr(obj, part)
+    return obj
+
+
+def keyset_filter(ordering, values, reverse: bool = False) -> Q:
+    """
+    Condición "después de values" para el orden dado (o "antes de" si reverse):
+    (a > x) OR (a = x AND b > y) ..., más una cota redundante sobre el primer
+    campo para que el motor pueda recorrer el índice como rango.
+    """
+    cond = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        desc = field.startswith("-")
+        name = field.lstrip("-")
+        op = "lt" if desc != reverse else "gt"
+        cond |= equal & Q(**{f"{name}__{op}": value})
+        equal &= Q(**{name: value})
+
+    first, first_value = ordering[0], values[0]
+    bound = "lte" if first.startswith("-") != reverse else "gte"
+    return Q(**{f"{first.lstrip('-')}__{bound}": first_value}) & cond
+
+
+class KeysetOrPagePagination(PageNumberPagination):
+    mode_query_param = "pagination"
+    cursor_query_param = "cursor"
+    page_size_query_param = None
+    cursor_page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def _use_cursor(self, request, view) -> bool:
+        if not getattr(view, "cursor_ordering", None):
+            return False
+        return (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or self.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self._use_cursor(request, view)
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.ordering = tuple(view.cursor_ordering)
+        size = self._cursor_page_size(request)
+
+        token = request.query_params.get(self.cursor_query_param)
+        backwards = False
+        if token:
+            try:
+                direction, *values = _decode(token)
+                backwards = direction == "p"
+                if direction not in ("n", "p") or len(values) != len(self.ordering):
+                    raise ValueError
+                # Valores que no corresponden al campo (fecha mal formada, etc.) fallan aquí
+                queryset = queryset.filter(keyset_filter(self.ordering, values, reverse=backwards))
+            except (ValueError, TypeError, ValidationError):
+                raise NotFound("Cursor inválido.")
+
+        if backwards:
+            ordering = [f[1:] if f.startswith("-") else f"-{f}" for f in self.ordering]
+        else:
+            ordering = list(self.ordering)
+
+        rows = list(queryset.order_by(*ordering)[: size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if backwards:
+            rows.reverse()
+
+        # Hacia atrás: siempre hay página siguiente (de donde venimos); hay anterior si sobró fila.
+        self.has_next = has_more if not backwards else bool(rows)
+        self.has_previous = bool(token) and (has_more if backwards else bool(rows))
+        self.rows = rows
+        return rows
+
+    def _cursor_page_size(self, request) -> int:
+        raw = request.query_params.get(self.cursor_page_size_query_param)
+        if raw and raw.isdigit() and int(raw) > 0:
+            return min(int(raw), self.max_page_size)
+        return self.get_page_size(request)
+
+    def _link(self, direction: str, row):
+        values = [_attr(row, f.lstrip("-")) for f in self.ordering]
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, "page")
+        url = replace_query_param(url, self.mode_query_param, "cursor")
+        return replace_query_param(url, self.cursor_query_param, _encode([direction, *values]))
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        return self._link("n", self.rows[-1]) if self.has_next and self.rows else None
+
+    def get_previous_link(self):
+        if not self.cursor_mode:
+            return super().get_previous_link()
+        return self._link("p", self.rows[0]) if self.has_previous and self.rows else None
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response = super().get_paginated_response_schema(schema)
+        response["properties"]["count"]["description"] = "Solo en modo página (se omite con ?pagination=cursor)."
+        return response
+
+    def get_schema_operation_parameters(self, view):
+        params = super().get_schema_operation_parameters(view)
+        if getattr(view, "cursor_ordering", None):
+            params += [
+                {
+                    "name": self.mode_query_param, "required": False, "in": "query",
+                    "description": "Use 'cursor' para paginación por llave (sin count).",
+                    "schema": {"type": "string", "enum": ["page", "cursor"]},
+                },
+                {
+                    "name": self.cursor_query_param, "required": False, "in": "query",
+                    "description": "Cursor opaco tomado de next/previous.",
+                    "schema": {"type": "string"},
+                },
+            ]
+        return params
@@ -0,0 +1,41 @@
+"""
+Parser JSON del API sobre orjson (registrado en REST_FRAMEWORK).
+
+Acepta lo mismo que rest_framework.parsers.JSONParser con STRICT_JSON
+(rechaza NaN/Infinity). Lo que orjson no lee igual que el módulo json usa el
+parser estándar:
+- charsets distintos de UTF-8 declarados en Content-Type;
+- cuerpos con enteros de más de 64 bits (orjson los convierte en float y
+  pierde precisión): se detectan por cualquier secuencia de 19 o más dígitos;
+- cuerpos que orjson rechaza (p. ej. surrogates sueltos como "\\ud800"); si
+  el parser estándar también los rechaza, el error es el suyo.
+"""
+import codecs
+import io
+import re
+
+import orjson
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from .renderers import ORJSONRenderer
+
+# Enteros fuera de int64/uint64 (y, de paso, decimales muy largos): parser estándar
+_LONG_DIGITS = re.compile(rb"\d{19}")
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if codecs.lookup(encoding).name != "utf-8" or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+        raw = stream.read()
+        if not _LONG_DIGITS.search(raw):
+            try:
+                return orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                pass
+        return super().parse(io.BytesIO(raw), media_type, parser_context)
@@ -0,0 +1,40 @@
+"""
+Renderer JSON del API sobre orjson (registrado en REST_FRAMEWORK).
+
+Mismo formato que rest_framework.renderers.JSONRenderer: compacto, UTF-8 sin
+escapar, fechas ISO 8601 con "Z" para UTC y \\u2028/\\u2029 escapados. orjson
+serializa de forma nativa str/int/float/dict/list, datetime/date/time y UUID;
+lo demás (Decimal, cadenas lazy, QuerySet, timedelta...) pasa por el mismo
+JSONEncoder de DRF (ver core/tests.py).
+
+La salida indentada (API navegable, ?indent) y los valores que orjson no
+acepta (p. ej. enteros de más de 64 bits) usan el renderer estándar.
+Diferencias con JSONRenderer, el valor es el mismo pero los bytes no:
+- floats con exponente: orjson escribe 1e16, json escribe 1e+16;
+- NaN/Infinity salen como null en lugar de provocar un error 500.
+"""
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+_drf_default = encoders.JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None or self.ensure_ascii or not self.compact:
+            # API navegable (?indent / BrowsableAPIRenderer) o ajustes no compactos
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_drf_default, option=OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Subconjunto estricto de JavaScript, igual que JSONRenderer
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
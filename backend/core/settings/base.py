@@ -3,6 +3,7 @@ from pathlib import Path
 from dotenv import load_dotenv
 from urllib.parse import urlparse
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 
 SPECTACULAR_SETTINGS = {
     "TITLE": "SisVisitas API",
@@ -122,10 +123,16 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# JWT sin consultar User en cada petición (users/authentication.py); is_active se
+# revisa como máximo cada JWT_ACTIVE_CHECK_SECONDS por usuario y proceso
+JWT_STATELESS_AUTH = os.getenv("JWT_STATELESS_AUTH", "1") == "1"
+JWT_ACTIVE_CHECK_SECONDS = float(os.getenv("JWT_ACTIVE_CHECK_SECONDS", "60"))
+
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",  # <-- JWT
+        "users.authentication.ClaimsJWTAuthentication" if JWT_STATELESS_AUTH
+        else "rest_framework_simplejwt.authentication.JWTAuthentication",  # <-- JWT
     ],
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
@@ -134,6 +141,16 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
+    # JSON con orjson, mismo formato que los de DRF (core/renderers.py, core/parsers.py)
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
@@ -145,6 +162,8 @@ SPECTACULAR_SETTINGS = {
 
 CORS_ALLOWED_ORIGINS = [o.strip() for o in os.getenv("CORS_ALLOWED_ORIGINS", "http://localhost:5173").split(",") if o.strip()]
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key", "if-none-match")
+CORS_EXPOSE_HEADERS = ["Idempotent-Replayed", "ETag", "Content-Disposition"]
 
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 CSRF_TRUSTED_ORIGINS = [o.replace("http://", "https://") for o in CORS_ALLOWED_ORIGINS]
@@ -161,4 +180,39 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
-
+# Idempotency-Key en check-in/check-out: vigencia de la respuesta guardada
+# y espera máxima ante un duplicado concurrente
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "2"))
+
+# Cierre automático de visitas olvidadas (manage.py auto_checkout), hora local
+VISITS_CLOSING_HOUR = int(os.getenv("VISITS_CLOSING_HOUR", "18"))
+
+# Autocompletar ciudadanos (visits/suggest.py): índice en memoria por proceso
+CITIZEN_SUGGEST_MAX_CITIZENS = int(os.getenv("CITIZEN_SUGGEST_MAX_CITIZENS", "200000"))
+CITIZEN_SUGGEST_REFRESH_SECONDS = int(os.getenv("CITIZEN_SUGGEST_REFRESH_SECONDS", "30"))
+CITIZEN_SUGGEST_WARM_ON_STARTUP = os.getenv("CITIZEN_SUGGEST_WARM_ON_STARTUP", "1") == "1"
+
+# Bitácora en segundo plano (auditlog/writer.py): cola acotada por proceso,
+# INSERT por lotes cada AUDIT_BATCH_SIZE registros o AUDIT_FLUSH_MS ms
+AUDIT_ASYNC = os.getenv("AUDIT_ASYNC", "1") == "1"
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_MS = float(os.getenv("AUDIT_FLUSH_MS", "500"))
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+
+# Destinos de la bitácora (auditlog/sinks.py), rutas separadas por coma.
+# JSONLFileSink: segmentos en AUDIT_FILE_DIR, rotados por tamaño o edad y comprimidos
+AUDIT_SINKS = [s.strip() for s in os.getenv("AUDIT_SINKS", "auditlog.sinks.DatabaseSink").split(",") if s.strip()]
+AUDIT_FILE_DIR = Path(os.getenv("AUDIT_FILE_DIR", str(BASE_DIR / "audit")))
+AUDIT_FILE_MAX_MB = float(os.getenv("AUDIT_FILE_MAX_MB", "64"))
+AUDIT_FILE_ROTATE_SECONDS = float(os.getenv("AUDIT_FILE_ROTATE_SECONDS", "3600"))
+
+# Particiones mensuales de la bitácora en PostgreSQL (manage.py audit_partitions):
+# meses creados por adelantado y meses que se conservan (0 = sin retención)
+AUDIT_PARTITION_AHEAD_MONTHS = int(os.getenv("AUDIT_PARTITION_AHEAD_MONTHS", "3"))
+AUDIT_RETENTION_MONTHS = int(os.getenv("AUDIT_RETENTION_MONTHS", "0"))
+# Espera máxima por los bloqueos del DDL de particiones: el cron falla en lugar de frenar la bitácora
+AUDIT_PARTITION_LOCK_TIMEOUT_MS = int(os.getenv("AUDIT_PARTITION_LOCK_TIMEOUT_MS", "5000"))
+
+# Caché de temas por worker (catalog/cache.py): cada cuánto se compara la versión en BD
+CATALOG_VERSION_CHECK_SECONDS = float(os.getenv("CATALOG_VERSION_CHECK_SECONDS", "5"))
@@ -9,3 +9,7 @@ DATABASES = {
         "NAME": BASE_DIR / "db.sqlite3",
     }
 }
+
+# SQLite admite un solo escritor: en dev (y en las pruebas) la bitácora se
+# escribe en línea salvo que se pida lo contrario
+AUDIT_ASYNC = os.getenv("AUDIT_ASYNC", "0") == "1"
@@ -0,0 +1,96 @@
+"""
+Respuesta normalizada opcional (?sideload=1).
+
+Cada entidad relacionada viaja una sola vez en "included", agrupada por tipo
+y con llave = id; en los datos principales queda solo su id:
+
+    {
+      "results": [{"id": 7, "citizen": 12, ...}, {"id": 9, "citizen": 12, ...}],
+      "included": {"citizens": {"12": {"id": 12, "name": "...", ...}}}
+    }
+
+Las relaciones se describen como {campo: (tipo, {subrelaciones})}:
+
+    VISIT_RELATIONS = {"case": ("cases", {"citizen": ("citizens", {})})}
+
+Un objeto anidado sin "id" (p. ej. recortado con ?fields=) se deja embebido.
+"""
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
+from rest_framework import serializers
+
+SIDELOAD_PARAM = "sideload"
+
+SIDELOAD_PARAMETER = OpenApiParameter(
+    SIDELOAD_PARAM, OpenApiTypes.BOOL, OpenApiParameter.QUERY,
+    description="Respuesta normalizada: relaciones por id y entidades una sola vez en 'included'.",
+)
+
+
+def wants_sideload(request) -> bool:
+    return request.query_params.get(SIDELOAD_PARAM) in ("1", "true", "yes")
+
+
+class Included:
+    def __init__(self):
+        self.data = {}
+
+    def add(self, type_: str, obj: dict):
+        """
+        Guarda obj (si no estaba) y retorna su id para usarlo como referencia.
+        """
+        self.data.setdefault(type_, {}).setdefault(str(obj["id"]), obj)
+        return obj["id"]
+
+    def ref(self, type_: str, obj):
+        # None y objetos sin id se dejan tal cual
+        if not isinstance(obj, dict) or "id" not in obj:
+            return obj
+        return self.add(type_, obj)
+
+
+def normalize(row: dict, relations: dict, included: Included) -> dict:
+    """
+    Copia de row con las relaciones reemplazadas por su id (recursivo).
+    """
+    out = dict(row)
+    for field, (type_, nested) in relations.items():
+        value = out.get(field)
+        if isinstance(value, dict) and "id" in value:
+            out[field] = included.add(type_, normalize(value, nested, included))
+    return out
+
+
+def normalize_rows(rows, relations: dict, included: Included) -> list:
+    return [normalize(row, relations, included) for row in rows]
+
+
+def sideload_serializer(list_serializer, relations: dict, included: Included) -> list:
+    """
+    Para un ListSerializer con instancias: cada relación anidada de primer nivel
+    ({campo: tipo}) se serializa una vez por objeto distinto, y en las filas
+    queda su clave primaria. Evita repetir el to_representation del anidado.
+    """
+    child = list_serializer.child
+    instances = list(list_serializer.instance)
+    for field_name, type_ in relations.items():
+        nested = child.fields.get(field_name)
+        if not isinstance(nested, serializers.Serializer) or "id" not in nested.fields:
+            continue
+        related = {}
+        for instance in instances:
+            obj = nested.get_attribute(instance)
+            if obj is not None:
+                related.setdefault(obj.pk, obj)
+        for obj in related.values():
+            included.add(type_, nested.to_representation(obj))
+        kwargs = {"source": nested.source} if nested.source != field_name else {}
+        child.fields[field_name] = serializers.PrimaryKeyRelatedField(read_only=True, **kwargs)
+    return list_serializer.data
+
+
+def with_included(response, included: Included):
+    """
+    Agrega "included" a una respuesta paginada ({..., "results": [...]}).
+    """
+    response.data["included"] = included.data
+    return response
@@ -0,0 +1,121 @@
+import io
+import uuid
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils.translation import gettext_lazy
+from drf_spectacular.generators import EndpointEnumerator
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from catalog.cache import topic_catalog
+from catalog.models import Topic
+from .parsers import ORJSONParser
+from .renderers import ORJSONRenderer
+
+User = get_user_model()
+
+
+class ORJSONRendererTest(TestCase):
+    def assertSameJSON(self, data, **kwargs):
+        self.assertEqual(ORJSONRenderer().render(data, **kwargs), JSONRenderer().render(data, **kwargs))
+
+    def test_same_bytes_as_drf_renderer(self):
+        gt = ZoneInfo("America/Guatemala")
+        self.assertSameJSON({
+            "utc": datetime(2026, 3, 1, 14, 5, 9, tzinfo=dt_timezone.utc),
+            "local": datetime(2026, 3, 1, 8, 5, 9, 123456, tzinfo=gt),
+            "naive": datetime(2026, 3, 1, 8, 5),
+            "date": date(2026, 3, 1),
+            "time": time(8, 30, 0, 500),
+            "delta": timedelta(minutes=90),
+            "decimal": Decimal("12.50"),
+            "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "lazy": gettext_lazy("Inicio"),
+            "text": "Ñandú – línea separada",
+            "nested": [{"a": (1, 2.5, None, True)}],
+            1: "llave entera",
+        })
+        self.assertSameJSON(Topic.objects.none().values())
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_indent_and_big_ints_fall_back(self):
+        data = {"n": 2 ** 70, "items": [1, 2]}
+        self.assertSameJSON(data)
+        self.assertSameJSON(data, accepted_media_type="application/json; indent=4")
+
+
+class ORJSONParserTest(TestCase):
+    def parse(self, raw: bytes, parser=None):
+        return (parser or ORJSONParser()).parse(io.BytesIO(raw), "application/json", {"encoding": "utf-8"})
+
+    def test_same_result_as_drf_parser(self):
+        raw = '{"name": "José Pérez", "n": [1, 2.5, null, true], "s": "\\u00f1"}'.encode()
+        self.assertEqual(self.parse(raw), self.parse(raw, JSONParser()))
+
+    def test_invalid_json_and_non_finite(self):
+        for raw in (b'{"a": ', b'{"a": NaN}', b"[Infinity]"):
+            with self.subTest(raw=raw), self.assertRaises(ParseError):
+                self.parse(raw)
+
+    def test_big_ints_and_orjson_rejects_use_drf_parser(self):
+        for raw in (b'{"n": 123456789012345678901234567890}', b'[-9223372036854775809, 1e16]', b'["\\ud800"]'):
+            with self.subTest(raw=raw):
+                self.assertEqual(self.parse(raw), self.parse(raw, JSONParser()))
+        self.assertEqual(self.parse(b'{"n": 123456789012345678901234567890}')["n"], 123456789012345678901234567890)
+
+    def test_other_charset_uses_drf_parser(self):
+        raw = '{"name": "Peña"}'.encode("latin-1")
+        data = ORJSONParser().parse(io.BytesIO(raw), "application/json", {"encoding": "latin-1"})
+        self.assertEqual(data, {"name": "Peña"})
+
+
+class EndpointCompatibilityTest(TestCase):
+    """
+    Cada GET del API: la respuesta servida con orjson es idéntica byte a byte
+    a la que generaría el JSONRenderer de DRF con los mismos datos.
+    """
+    LIST_PARAMS = {"q": "mar", "name": "maria", "from": "2000-01-01", "to": "2100-01-01"}
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(username="admin", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.topic = Topic.objects.create(code="TRAM-201", name="Constancia de residencia", unit="Secretaría")
+        topic_catalog.active()
+        for dpi, name in (("9900001", "María Ñuñez"), ("9900002", "José Pérez")):
+            payload = {"citizen": {"dpi": dpi, "name": name, "origin": "Antigua"},
+                       "topic_id": self.topic.id, "target_unit": "Secretaría", "reason": "Trámite"}
+            res = self.client.post("/api/visits/visits/", payload, format="json")
+            self.assertEqual(res.status_code, 201)
+        self.client.patch(f"/api/visits/visits/{res.data['id']}/checkout/", format="json")
+
+    def _paths(self):
+        for path, _, method, callback in EndpointEnumerator().get_api_endpoints():
+            if method != "GET" or callback.cls.__module__.startswith("drf_spectacular"):
+                continue
+            params = self.LIST_PARAMS
+            if "{pk}" in path:
+                queryset = getattr(callback.cls, "queryset", None)
+                pk = queryset.model.objects.order_by("pk").values_list("pk", flat=True).first() if queryset is not None else None
+                if pk is None:
+                    continue
+                path, params = path.replace("{pk}", str(pk)), {}
+            yield path, params
+
+    def test_every_get_endpoint(self):
+        checked = 0
+        for path, params in self._paths():
+            with self.subTest(path=path):
+                res = self.client.get(path, params)
+                if not isinstance(getattr(res, "accepted_renderer", None), ORJSONRenderer):
+                    continue  # PDF del gafete
+                self.assertEqual(res.status_code, 200)
+                self.assertEqual(res.content, JSONRenderer().render(res.data))
+                checked += 1
+        self.assertGreater(checked, 20)
@@ -2,11 +2,11 @@ from django.contrib import admin
 from django.urls import path, include
 from core.views import healthcheck
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenVerifyView
 from django.conf import settings
 from django.conf.urls.static import static
 
-from users.views import LoginView
+from users.views import LoginView, LoginTokenRefreshView
 
 
 urlpatterns = [
@@ -27,7 +27,7 @@ urlpatterns = [
 
     # Auth (JWT)
     path("api/auth/jwt/create/", LoginView.as_view(), name="jwt-create"),
-    path("api/auth/jwt/refresh/", TokenRefreshView.as_view(), name="jwt-refresh"),
+    path("api/auth/jwt/refresh/", LoginTokenRefreshView.as_view(), name="jwt-refresh"),
     path("api/auth/jwt/verify/", TokenVerifyView.as_view(), name="jwt-verify"),
     # logout en users.urls -> /api/users/logout/
 ]
@@ -1,3 +1,7 @@
 from django.contrib import admin
+from .models import VisitDailyStat
 
-# Register your models here.
+@admin.register(VisitDailyStat)
+class VisitDailyStatAdmin(admin.ModelAdmin):
+    list_display = ("date", "topic", "target_unit", "checkins", "checkouts", "dwell_seconds")
+    list_filter = ("date", "topic", "target_unit")
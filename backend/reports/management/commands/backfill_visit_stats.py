@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from reports.models import VisitDailyStat
+from reports.rollup import compute_daily_stats
+from reports.utils import make_datetime_range, parse_date_param
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye VisitDailyStat desde Visit. Sin parámetros reconstruye todo; "
+        "con --from/--to (YYYY-MM-DD) solo ese rango de fechas de entrada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="from_date", default=None)
+        parser.add_argument("--to", dest="to_date", default=None)
+
+    def handle(self, *args, **options):
+        from_str, to_str = options["from_date"], options["to_date"]
+        if (from_str and not parse_date_param(from_str)) or (to_str and not parse_date_param(to_str)):
+            self.stderr.write(self.style.ERROR("Fechas inválidas; use YYYY-MM-DD."))
+            return
+
+        stats = VisitDailyStat.objects.all()
+        dt_from = dt_to = None
+        if from_str or to_str:
+            dt_from, dt_to = make_datetime_range(from_str or to_str, to_str or from_str, timezone.get_current_timezone())
+            d_from = parse_date_param(from_str or to_str)
+            d_to = max(parse_date_param(to_str or from_str), d_from)
+            stats = stats.filter(date__gte=d_from, date__lte=d_to)
+
+        with transaction.atomic():
+            # Primero el bloqueo y después la agregación (igual que rebuild_occupancy):
+            # un check-in/checkout que confirme entre ambos quedaría contado dos
+            # veces o perdido. En PostgreSQL se bloquea la tabla, también para las
+            # claves nuevas; los check-ins concurrentes esperan y suman sobre los
+            # valores reconstruidos.
+            if connection.vendor == "postgresql":
+                table = connection.ops.quote_name(VisitDailyStat._meta.db_table)
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+            else:
+                list(stats.select_for_update().values_list("id", flat=True))
+            rows = [
+                VisitDailyStat(
+                    date=r["day"],
+                    topic_id=r["case__topic_id"],
+                    target_unit=r["target_unit"],
+                    checkins=r["n_checkins"],
+                    checkouts=r["n_checkouts"],
+                    dwell_seconds=int(r["dwell"].total_seconds()) if r["dwell"] else 0,
+                )
+                for r in compute_daily_stats(dt_from, dt_to)
+            ]
+            deleted, _ = stats.delete()
+            VisitDailyStat.objects.bulk_create(rows, batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(f"Resumen diario reconstruido: {len(rows)} filas (antes {deleted})."))
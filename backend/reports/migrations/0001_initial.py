@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-17 19:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('catalog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VisitDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('target_unit', models.CharField(max_length=128)),
+                ('checkins', models.BigIntegerField(default=0)),
+                ('checkouts', models.BigIntegerField(default=0)),
+                ('dwell_seconds', models.BigIntegerField(default=0)),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='daily_stats', to='catalog.topic')),
+            ],
+            options={
+                'verbose_name': 'Estadística diaria de visitas',
+                'verbose_name_plural': 'Estadísticas diarias de visitas',
+                'ordering': ['-date'],
+                'unique_together': {('date', 'topic', 'target_unit')},
+            },
+        ),
+    ]
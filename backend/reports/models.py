@@ -1,3 +1,26 @@
 from django.db import models
+from catalog.models import Topic
 
-# Create your models here.
+
+class VisitDailyStat(models.Model):
+    """
+    Resumen diario por (fecha local de entrada, tema, unidad destino).
+    Se mantiene en cada check-in/check-out; las salidas y la permanencia
+    se acumulan en el día de la entrada de la visita.
+    Reconstrucción: manage.py backfill_visit_stats
+    """
+    date = models.DateField()
+    topic = models.ForeignKey(Topic, on_delete=models.PROTECT, related_name="daily_stats")
+    target_unit = models.CharField(max_length=128)
+    checkins = models.BigIntegerField(default=0)
+    checkouts = models.BigIntegerField(default=0)
+    dwell_seconds = models.BigIntegerField(default=0)   # suma de (checkout_at - checkin_at)
+
+    class Meta:
+        unique_together = [("date", "topic", "target_unit")]
+        ordering = ["-date"]
+        verbose_name = "Estadística diaria de visitas"
+        verbose_name_plural = "Estadísticas diarias de visitas"
+
+    def __str__(self):
+        return f"{self.date} — {self.topic_id} — {self.target_unit}: {self.checkins}"
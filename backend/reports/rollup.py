@@ -0,0 +1,55 @@
+"""
+Mantenimiento incremental de VisitDailyStat (ver reports/models.py).
+"""
+from collections import defaultdict
+
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from visits.counters import upsert_increment
+from visits.models import Visit
+from .models import VisitDailyStat
+
+
+def bump_daily_stats(checkins=(), checkouts=(), sign: int = 1):
+    """
+    checkins:  iterable de (checkin_at, topic_id, target_unit)
+    checkouts: iterable de (checkin_at, checkout_at, topic_id, target_unit)
+    Un solo UPSERT con suma para todas las combinaciones afectadas.
+    """
+    acc = defaultdict(lambda: [0, 0, 0])
+    for checkin_at, topic_id, unit in checkins:
+        acc[(timezone.localdate(checkin_at), topic_id, unit)][0] += 1
+    for checkin_at, checkout_at, topic_id, unit in checkouts:
+        counts = acc[(timezone.localdate(checkin_at), topic_id, unit)]
+        counts[1] += 1
+        counts[2] += int((checkout_at - checkin_at).total_seconds())
+    if not acc:
+        return
+    upsert_increment(
+        VisitDailyStat, ["date", "topic", "target_unit"], ["checkins", "checkouts", "dwell_seconds"],
+        [(*key, sign * c[0], sign * c[1], sign * c[2]) for key, c in sorted(acc.items())],
+    )
+
+
+def compute_daily_stats(dt_from=None, dt_to=None):
+    """
+    Agrega Visit por (fecha local de entrada, tema, unidad) en la base de datos.
+    """
+    tz = timezone.get_current_timezone()
+    qs = Visit.objects.all()
+    if dt_from:
+        qs = qs.filter(checkin_at__gte=dt_from)
+    if dt_to:
+        qs = qs.filter(checkin_at__lt=dt_to)
+    return (
+        qs.annotate(day=TruncDate("checkin_at", tzinfo=tz))
+        .values("day", "case__topic_id", "target_unit")
+        .annotate(
+            n_checkins=Count("id"),
+            n_checkouts=Count("checkout_at"),
+            dwell=Sum(F("checkout_at") - F("checkin_at")),
+        )
+        .order_by()
+    )
@@ -1,5 +1,60 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from catalog.models import Topic
+from .models import VisitDailyStat
+
+User = get_user_model()
+
 
 class ReportsSmokeTest(TestCase):
     def test_smoke(self):
         self.assertTrue(True)
+
+
+class VisitDailyStatTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="supervisor", password="x")
+        self.topic = Topic.objects.create(code="TRAM-010", name="Licencia", unit="Catastro")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def checkin(self, dpi, unit="Catastro"):
+        payload = {"citizen": {"dpi": dpi, "name": "X"}, "topic_id": self.topic.id, "target_unit": unit}
+        return self.client.post("/api/visits/visits/", payload, format="json").data
+
+    def test_rollup_is_maintained_and_served(self):
+        a = self.checkin("7000001")
+        self.checkin("7000002")
+        self.checkin("7000003", unit="Tesorería")
+        self.client.patch(f"/api/visits/visits/{a['id']}/checkout/", format="json")
+
+        stat = VisitDailyStat.objects.get(topic=self.topic, target_unit="Catastro")
+        self.assertEqual((stat.checkins, stat.checkouts), (2, 1))
+
+        with self.assertNumQueries(2):
+            res = self.client.get("/api/reports/stats/", {"group_by": "topic"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["results"], [
+            {"topic_id": self.topic.id, "checkins": 3, "checkouts": 1, "dwell_seconds": stat.dwell_seconds,
+             "avg_dwell_seconds": stat.dwell_seconds},
+        ])
+        self.assertEqual(self.client.get("/api/reports/stats/", {"group_by": "week"}).status_code, 400)
+
+    def test_backfill_rebuilds_from_visits(self):
+        self.checkin("7000004")
+        VisitDailyStat.objects.all().delete()
+        today = timezone.localdate().isoformat()
+        call_command("backfill_visit_stats", "--from", today, "--to", today, stdout=StringIO())
+        stat = VisitDailyStat.objects.get()
+        self.assertEqual((stat.date, stat.checkins, stat.checkouts), (timezone.localdate(), 1, 0))
+
+        yesterday = (timezone.localdate() - timedelta(days=1)).isoformat()
+        res = self.client.get("/api/reports/stats/", {"from": yesterday, "group_by": "date"})
+        self.assertEqual(res.data["totals"]["checkins"], 1)
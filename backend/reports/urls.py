@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import ReportsPlaceholderAPIView,VisitsReportAPIView
+from .views import ReportsPlaceholderAPIView,VisitsReportAPIView, VisitStatsAPIView
 
 urlpatterns = [
     path("placeholder/", ReportsPlaceholderAPIView.as_view(), name="reports-placeholder"),
     path("visits", VisitsReportAPIView.as_view(), name="reports-visits"),
+    path("stats/", VisitStatsAPIView.as_view(), name="reports-stats"),
 ]
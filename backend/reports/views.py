@@ -7,11 +7,15 @@ from rest_framework.permissions import IsAuthenticated
 
 from django.utils import timezone
 
+from django.db.models import Sum
+
 from visits.models import Visit
-from visits.serializers import VisitSerializer  # opcional si quieres exponer JSON en el futuro
-from .utils import make_datetime_range
+from .models import VisitDailyStat
+from visits.projections import visit_rows
+from .utils import make_datetime_range, parse_date_param
 from .pdf import render_visits_report_pdf
-from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.renderers import BaseRenderer
+from core.renderers import ORJSONRenderer
 
 
 from drf_spectacular.utils import (
@@ -39,11 +43,12 @@ class PDFRenderer(BaseRenderer):
 class VisitsReportAPIView(APIView):
     """
     GET /api/reports/visits?from=YYYY-MM-DD&to=YYYY-MM-DD&citizen=<id|texto>
-    - 'citizen' puede ser id (numérico) o un nombre parcial (icontains).
+    - 'citizen' puede ser id (numérico) o un nombre parcial (sin distinguir tildes ni mayúsculas).
     Respuesta: PDF (application/pdf).
     """
     permission_classes = [IsAuthenticated]
-    renderer_classes = [JSONRenderer, PDFRenderer]
+    renderer_classes = [ORJSONRenderer, PDFRenderer]
+    MAX_ROWS = 2000
 
     def get_queryset(self, request):
         q = Visit.objects.select_related("case", "case__citizen", "case__topic").all()
@@ -60,14 +65,13 @@ class VisitsReportAPIView(APIView):
             if citizen_param.isdigit():
                 q = q.filter(case__citizen__id=int(citizen_param))
             else:
-                q = q.filter(case__citizen__name__icontains=citizen_param)
+                q = q.filter(case__citizen__name_search__normalized=citizen_param)
 
         # Podríamos añadir más filtros aquí si fuese necesario (topic, unidad, etc.)
         return q.order_by("-checkin_at")
 
     def get(self, request):
         qs = self.get_queryset(request)
-        visits = list(qs[:2000])
         total = qs.count()
 
         from_str = request.query_params.get("from") or ""
@@ -76,13 +80,14 @@ class VisitsReportAPIView(APIView):
 
         # Si el cliente pide JSON (para vista previa)
         if request.query_params.get("format") == "json" or request.accepted_renderer.format == "json":
-            from visits.serializers import VisitSerializer
-            ser = VisitSerializer(visits, many=True)
+            # Proyección con .values() (visits/projections.py), mismo JSON que VisitSerializer
             return Response({
                 "total": total,
-                "results": ser.data,
+                "results": visit_rows(qs[:self.MAX_ROWS]),
             })
 
+        visits = list(qs[:self.MAX_ROWS])
+
         # PDF (por defecto)
         title = "Reporte de Visitas"
         subtitle = [
@@ -100,3 +105,62 @@ class VisitsReportAPIView(APIView):
         else:
             response["Content-Disposition"] = f'inline; filename="{filename}"'
         return response
+
+
+class VisitStatsAPIView(APIView):
+    """
+    GET /api/reports/stats/?from=YYYY-MM-DD&to=YYYY-MM-DD&topic=<id>&target_unit=<texto>&group_by=date,topic,target_unit
+    Estadísticas históricas servidas solo desde el resumen diario (VisitDailyStat),
+    sin recorrer Visit. Fechas por día local de entrada; por defecto, hoy.
+    - group_by: cualquier combinación de date, topic, target_unit (por defecto las tres).
+    """
+    permission_classes = [IsAuthenticated]
+
+    GROUP_FIELDS = {"date": "date", "topic": "topic_id", "target_unit": "target_unit"}
+
+    def get(self, request):
+        today = timezone.localdate()
+        d_from = parse_date_param(request.query_params.get("from")) or today
+        d_to = parse_date_param(request.query_params.get("to")) or today
+        if d_to < d_from:
+            d_to = d_from
+
+        group_param = request.query_params.get("group_by") or "date,topic,target_unit"
+        group_by = [g.strip() for g in group_param.split(",") if g.strip()]
+        invalid = [g for g in group_by if g not in self.GROUP_FIELDS]
+        if invalid:
+            return Response({"detail": f"group_by inválido: {', '.join(invalid)}"}, status=400)
+
+        qs = VisitDailyStat.objects.filter(date__gte=d_from, date__lte=d_to)
+        topic = (request.query_params.get("topic") or "").strip()
+        if topic:
+            if not topic.isdigit():
+                return Response({"detail": "topic debe ser un id numérico."}, status=400)
+            qs = qs.filter(topic_id=int(topic))
+        unit = (request.query_params.get("target_unit") or "").strip()
+        if unit:
+            qs = qs.filter(target_unit=unit)
+
+        sums = {"checkins": Sum("checkins"), "checkouts": Sum("checkouts"), "dwell_seconds": Sum("dwell_seconds")}
+        fields = [self.GROUP_FIELDS[g] for g in group_by]
+        rows = qs.values(*fields).annotate(**sums).order_by(*fields) if fields else []
+        totals = qs.aggregate(**sums)
+
+        def _shape(row):
+            checkouts = row["checkouts"] or 0
+            dwell = row["dwell_seconds"] or 0
+            return {
+                **{k: row[k] for k in fields if k in row},
+                "checkins": row["checkins"] or 0,
+                "checkouts": checkouts,
+                "dwell_seconds": dwell,
+                "avg_dwell_seconds": round(dwell / checkouts) if checkouts else None,
+            }
+
+        return Response({
+            "from": d_from.isoformat(),
+            "to": d_to.isoformat(),
+            "group_by": group_by,
+            "totals": _shape(totals),
+            "results": [_shape(r) for r in rows],
+        })
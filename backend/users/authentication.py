@@ -0,0 +1,131 @@
+"""
+Autenticación JWT sin consultar el usuario en cada petición.
+
+JWTAuthentication de simplejwt lee la fila de User en cada llamada (la consulta
+más frecuente del sistema, por los escritorios que consultan stats/active).
+ClaimsJWTAuthentication arma un ClaimsUser con los claims firmados (id,
+username, roles, is_superuser) y solo carga el User real cuando la vista usa
+un atributo que no viene en el token (nombre, correo, save(), ...).
+
+Revocación: is_active se revisa con una consulta liviana y el resultado se
+guarda JWT_ACTIVE_CHECK_SECONDS por usuario en cada proceso. Un usuario
+desactivado pierde acceso en ese plazo como máximo (de inmediato en el proceso
+que hizo el cambio, ver users/signals.py).
+
+Se activa con JWT_STATELESS_AUTH (settings); sin él se usa JWTAuthentication.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.base import ModelState
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .roles import SUPERUSER_CLAIM
+
+User = get_user_model()
+
+MAX_CACHED_USERS = 10_000
+
+
+class ActiveUserCache:
+    """
+    {user_id: (revisado_en, is_active)} por proceso.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    @property
+    def ttl(self) -> float:
+        return getattr(settings, "JWT_ACTIVE_CHECK_SECONDS", 60)
+
+    def is_active(self, user_id) -> bool:
+        now = time.monotonic()
+        entry = self._data.get(user_id)
+        if entry is not None and now - entry[0] < self.ttl:
+            return entry[1]
+        active = bool(User.objects.filter(pk=user_id).values_list("is_active", flat=True).first())
+        with self._lock:
+            if len(self._data) >= MAX_CACHED_USERS:
+                self._data.clear()
+            self._data[user_id] = (now, active)
+        return active
+
+    def forget(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+active_users = ActiveUserCache()
+
+
+class ClaimsUser:
+    """
+    Usuario del token. id/pk, username e is_superuser salen de los claims;
+    cualquier otro atributo carga el User real (una consulta, una sola vez).
+
+    Se puede asignar a llaves foráneas (Visit.intake_user, AuditLog.user) y
+    usar en filtros (filter(user=request.user)) sin cargar la fila:
+    isinstance(x, User) es verdadero y trae su propio _state y _meta.
+    """
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+    _meta = User._meta
+
+    def __init__(self, token):
+        self.token = token
+        self.id = self.pk = token[jwt_settings.USER_ID_CLAIM]
+        self.username = token.get("username", "")
+        self.is_superuser = bool(token.get(SUPERUSER_CLAIM, False))
+        self._state = ModelState()
+        self._state.db = DEFAULT_DB_ALIAS
+        self._state.adding = False
+
+    @property
+    def __class__(self):
+        return User
+
+    @cached_property
+    def user(self):
+        return User.objects.get(pk=self.pk)
+
+    def __getattr__(self, name):
+        # Solo se llama para atributos que no están en el token. Lo que User no
+        # define (hasattr del ORM: resolve_expression, ...) no carga la fila.
+        if name.startswith("__") or not hasattr(User, name):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __eq__(self, other):
+        return isinstance(other, User) and other.pk == self.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return self.username
+
+    def __repr__(self):
+        return f"<ClaimsUser: {self.username} ({self.pk})>"
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if jwt_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("El token no identifica a un usuario.")
+        user = ClaimsUser(validated_token)
+        if not active_users.is_active(user.pk):
+            raise AuthenticationFailed("Usuario inactivo o inexistente.", code="user_inactive")
+        return user
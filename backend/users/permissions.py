@@ -1,5 +1,7 @@
 from rest_framework.permissions import BasePermission
 
+from .roles import has_role
+
 # Definir el nombre del grupo de admin, igual que en catalog/permissions.py
 ADMIN_GROUP = "admin"
 
@@ -15,7 +17,7 @@ class IsInGroup(BasePermission):
             return False
         if not self.group_name:
             return False
-        return request.user.groups.filter(name=self.group_name).exists()
+        return has_role(request, self.group_name)
 
     @classmethod
     def as_group(cls, group_name: str):
@@ -36,7 +38,4 @@ class IsAdminUserOrGroup(BasePermission):
             return False
         
         # El permiso se concede si es superusuario O si está en el grupo admin
-        return (
-            request.user.is_superuser or
-            request.user.groups.filter(name=ADMIN_GROUP).exists()
-        )
+        return request.user.is_superuser or has_role(request, ADMIN_GROUP)
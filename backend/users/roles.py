@@ -0,0 +1,55 @@
+"""
+Roles (grupos de Django) del usuario de la petición, resueltos una sola vez.
+
+- El token de acceso lleva el claim "roles" (nombres de grupo) firmado al hacer
+  login y renovado en cada refresh (users/views.py). Mientras el token es
+  válido se confía en él: cambiar los grupos de un usuario surte efecto en su
+  siguiente refresh (ACCESS_TOKEN_LIFETIME como máximo).
+- Sin claim (tokens emitidos antes de este cambio, force_authenticate en
+  pruebas, sesión del admin) se consulta la BD una vez por petición.
+- El resultado se guarda en el Request de DRF: todos los permisos y
+  serializadores de la misma petición lo reutilizan.
+
+Uso en permisos:
+    from users.roles import has_role
+    has_role(request, "admin", "supervisor")
+"""
+ROLES_CLAIM = "roles"
+SUPERUSER_CLAIM = "is_superuser"
+
+
+def user_roles(user) -> frozenset:
+    if not user or not user.is_authenticated:
+        return frozenset()
+    return frozenset(user.groups.values_list("name", flat=True))
+
+
+def request_roles(request) -> frozenset:
+    """
+    Roles del claim del token si existe; si no, de la BD. Memorizado en el request.
+    """
+    cached = getattr(request, "_roles", None)
+    if cached is not None:
+        return cached
+    user = getattr(request, "user", None)
+    token = getattr(request, "auth", None)
+    claim = token.get(ROLES_CLAIM) if hasattr(token, "get") else None
+    if claim is not None and user and user.is_authenticated:
+        roles = frozenset(claim)
+    else:
+        roles = user_roles(user)
+    request._roles = roles
+    return roles
+
+
+def has_role(request, *names: str) -> bool:
+    return not request_roles(request).isdisjoint(names)
+
+
+def set_role_claims(token, user):
+    """
+    Claims firmados con los roles actuales (login y refresh).
+    """
+    token[ROLES_CLAIM] = sorted(user.groups.values_list("name", flat=True))
+    token[SUPERUSER_CLAIM] = user.is_superuser
+    return token
@@ -3,6 +3,8 @@ from django.contrib.auth.models import Group
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
+from .roles import request_roles, user_roles
+
 User = get_user_model()
 
 # --- Serializer existente para /users/me/ ---
@@ -15,7 +17,10 @@ class MeSerializer(serializers.ModelSerializer):
         fields = ["id", "username", "first_name", "last_name", "email", "is_active", "groups"]
 
     def get_groups(self, obj):
-        return list(obj.groups.values_list("name", flat=True))
+        # Mismos roles que usaron los permisos de esta petición (sin otra consulta)
+        request = self.context.get("request")
+        roles = request_roles(request) if request is not None and request.user is obj else user_roles(obj)
+        return sorted(roles)
 
 
 
@@ -36,7 +41,8 @@ class UserListSerializer(serializers.ModelSerializer):
 
     def get_groups(self, obj):
         # Devuelve una lista de nombres de grupos, ej: ["admin", "supervisor"]
-        return list(obj.groups.values_list("name", flat=True))
+        # (UserViewSet hace prefetch_related("groups"))
+        return [g.name for g in obj.groups.all()]
 
 
 # --- Serializer para Crear y Actualizar Usuarios (Escritura) ---
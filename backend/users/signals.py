@@ -0,0 +1,23 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from catalog.cache import bump_version
+from .authentication import active_users
+
+# Versión usada como validador del ETag de /api/users/groups/
+GROUPS = "groups"
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance: Group, **kwargs):
+    bump_version(GROUPS)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    # Desactivar/borrar un usuario invalida su estado en la caché de este proceso
+    active_users.forget(instance.pk)
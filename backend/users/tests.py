@@ -1,5 +1,140 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from auditlog.models import AuditLog
+from catalog.models import Topic
+from .authentication import active_users
+from .roles import ROLES_CLAIM
+
+User = get_user_model()
+
+LOGIN_URL = "/api/auth/jwt/create/"
+REFRESH_URL = "/api/auth/jwt/refresh/"
+TOPICS_URL = "/api/catalog/topics/"
+
 
 class UsersSmokeTest(TestCase):
     def test_smoke(self):
         self.assertTrue(True)
+
+
+class RoleClaimsTest(TestCase):
+    def setUp(self):
+        self.supervisor = Group.objects.create(name="supervisor")
+        self.user = User.objects.create_user(username="sup", password="clave-123")
+        self.user.groups.add(self.supervisor)
+        self.client = APIClient()
+
+    def login(self):
+        res = self.client.post(LOGIN_URL, {"username": "sup", "password": "clave-123"}, format="json")
+        self.assertEqual(res.status_code, 200)
+        return res.data
+
+    def create_topic(self, access, code):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        return self.client.post(TOPICS_URL, {"code": code, "name": code, "unit": "Obras"}, format="json")
+
+    def test_login_token_carries_roles_and_permissions_skip_group_queries(self):
+        tokens = self.login()
+        self.assertEqual(AccessToken(tokens["access"])[ROLES_CLAIM], ["supervisor"])
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.create_topic(tokens["access"], "TRAM-301")
+        self.assertEqual(res.status_code, 201)
+        self.assertFalse([q for q in ctx.captured_queries if "auth_user_groups" in q["sql"]])
+
+        with CaptureQueriesContext(connection) as ctx:
+            me = self.client.get("/api/users/me/").data
+        self.assertEqual(me["groups"], ["supervisor"])
+        self.assertFalse([q for q in ctx.captured_queries if "auth_user_groups" in q["sql"]])
+
+    def test_role_change_applies_on_refresh(self):
+        tokens = self.login()
+        self.user.groups.remove(self.supervisor)
+        # El token vigente conserva sus roles firmados
+        self.assertEqual(self.create_topic(tokens["access"], "TRAM-302").status_code, 201)
+
+        self.client.credentials()
+        refreshed = self.client.post(REFRESH_URL, {"refresh": tokens["refresh"]}, format="json").data
+        self.assertEqual(AccessToken(refreshed["access"])[ROLES_CLAIM], [])
+        self.assertEqual(self.create_topic(refreshed["access"], "TRAM-303").status_code, 403)
+
+    def test_inactive_user_cannot_refresh(self):
+        tokens = self.login()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        res = self.client.post(REFRESH_URL, {"refresh": tokens["refresh"]}, format="json")
+        self.assertEqual(res.status_code, 401)
+
+    def test_without_claim_roles_are_queried_once_per_request(self):
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get("/api/users/me/").data["groups"], ["supervisor"])
+        self.assertEqual(len([q for q in ctx.captured_queries if "auth_user_groups" in q["sql"]]), 1)
+
+
+class StatelessJWTAuthTest(TestCase):
+    def setUp(self):
+        active_users.clear()
+        self.user = User.objects.create_user(username="recepcion", password="clave-123", first_name="Ana")
+        self.client = APIClient()
+        with CaptureQueriesContext(connection) as ctx:
+            tokens = self.client.post(LOGIN_URL, {"username": "recepcion", "password": "clave-123"}, format="json").data
+        self.login_queries = ctx.captured_queries
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+
+    def user_selects(self, queries):
+        return [q for q in queries if 'FROM "auth_user" ' in q["sql"]]
+
+    def test_login_reads_user_once(self):
+        self.assertEqual(len(self.user_selects(self.login_queries)), 1)
+
+    def test_requests_do_not_load_user(self):
+        self.client.get("/api/visits/visits/stats/")
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get("/api/visits/visits/stats/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.user_selects(ctx.captured_queries), [])
+
+    def test_real_user_loaded_lazily_and_fk_assignment(self):
+        me = self.client.get("/api/users/me/").data
+        self.assertEqual((me["username"], me["first_name"]), ("recepcion", "Ana"))
+
+        topic = Topic.objects.create(code="TRAM-401", name="Consulta", unit="Atención")
+        payload = {"citizen": {"dpi": "8600001", "name": "X"}, "topic_id": topic.id, "target_unit": "Atención"}
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post("/api/visits/visits/", payload, format="json")
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data["intake_user"], self.user.id)
+        self.assertEqual(self.user_selects(ctx.captured_queries), [])
+        self.assertEqual(AuditLog.objects.filter(action="visit_checkin").get().user_id, self.user.id)
+
+    def test_idempotent_writes_do_not_load_user(self):
+        topic = Topic.objects.create(code="TRAM-402", name="Consulta", unit="Atención")
+        self.client.get("/api/visits/visits/stats/")  # is_active ya en caché
+        payload = {"citizen": {"dpi": "8600002", "name": "X"}, "topic_id": topic.id, "target_unit": "Atención"}
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post("/api/visits/visits/", payload, format="json", HTTP_IDEMPOTENCY_KEY="in-1")
+            self.assertEqual(res.status_code, 201)
+            replay = self.client.post("/api/visits/visits/", payload, format="json", HTTP_IDEMPOTENCY_KEY="in-1")
+            self.assertEqual(replay["Idempotent-Replayed"], "true")
+            out = self.client.patch("/api/visits/visits/checkout/", {"badge_code": res.data["badge_code"]},
+                                    format="json", HTTP_IDEMPOTENCY_KEY="out-1")
+            self.assertEqual(out.status_code, 200)
+        self.assertEqual(self.user_selects(ctx.captured_queries), [])
+
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.client.get("/api/users/me/").status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get("/api/users/me/").status_code, 401)
+
+    def test_other_process_deactivation_after_ttl(self):
+        self.assertEqual(self.client.get("/api/users/me/").status_code, 200)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)  # sin señal en este proceso
+        self.assertEqual(self.client.get("/api/users/me/").status_code, 200)  # dentro del TTL
+        with self.settings(JWT_ACTIVE_CHECK_SECONDS=0):
+            self.assertEqual(self.client.get("/api/users/me/").status_code, 401)
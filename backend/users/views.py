@@ -7,9 +7,11 @@ from rest_framework import status, viewsets, serializers
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
@@ -20,10 +22,14 @@ from drf_spectacular.utils import (
 )
 
 from auditlog.utils import log_action, get_client_ip
+from catalog.cache import current_version
+from core.conditional import conditional
+from .signals import GROUPS
 from .serializers import (
     MeSerializer, UserListSerializer, UserCreateUpdateSerializer
 )
 from .permissions import IsAdminUserOrGroup
+from .roles import set_role_claims
 
 User = get_user_model()
 
@@ -36,7 +42,7 @@ class MeAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        data = MeSerializer(request.user).data
+        data = MeSerializer(request.user, context={"request": request}).data
         return Response(data, status=200)
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -60,43 +66,62 @@ class LogoutAPIView(APIView):
     
 
 class LoginTokenObtainPairSerializer(TokenObtainPairSerializer):
-    # Puedes personalizar claims si lo deseas
+    # Claims firmados: username y roles (users/roles.py), para no consultar grupos en cada petición
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
         token["username"] = user.username
+        set_role_claims(token, user)
         return token
 
+
+class LoginTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh que vuelve a leer los roles: un cambio de grupos se refleja en el
+    siguiente token de acceso. Un usuario desactivado ya no puede renovar.
+    """
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data["access"])
+        user = User.objects.filter(pk=access[jwt_settings.USER_ID_CLAIM], is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed("Usuario inactivo o inexistente.", code="user_inactive")
+        data["access"] = str(set_role_claims(access, user))
+        return data
+
+
+class LoginTokenRefreshView(TokenRefreshView):
+    serializer_class = LoginTokenRefreshSerializer
+
 class LoginView(TokenObtainPairView):
     serializer_class = LoginTokenObtainPairSerializer
 
     def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        # Si llegamos aquí, las credenciales fueron válidas
-        user = None
+        serializer = self.get_serializer(data=request.data)
         try:
-            # El serializer validó las credenciales; intenta obtener el usuario por username
-            username = request.data.get("username")
-            user = User.objects.filter(username=username).first()
-        except Exception:
-            user = None
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
 
+        # El serializer ya autenticó al usuario: se usa esa instancia para la bitácora
+        user = serializer.user
         log_action(
             user=user,
             action="login",
             entity="User",
-            entity_id=str(user.id) if user else "",
+            entity_id=str(user.id),
             payload=None,
             ip=get_client_ip(request),
         )
-        return response
+        return Response(serializer.validated_data, status=status.HTTP_200_OK)
 
 class UserViewSet(viewsets.ModelViewSet):
     """
     CRUD completo para la administración de Usuarios.
     Restringido a administradores.
     """
-    queryset = User.objects.all().order_by('username')
+    queryset = User.objects.all().prefetch_related("groups").order_by('username')
     
     # Permiso personalizado de la Tarea 2
     permission_classes = [IsAuthenticated, IsAdminUserOrGroup]
@@ -138,6 +163,7 @@ class GroupsListView(APIView):
         summary="Listar todos los Grupos (Roles)",
         responses={200: OpenApiResponse(response=serializers.ListSerializer(child=serializers.DictField()))}
     )
+    @conditional(lambda view, request: current_version(GROUPS))
     def get(self, request):
         groups = Group.objects.all().order_by('name').values("id", "name")
         return Response(list(groups), status=status.HTTP_200_OK)
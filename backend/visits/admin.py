@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Citizen, VisitCase, Visit
+from .models import Citizen, VisitCase, Visit, IngestedEvent
 
 @admin.register(Citizen)
 class CitizenAdmin(admin.ModelAdmin):
@@ -18,3 +18,9 @@ class VisitAdmin(admin.ModelAdmin):
     list_display = ("badge_code", "case", "checkin_at", "checkout_at", "intake_user", "target_unit")
     list_filter = ("target_unit", "checkin_at", "checkout_at")
     search_fields = ("badge_code", "case__code_persistente", "case__citizen__name", "target_unit")
+
+@admin.register(IngestedEvent)
+class IngestedEventAdmin(admin.ModelAdmin):
+    list_display = ("event_id", "event_type", "visit", "occurred_at", "received_at")
+    list_filter = ("event_type", "received_at")
+    search_fields = ("event_id", "visit__badge_code")
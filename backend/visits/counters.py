@@ -0,0 +1,87 @@
+"""
+Contadores incrementales (UPSERT con suma) para no recorrer Visit con COUNT(*).
+"""
+from collections import Counter
+
+from django.db import connection
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Visit, OccupancyCounter, OCCUPANCY_TOTAL
+
+
+def upsert_increment(model, key_fields: list[str], count_fields: list[str], rows: list[tuple]):
+    """
+    INSERT ... ON CONFLICT (key_fields) DO UPDATE SET c = c + EXCLUDED.c
+    en una sola sentencia. Cada fila: (*valores_llave, *incrementos).
+    Requiere un índice único sobre key_fields (PostgreSQL y SQLite >= 3.24).
+    """
+    if not rows:
+        return
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    columns = [model._meta.get_field(f).column for f in key_fields + count_fields]
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * len(columns)) + ")"] * len(rows))
+    updates = ", ".join(f"{qn(c)} = {table}.{qn(c)} + EXCLUDED.{qn(c)}" for c in columns[len(key_fields):])
+    sql = (
+        f"INSERT INTO {table} ({', '.join(qn(c) for c in columns)}) VALUES {placeholders} "
+        f"ON CONFLICT ({', '.join(qn(c) for c in columns[:len(key_fields)])}) DO UPDATE SET {updates}"
+    )
+    params = [value for row in rows for value in row]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _day_key(dt) -> str:
+    return timezone.localdate(dt).isoformat()
+
+
+def bump_occupancy(checkins=(), checkouts=(), sign: int = 1):
+    """
+    Suma (o resta con sign=-1) entradas/salidas a los contadores del día
+    local correspondiente y al total. `checkins`/`checkouts` son datetimes.
+    """
+    ins = Counter(_day_key(dt) for dt in checkins)
+    outs = Counter(_day_key(dt) for dt in checkouts)
+    if not ins and not outs:
+        return
+    ins[OCCUPANCY_TOTAL] = sum(ins.values())
+    outs[OCCUPANCY_TOTAL] = sum(outs.values())
+    upsert_increment(
+        OccupancyCounter, ["key"], ["checkins", "checkouts"],
+        [(key, sign * ins[key], sign * outs[key]) for key in sorted(set(ins) | set(outs))],
+    )
+
+
+def read_occupancy(day=None) -> dict:
+    """
+    Lectura O(1) para el dashboard: activos, entradas y salidas del día.
+    """
+    day_key = (day or timezone.localdate()).isoformat()
+    rows = {c.key: c for c in OccupancyCounter.objects.filter(key__in=[OCCUPANCY_TOTAL, day_key])}
+    total = rows.get(OCCUPANCY_TOTAL)
+    today = rows.get(day_key)
+    return {
+        "activos": total.active if total else 0,
+        "entradas_hoy": today.checkins if today else 0,
+        "salidas_hoy": today.checkouts if today else 0,
+    }
+
+
+def compute_occupancy() -> dict:
+    """
+    Recalcula los contadores desde Visit. Retorna {key: (checkins, checkouts)}.
+    """
+    tz = timezone.get_current_timezone()
+    out = {}
+    for field, pos in (("checkin_at", 0), ("checkout_at", 1)):
+        qs = (Visit.objects.filter(**{f"{field}__isnull": False})
+              .annotate(day=TruncDate(field, tzinfo=tz))
+              .values("day").annotate(n=Count("id")).order_by())
+        for row in qs:
+            counts = out.setdefault(row["day"].isoformat(), [0, 0])
+            counts[pos] = row["n"]
+    total = [sum(c[0] for c in out.values()), sum(c[1] for c in out.values())]
+    out[OCCUPANCY_TOTAL] = total
+    return {key: tuple(counts) for key, counts in out.items()}
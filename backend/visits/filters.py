@@ -1,10 +1,13 @@
 import django_filters
+from rest_framework.filters import SearchFilter
+
 from .models import Visit, VisitCase, Citizen
+from .search import full_text_search, search_documents_enabled
 
 class VisitFilter(django_filters.FilterSet):
     from_date = django_filters.DateTimeFilter(field_name="checkin_at", lookup_expr="gte")
     to_date = django_filters.DateTimeFilter(field_name="checkin_at", lookup_expr="lte")
-    citizen_name = django_filters.CharFilter(field_name="case__citizen__name", lookup_expr="icontains")
+    citizen_name = django_filters.CharFilter(field_name="case__citizen__name_search", lookup_expr="normalized")
     citizen_dpi = django_filters.CharFilter(field_name="case__citizen__dpi", lookup_expr="iexact")
     topic_id = django_filters.NumberFilter(field_name="case__topic__id")
     badge_code = django_filters.CharFilter(field_name="badge_code", lookup_expr="iexact")
@@ -17,10 +20,23 @@ class VisitFilter(django_filters.FilterSet):
 class VisitCaseFilter(django_filters.FilterSet):
     code_persistente = django_filters.CharFilter(field_name="code_persistente", lookup_expr="iexact")
     state = django_filters.CharFilter(field_name="state", lookup_expr="iexact")
-    citizen_name = django_filters.CharFilter(field_name="citizen__name", lookup_expr="icontains")
+    citizen_name = django_filters.CharFilter(field_name="citizen__name_search", lookup_expr="normalized")
     citizen_dpi = django_filters.CharFilter(field_name="citizen__dpi", lookup_expr="iexact")
     topic_id = django_filters.NumberFilter(field_name="topic__id")
 
     class Meta:
         model = VisitCase
         fields = ["code_persistente", "state", "citizen_name", "citizen_dpi", "topic_id"]
+
+
+class VisitSearchFilter(SearchFilter):
+    """
+    ?search= sobre visitas: en PostgreSQL usa el documento de texto completo
+    (Visit.search_document, índice GIN) ordenado por relevancia, salvo que se
+    pida ?ordering=. En otros motores cae a los search_fields con icontains.
+    """
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, "").strip()
+        if not term or not search_documents_enabled():
+            return super().filter_queryset(request, queryset, view)
+        return full_text_search(queryset, term, rank="ordering" not in request.query_params)
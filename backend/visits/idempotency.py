@@ -0,0 +1,127 @@
+"""
+Soporte de cabecera Idempotency-Key para las mutaciones de visitas.
+
+Uso:
+    @action(detail=False, methods=["post"])
+    @idempotent
+    def mi_accion(self, request): ...
+
+- Primera petición con la llave: se reserva la llave, se ejecuta la vista y se
+  guarda (status, cuerpo).
+- Reintento: se devuelve la respuesta guardada sin ejecutar la vista.
+- Duplicado concurrente: espera brevemente a que termine la primera ejecución;
+  si no termina a tiempo responde 409.
+- Las llaves expiran tras IDEMPOTENCY_KEY_TTL_SECONDS (ver purge_idempotency_keys).
+"""
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 64
+WAIT_INTERVAL = 0.1
+
+
+def _ttl() -> timedelta:
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_TTL_SECONDS", 24 * 3600))
+
+
+def purge_expired() -> int:
+    """
+    Elimina llaves vencidas. Retorna cuántas se eliminaron.
+    """
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=timezone.now() - _ttl()).delete()
+    return deleted
+
+
+def _replay(record: IdempotencyKey) -> Response:
+    response = Response(record.response, status=record.status_code)
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _conflict() -> Response:
+    return Response(
+        {"detail": "Solicitud en curso con la misma llave; reintente en unos segundos."},
+        status=status.HTTP_409_CONFLICT,
+    )
+
+
+def _claim(user, key: str, endpoint: str):
+    """
+    Reserva la llave. Retorna (registro, None) si esta petición debe ejecutarse,
+    o (None, Response) si debe responderse sin ejecutar la vista.
+    El caso frecuente (reintento ya resuelto) cuesta una sola consulta.
+    """
+    deadline = time.monotonic() + getattr(settings, "IDEMPOTENCY_WAIT_SECONDS", 2)
+    while True:
+        record = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if record is not None and record.created_at < timezone.now() - _ttl():
+            record.delete()
+            record = None
+
+        if record is None:
+            try:
+                with transaction.atomic():
+                    return IdempotencyKey.objects.create(user=user, key=key, endpoint=endpoint), None
+            except IntegrityError:
+                # Otra petición con la misma llave ganó la reserva
+                if time.monotonic() >= deadline:
+                    return None, _conflict()
+                continue
+
+        if record.endpoint != endpoint:
+            return None, Response(
+                {"detail": f"{HEADER} ya fue utilizada para otra operación."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if record.status_code is not None:
+            return None, _replay(record)
+        if time.monotonic() >= deadline:
+            return None, _conflict()
+        time.sleep(WAIT_INTERVAL)
+
+
+def idempotent(view_method):
+    """
+    Decorador para acciones de un ViewSet. Sin cabecera, la vista se ejecuta normal.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = (request.headers.get(HEADER) or "").strip()
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"detail": f"{HEADER} no puede exceder {MAX_KEY_LENGTH} caracteres."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        record, early = _claim(request.user, key, f"{request.method} {request.path}"[:160])
+        if early is not None:
+            return early
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            # Sin respuesta que guardar: se libera la llave para permitir el reintento
+            record.delete()
+            raise
+        if response.status_code >= 500 or not hasattr(response, "data"):
+            record.delete()
+            return response
+
+        record.status_code = response.status_code
+        record.response = response.data
+        record.save(update_fields=["status_code", "response"])
+        return response
+
+    return wrapper
@@ -0,0 +1,54 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from visits.models import Visit
+from visits.services import checkout_visits
+
+
+class Command(BaseCommand):
+    help = (
+        "Cierra las visitas que siguen abiertas a la hora de cierre local "
+        "(VISITS_CLOSING_HOUR). Idempotente: seguro para cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hour", type=int, default=None, help="Hora de cierre local (0-23).")
+        parser.add_argument("--dry-run", action="store_true", help="Solo muestra cuántas visitas se cerrarían.")
+
+    def handle(self, *args, **options):
+        hour = options["hour"] if options["hour"] is not None else getattr(settings, "VISITS_CLOSING_HOUR", 18)
+        tz = timezone.get_current_timezone()
+        now = timezone.localtime()
+
+        def closing(day):
+            return timezone.make_aware(datetime.combine(day, time(hour)), tz)
+
+        # Último cierre ya ocurrido: hoy si ya pasó la hora, si no ayer
+        last_day = now.date() if now >= closing(now.date()) else now.date() - timedelta(days=1)
+        cutoff = closing(last_day)
+
+        open_visits = Visit.objects.filter(checkout_at__isnull=True, checkin_at__lt=cutoff)
+        # Cada visita se cierra en el primer cierre posterior a su entrada
+        days = sorted({
+            (timezone.localtime(dt, tz) - timedelta(hours=hour)).date() + timedelta(days=1)
+            for dt in open_visits.values_list("checkin_at", flat=True)
+        })
+        if not days:
+            self.stdout.write(self.style.SUCCESS("No hay visitas abiertas antes del cierre."))
+            return
+
+        total = 0
+        for day in days:
+            window = open_visits.filter(checkin_at__gte=closing(day - timedelta(days=1)), checkin_at__lt=closing(day))
+            if options["dry_run"]:
+                count = window.count()
+            else:
+                count = len(checkout_visits(None, window, at=closing(day), extra={"auto": True}))
+            total += count
+            self.stdout.write(f"{day:%Y-%m-%d}: {count} visita(s) cerradas a las {hour:02d}:00")
+
+        verb = "se cerrarían" if options["dry_run"] else "cerradas"
+        self.stdout.write(self.style.SUCCESS(f"Total {verb}: {total}"))
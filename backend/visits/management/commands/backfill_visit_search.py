@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from visits.models import Visit
+from visits.search import refresh_search_documents, search_documents_enabled
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula Visit.search_document (búsqueda de texto completo) por lotes de id. "
+        "Solo aplica en PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--from-id", type=int, default=0, help="Reanudar desde este id (exclusivo).")
+
+    def handle(self, *args, **options):
+        if not search_documents_enabled():
+            self.stdout.write("El motor actual no usa search_document; nada que hacer.")
+            return
+
+        batch = max(1, options["batch_size"])
+        last = Visit.objects.aggregate(m=Max("id"))["m"] or 0
+        start, total = options["from_id"], 0
+        while start < last:
+            end = min(start + batch, last)
+            # Cada lote se confirma por separado: se puede reanudar con --from-id
+            total += refresh_search_documents(id_range=(start, end))
+            self.stdout.write(f"  hasta id {end}: {total} visitas")
+            start = end
+        self.stdout.write(self.style.SUCCESS(f"Documentos de búsqueda recalculados: {total}."))
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from visits.models import Visit
+from visits.projections import visit_rows
+from visits.serializers import VisitSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara filas/segundo de los listados de visitas: VisitSerializer anidado "
+        "contra la proyección con .values() (visits/projections.py). Solo lectura."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2000, help="Visitas más recientes a listar (default 2000).")
+        parser.add_argument("--repeat", type=int, default=5, help="Repeticiones; se reporta la mejor (default 5).")
+
+    def _best(self, fn, repeat):
+        best, out = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            out = fn()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, out
+
+    def handle(self, *args, **options):
+        qs = (Visit.objects.select_related("case", "case__citizen", "case__topic", "intake_user")
+              .order_by("-checkin_at", "-id")[: options["rows"]])
+        repeat = max(1, options["repeat"])
+
+        before, expected = self._best(lambda: VisitSerializer(qs, many=True).data, repeat)
+        after, rows = self._best(lambda: visit_rows(qs), repeat)
+        count = len(rows)
+        if not count:
+            self.stdout.write("No hay visitas para medir.")
+            return
+
+        if [dict(r) for r in expected] != rows:
+            self.stderr.write(self.style.ERROR("La proyección NO coincide con VisitSerializer."))
+
+        self.stdout.write(f"Filas: {count} (mejor de {repeat})")
+        self.stdout.write(f"VisitSerializer: {before * 1000:.1f} ms  ({count / before:,.0f} filas/s)")
+        self.stdout.write(f"Proyección:      {after * 1000:.1f} ms  ({count / after:,.0f} filas/s)")
+        self.stdout.write(self.style.SUCCESS(f"Aceleración: x{before / after:.1f}"))
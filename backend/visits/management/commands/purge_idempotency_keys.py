@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from visits.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Elimina las llaves de idempotencia vencidas (IDEMPOTENCY_KEY_TTL_SECONDS). Seguro para cron."
+
+    def handle(self, *args, **options):
+        deleted = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"Llaves de idempotencia eliminadas: {deleted}"))
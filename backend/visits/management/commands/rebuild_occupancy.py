@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from visits.counters import compute_occupancy
+from visits.models import OccupancyCounter
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye los contadores de ocupación (OccupancyCounter) desde Visit. "
+        "Usar --check para solo reportar diferencias."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="No escribe; solo muestra las diferencias.")
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            drift = self._report(compute_occupancy())
+            self.stdout.write(self.style.SUCCESS(f"Claves con diferencia: {len(drift)}"))
+            return
+
+        with transaction.atomic():
+            # Primero el bloqueo y después el conteo: un check-in/checkout que
+            # confirme entre ambos quedaría fuera de la reescritura. En PostgreSQL
+            # se bloquea la tabla (también las claves nuevas, que no tienen fila);
+            # los check-ins concurrentes esperan y suman sobre los valores nuevos.
+            if connection.vendor == "postgresql":
+                table = connection.ops.quote_name(OccupancyCounter._meta.db_table)
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+            else:
+                list(OccupancyCounter.objects.select_for_update().values_list("id", flat=True))
+            expected = compute_occupancy()
+            drift = self._report(expected)
+            OccupancyCounter.objects.all().delete()
+            OccupancyCounter.objects.bulk_create([
+                OccupancyCounter(key=key, checkins=ins, checkouts=outs)
+                for key, (ins, outs) in expected.items()
+            ])
+        self.stdout.write(self.style.SUCCESS(f"Contadores reconstruidos ({len(expected)} claves, {len(drift)} corregidas)."))
+
+    def _report(self, expected: dict) -> dict:
+        current = {c.key: (c.checkins, c.checkouts) for c in OccupancyCounter.objects.all()}
+        drift = {
+            key: (current.get(key, (0, 0)), expected.get(key, (0, 0)))
+            for key in set(expected) | set(current)
+            if current.get(key, (0, 0)) != expected.get(key, (0, 0))
+        }
+        for key in sorted(drift):
+            have, want = drift[key]
+            self.stdout.write(f"{key}: actual {have[0]}/{have[1]} -> esperado {want[0]}/{want[1]}")
+        return drift
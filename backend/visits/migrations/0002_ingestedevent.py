@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-17 19:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visits', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestedEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=64, unique=True)),
+                ('event_type', models.CharField(choices=[('checkin', 'Entrada'), ('checkout', 'Salida')], max_length=16)),
+                ('occurred_at', models.DateTimeField()),
+                ('received_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('visit', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ingested_events', to='visits.visit')),
+            ],
+            options={
+                'verbose_name': 'Evento sin conexión',
+                'verbose_name_plural': 'Eventos sin conexión',
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.6 on 2026-10-17 19:47
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def populate_counters(apps, schema_editor):
+    Visit = apps.get_model("visits", "Visit")
+    OccupancyCounter = apps.get_model("visits", "OccupancyCounter")
+    tz = timezone.get_current_timezone()
+    counts = {}
+    for field, pos in (("checkin_at", 0), ("checkout_at", 1)):
+        qs = (Visit.objects.filter(**{f"{field}__isnull": False})
+              .annotate(day=TruncDate(field, tzinfo=tz))
+              .values("day").annotate(n=Count("id")).order_by())
+        for row in qs:
+            counts.setdefault(row["day"].isoformat(), [0, 0])[pos] = row["n"]
+    if not counts:
+        return
+    counts["total"] = [sum(c[0] for c in counts.values()), sum(c[1] for c in counts.values())]
+    OccupancyCounter.objects.bulk_create([
+        OccupancyCounter(key=key, checkins=ins, checkouts=outs) for key, (ins, outs) in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visits', '0003_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccupancyCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=10, unique=True)),
+                ('checkins', models.BigIntegerField(default=0)),
+                ('checkouts', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contador de ocupación',
+                'verbose_name_plural': 'Contadores de ocupación',
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-17 19:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0001_initial'),
+        ('visits', '0004_occupancycounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='citizen',
+            index=models.Index(fields=['name', 'id'], name='citizen_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['checkin_at', 'id'], name='visit_checkin_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitcase',
+            index=models.Index(fields=['opened_at', 'id'], name='visitcase_opened_id_idx'),
+        ),
+    ]
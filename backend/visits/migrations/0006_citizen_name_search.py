@@ -0,0 +1,53 @@
+# Generated by Django 5.0.6 on 2026-10-17 19:54
+
+from django.db import migrations, models
+
+from visits.search import normalize_name
+
+BATCH_SIZE = 2000
+
+
+def populate_name_search(apps, schema_editor):
+    Citizen = apps.get_model("visits", "Citizen")
+    last_id = 0
+    while True:
+        batch = list(Citizen.objects.filter(id__gt=last_id).order_by("id").only("id", "name")[:BATCH_SIZE])
+        if not batch:
+            return
+        for citizen in batch:
+            citizen.name_search = normalize_name(citizen.name)
+        Citizen.objects.bulk_update(batch, ["name_search"])
+        last_id = batch[-1].id
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS citizen_name_search_trgm "
+        "ON visits_citizen USING gin (name_search gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS citizen_name_search_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visits', '0005_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='citizen',
+            name='name_search',
+            field=models.CharField(blank=True, default='', editable=False, max_length=128),
+        ),
+        migrations.RunPython(populate_name_search, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
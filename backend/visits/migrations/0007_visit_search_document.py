@@ -0,0 +1,37 @@
+# Generated by Django 5.0.6 on 2026-10-17 20:10
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # El contenido se llena con: manage.py backfill_visit_search
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS visit_search_document_gin "
+        "ON visits_visit USING gin (search_document)"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS visit_search_document_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visits', '0006_citizen_name_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='visit',
+            name='search_document',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
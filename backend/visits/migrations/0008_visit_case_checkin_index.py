@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-17 20:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visits', '0007_visit_search_document'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['case', 'checkin_at', 'id'], name='visit_case_checkin_idx'),
+        ),
+    ]
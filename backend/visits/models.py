@@ -2,7 +2,10 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.validators import RegexValidator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.contrib.postgres.search import SearchVectorField
 from catalog.models import Topic
+from .search import normalize_name
 
 User = get_user_model()
 
@@ -37,6 +40,8 @@ class Citizen(models.Model):
     )
     passport = models.CharField(max_length=32, unique=True, null=True, blank=True, db_index=True)
     name = models.CharField(max_length=128, db_index=True)
+    # Nombre normalizado para búsqueda (ver visits/search.py); índice trigram en PostgreSQL
+    name_search = models.CharField(max_length=128, blank=True, default="", editable=False)
     phone = models.CharField(max_length=20, validators=[phone_validator], blank=True, default="", db_index=True)
     origin = models.CharField(max_length=128, blank=True, default="", help_text="Procedencia / comunidad / municipio")
 
@@ -44,6 +49,7 @@ class Citizen(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
+        indexes = [models.Index(fields=["name", "id"], name="citizen_name_id_idx")]
         verbose_name = "Ciudadano"
         verbose_name_plural = "Ciudadanos"
 
@@ -51,6 +57,13 @@ class Citizen(models.Model):
         ident = self.dpi or self.passport or "SIN-ID"
         return f"{self.name} ({ident})"
 
+    def save(self, *args, **kwargs):
+        self.name_search = normalize_name(self.name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "name_search"}
+        super().save(*args, **kwargs)
+
     def has_identifier(self) -> bool:
         return bool(self.dpi or self.passport)
 
@@ -77,6 +90,7 @@ class VisitCase(models.Model):
 
     class Meta:
         unique_together = [("citizen", "topic")]
+        indexes = [models.Index(fields=["opened_at", "id"], name="visitcase_opened_id_idx")]
         verbose_name = "Expediente de Visita"
         verbose_name_plural = "Expedientes de Visita"
 
@@ -110,23 +124,107 @@ class Visit(models.Model):
     reason = models.CharField(max_length=256, blank=True, default="")
     photo_path = models.CharField(max_length=255, blank=True, default="")  # BE-05 lo convertirá a upload real
     badge_code = models.CharField(max_length=32, unique=True, db_index=True, blank=True)
+    # Documento de búsqueda (tsvector + GIN en PostgreSQL); ver visits/search.py
+    search_document = SearchVectorField(null=True, blank=True, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-checkin_at"]
+        indexes = [
+            models.Index(fields=["checkin_at", "id"], name="visit_checkin_id_idx"),
+            # Última visita por expediente (visits/resolver.py)
+            models.Index(fields=["case", "checkin_at", "id"], name="visit_case_checkin_idx"),
+        ]
         verbose_name = "Visita"
         verbose_name_plural = "Visitas"
 
     def __str__(self):
         return f"{self.badge_code or 'SIN-COD'} — {self.case.code_persistente}"
 
+    @staticmethod
+    def make_badge_code(visit_id: int, year: int | None = None) -> str:
+        # Código de gafete legible: VIS-<año>-<id con 6 dígitos>
+        y = year or timezone.now().year
+        return f"VIS-{y}-{visit_id:06d}"
+
     def save(self, *args, **kwargs):
         creating = self.pk is None
         super().save(*args, **kwargs)
         # Genera badge_code legible tras tener id
         if creating and not self.badge_code:
-            y = timezone.now().year
-            self.badge_code = f"VIS-{y}-{self.id:06d}"
+            self.badge_code = Visit.make_badge_code(self.id)
             super().save(update_fields=["badge_code"])
+
+
+EVENT_CHECKIN  = "checkin"
+EVENT_CHECKOUT = "checkout"
+
+EVENT_TYPES = [
+    (EVENT_CHECKIN, "Entrada"),
+    (EVENT_CHECKOUT, "Salida"),
+]
+
+class IngestedEvent(models.Model):
+    """
+    Evento de entrada/salida registrado sin conexión y reenviado en lote.
+    El event_id lo genera el cliente; permite descartar reenvíos duplicados.
+    """
+    event_id = models.CharField(max_length=64, unique=True)
+    event_type = models.CharField(max_length=16, choices=EVENT_TYPES)
+    visit = models.ForeignKey(Visit, null=True, blank=True, on_delete=models.SET_NULL, related_name="ingested_events")
+    occurred_at = models.DateTimeField()
+    received_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Evento sin conexión"
+        verbose_name_plural = "Eventos sin conexión"
+
+    def __str__(self):
+        return f"{self.event_type} {self.event_id}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Respuesta guardada por (usuario, Idempotency-Key) para que los reintentos
+    del frontend no repitan check-ins ni check-outs. status_code nulo = en curso.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="idempotency_keys")
+    key = models.CharField(max_length=64)
+    endpoint = models.CharField(max_length=160)          # "<METHOD> <path>"
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = [("user", "key")]
+        verbose_name = "Llave de idempotencia"
+        verbose_name_plural = "Llaves de idempotencia"
+
+    def __str__(self):
+        return f"{self.key} — {self.endpoint}"
+
+
+OCCUPANCY_TOTAL = "total"
+
+class OccupancyCounter(models.Model):
+    """
+    Contadores de ocupación mantenidos en cada check-in/check-out.
+    key = "total" (histórico) o la fecha local "YYYY-MM-DD".
+    Activos = total.checkins - total.checkouts.
+    """
+    key = models.CharField(max_length=10, unique=True)
+    checkins = models.BigIntegerField(default=0)
+    checkouts = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Contador de ocupación"
+        verbose_name_plural = "Contadores de ocupación"
+
+    def __str__(self):
+        return f"{self.key}: +{self.checkins} / -{self.checkouts}"
+
+    @property
+    def active(self) -> int:
+        return self.checkins - self.checkouts
@@ -0,0 +1,132 @@
+"""
+Lectura rápida de visitas para listados (sin ModelSerializer anidados).
+
+VisitSerializer anida VisitCaseSerializer y CitizenSerializer: una página de 20
+visitas crea ~60 serializadores y recorre campo por campo. Aquí se piden solo
+las columnas necesarias con .values() (un JOIN, sin instancias de modelo) y se
+arma el mismo JSON con diccionarios.
+
+Los campos salen de los Meta.fields de los serializadores, así que la forma de
+la respuesta no se separa de VisitSerializer (ver VisitProjectionTest).
+
+Con ?fields= / ?omit= (core/fieldsets.py) la proyección se recorta: solo se
+piden esas columnas y solo se hacen los JOIN de las relaciones incluidas.
+
+Uso:
+    rows = visit_rows(qs)                       # igual que VisitSerializer(qs, many=True).data
+    projection = visit_projection(fieldset)     # fieldset puede ser None
+    page = self.paginate_queryset(visit_values(qs, projection))
+    data = shape_visits(page, projection)       # filas planas -> JSON anidado
+
+Medición: manage.py bench_visit_listing
+"""
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .models import Citizen, Visit, VisitCase
+from .serializers import CitizenSerializer, VisitCaseSerializer, VisitSerializer
+
+# Respaldo para formatos distintos de ISO 8601 (mismo resultado que los serializadores)
+_datetime = serializers.DateTimeField()
+
+
+class Projection:
+    """
+    Columnas de un nivel (visita, expediente o ciudadano) en el orden del
+    serializador; `nested` es el nivel anidado bajo uno de esos campos.
+    """
+
+    def __init__(self, model, fields, prefix: str = "", nested: dict | None = None):
+        self.model = model
+        self.fields = tuple(fields)
+        self.prefix = prefix
+        self.nested = nested or {}
+        self.datetimes = frozenset(
+            f for f in self.fields
+            if f not in self.nested and model._meta.get_field(f).get_internal_type() == "DateTimeField"
+        )
+
+    def select(self, fieldset):
+        """
+        Copia recortada según el fieldset (None = completa).
+        """
+        if fieldset is None:
+            return self
+        fields = fieldset.names(self.fields)
+        nested = {name: level.select(fieldset.child(name)) for name, level in self.nested.items() if name in fields}
+        return Projection(self.model, fields, self.prefix, nested)
+
+    def values(self) -> list:
+        out = [self.prefix + f for f in self.fields if f not in self.nested]
+        for level in self.nested.values():
+            out += level.values()
+        return out
+
+    def shape(self, row: dict, fmt) -> dict:
+        # Recorre los campos en el orden del serializador
+        out = {}
+        for f in self.fields:
+            level = self.nested.get(f)
+            if level is not None:
+                out[f] = level.shape(row, fmt)
+                continue
+            value = row[self.prefix + f]
+            out[f] = fmt(value) if f in self.datetimes else value
+        return out
+
+
+VISIT_PROJECTION = Projection(Visit, VisitSerializer.Meta.fields, nested={
+    "case": Projection(VisitCase, VisitCaseSerializer.Meta.fields, "case__", nested={
+        "citizen": Projection(Citizen, CitizenSerializer.Meta.fields, "case__citizen__"),
+    }),
+})
+
+
+# Relaciones para la respuesta normalizada (?sideload=1, core/sideload.py)
+VISIT_RELATIONS = {"case": ("cases", {"citizen": ("citizens", {})})}
+
+
+def visit_projection(fieldset=None) -> Projection:
+    return VISIT_PROJECTION.select(fieldset)
+
+
+def datetime_formatter():
+    """
+    Igual que DateTimeField.to_representation, pero la zona horaria se resuelve
+    una vez por listado y no en cada valor (era la mayor parte del costo).
+    """
+    if not settings.USE_TZ or api_settings.DATETIME_FORMAT.lower() != ISO_8601:
+        return _datetime.to_representation
+    tz = timezone.get_current_timezone()
+
+    def fmt(value):
+        if not value:
+            return None
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return fmt
+
+
+def visit_values(qs, projection: Projection = VISIT_PROJECTION, extra=()):
+    """
+    Queryset de dicts planos con las columnas de la proyección (más `extra`,
+    p. ej. los campos del cursor). Conserva filtros y orden; select_related
+    deja de ser necesario.
+    """
+    columns = projection.values()
+    return qs.select_related(None).values(*columns, *(f for f in extra if f not in columns))
+
+
+def shape_visits(rows, projection: Projection = VISIT_PROJECTION) -> list[dict]:
+    """
+    Filas de visit_values() -> misma estructura que VisitSerializer(many=True).data.
+    """
+    fmt = datetime_formatter()
+    return [projection.shape(row, fmt) for row in rows]
+
+
+def visit_rows(qs, projection: Projection = VISIT_PROJECTION) -> list[dict]:
+    return shape_visits(visit_values(qs, projection), projection)
@@ -0,0 +1,217 @@
+"""
+Resolución de contexto para recepción (GET /api/visits/search/).
+
+Presupuesto de consultas (como máximo 2; antes 3):
+  -  Topic por id, código o nombre: desde la caché del catálogo (catalog/cache.py)
+  1. UNION de ciudadanos candidatos: case_code, DPI, teléfono y nombre, cada
+     rama con su prioridad; el nombre se ordena por similitud (visits/search.py)
+  2. Expedientes del ciudadano resuelto (con su tema) y los datos de su
+     última visita anotados como subconsultas (sin consulta aparte para last_visit)
+
+Prioridad (igual que antes): expediente por código > DPI exacto >
+teléfono exacto (si es único) > nombre (si es único); si no hay uno claro se
+devuelven candidatos.
+
+Con ?sideload=1 la respuesta va normalizada (normalize_search, core/sideload.py).
+"""
+from django.db import connection
+from django.db.models import Case, F, FloatField, IntegerField, OuterRef, Q, Subquery, Value, When
+
+from catalog.cache import topic_catalog
+from core.sideload import Included, normalize
+from .models import Citizen, Visit, VisitCase
+from .search import normalize_name, rank_by_name
+
+MAX_CANDIDATES = 10
+MAX_CASES = 50
+
+CITIZEN_FIELDS = ("id", "name", "dpi", "passport", "phone", "origin")
+CASE_FIELDS = ("id", "code_persistente", "citizen_id", "topic_id", "state", "opened_at", "closed_at")
+LAST_VISIT_FIELDS = ("id", "badge_code", "checkin_at", "checkout_at", "target_unit")
+
+# Prioridad de cada rama del UNION (menor = más fuerte)
+SOURCE_CASE, SOURCE_DPI, SOURCE_PHONE, SOURCE_NAME = 0, 1, 2, 3
+
+
+def _compact_topic(topic):
+    return {"id": topic.id, "code": topic.code, "name": topic.name}
+
+
+def resolve_topic(param: str):
+    """
+    Sin consultas: id exacto > código exacto/nombre único; si no, candidatos.
+    Retorna (topic_dict | None, [candidatos]).
+    """
+    topic, candidates = topic_catalog.find(param, limit=MAX_CANDIDATES)
+    return (_compact_topic(topic) if topic else None), [_compact_topic(t) for t in candidates]
+
+
+def _branch(qs, source: int, term: str | None = None, **extra):
+    """
+    Rama del UNION con columnas homogéneas. El límite va en una subconsulta
+    (algunos motores no permiten LIMIT directo dentro de un UNION).
+    """
+    if term is not None:
+        qs = Citizen.objects.filter(pk__in=rank_by_name(qs, term).values("pk")[:MAX_CANDIDATES])
+    score = Value(0.0, output_field=FloatField())
+    if term is not None and connection.vendor == "postgresql":
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        score = TrigramSimilarity("name_search", normalize_name(term))
+    return qs.annotate(
+        source=Value(source, output_field=IntegerField()),
+        score=score,
+        case_id=extra.get("case_id", Value(None, output_field=IntegerField())),
+        case_topic_id=extra.get("case_topic_id", Value(None, output_field=IntegerField())),
+    ).values(*CITIZEN_FIELDS, "source", "score", "case_id", "case_topic_id")
+
+
+def find_citizen_candidates(*, dpi="", phone="", name="", case_code="") -> list[dict]:
+    """
+    Una consulta UNION con todas las llaves recibidas.
+    """
+    branches = []
+    if case_code:
+        branches.append(_branch(
+            Citizen.objects.filter(cases__code_persistente__iexact=case_code), SOURCE_CASE,
+            case_id=F("cases__id"), case_topic_id=F("cases__topic_id"),
+        ))
+    if dpi:
+        branches.append(_branch(Citizen.objects.filter(dpi__iexact=dpi), SOURCE_DPI))
+    if phone:
+        branches.append(_branch(
+            Citizen.objects.filter(pk__in=Citizen.objects.filter(phone__iexact=phone).order_by("name", "id").values("pk")[:MAX_CANDIDATES]),
+            SOURCE_PHONE,
+        ))
+    if name:
+        branches.append(_branch(Citizen.objects.filter(name_search__normalized=name), SOURCE_NAME, term=name))
+    if not branches:
+        return []
+    first, *rest = branches
+    qs = first.union(*rest, all=True) if rest else first
+    return list(qs.order_by("source", "-score", "name"))
+
+
+def _pick(rows: list[dict]):
+    """
+    Aplica la prioridad sobre las filas del UNION. Retorna (citizen, candidatos, case_id, topic_id).
+    """
+    by_source = {}
+    for row in rows:
+        by_source.setdefault(row["source"], []).append(row)
+
+    citizen, candidates = None, []
+    dpi_rows = by_source.get(SOURCE_DPI)
+    if dpi_rows:
+        citizen = dpi_rows[0]
+    for source in (SOURCE_PHONE, SOURCE_NAME):
+        if citizen or source not in by_source:
+            continue
+        if len(by_source[source]) == 1:
+            citizen = by_source[source][0]
+        else:
+            candidates = by_source[source]
+
+    case_id = topic_id = None
+    case_rows = by_source.get(SOURCE_CASE)
+    if case_rows:
+        case_id, topic_id = case_rows[0]["case_id"], case_rows[0]["case_topic_id"]
+        citizen = citizen or case_rows[0]
+    return citizen, candidates, case_id, topic_id
+
+
+def _compact_citizen(row):
+    return {f: row[f] for f in CITIZEN_FIELDS} if row else None
+
+
+def _without_last_visit(case: dict) -> dict:
+    return {k: v for k, v in case.items() if k != "last_visit"}
+
+
+def load_cases(citizen_id: int, topic_id=None, case_id=None) -> list[dict]:
+    """
+    Expedientes del ciudadano (más recientes primero) con su última visita, en una consulta.
+    El expediente buscado (case_id) y el del tema van primero, así MAX_CASES no los deja fuera.
+    """
+    latest = Visit.objects.filter(case_id=OuterRef("pk")).order_by("-checkin_at", "-id")
+    annotations = {f"last_visit_{f}": Subquery(latest.values(f)[:1]) for f in LAST_VISIT_FIELDS}
+    wanted = Q(pk=case_id) if case_id is not None else Q()
+    if topic_id is not None:
+        wanted |= Q(topic_id=topic_id)
+    pinned = Case(When(wanted, then=Value(0)), default=Value(1), output_field=IntegerField()) if wanted else Value(1)
+    rows = (VisitCase.objects.filter(citizen_id=citizen_id)
+            .annotate(**annotations, pinned=pinned)
+            .order_by("pinned", "-opened_at", "-id")
+            .values(*CASE_FIELDS, "topic__code", "topic__name", *annotations)[:MAX_CASES])
+    out = []
+    for row in rows:
+        case = {f: row[f] for f in CASE_FIELDS}
+        case["topic"] = {"id": row["topic_id"], "code": row["topic__code"], "name": row["topic__name"]}
+        if row["last_visit_id"] is not None:
+            case["last_visit"] = {f: row[f"last_visit_{f}"] for f in LAST_VISIT_FIELDS}
+            case["last_visit"]["case_id"] = row["id"]
+        else:
+            case["last_visit"] = None
+        out.append(case)
+    return out
+
+
+def resolve_search(*, dpi="", phone="", name="", case_code="", topic=""):
+    """
+    Retorna el cuerpo compacto de /api/visits/search/.
+    """
+    topic_obj, topic_candidates = resolve_topic(topic)
+    citizen, citizen_candidates, case_id, case_topic_id = _pick(
+        find_citizen_candidates(dpi=dpi, phone=phone, name=name, case_code=case_code)
+    )
+
+    topic_id = topic_obj["id"] if topic_obj else case_topic_id
+    case, cases, last_visit = None, [], None
+    if citizen:
+        all_cases = load_cases(citizen["id"], topic_id, case_id)
+        cases = [c for c in all_cases if topic_id is None or c["topic_id"] == topic_id]
+        if case_id is not None:
+            case = next((c for c in all_cases if c["id"] == case_id), None)
+        elif topic_id is not None and cases:
+            case = cases[0]
+        if case:
+            last_visit = case["last_visit"]
+        else:
+            # Última visita del ciudadano en cualquier expediente
+            visits = [c["last_visit"] for c in all_cases if c["last_visit"]]
+            last_visit = max(visits, key=lambda v: v["checkin_at"], default=None)
+
+    if topic_obj is None and case is not None:
+        # Tema fijado por el expediente (ya viene en la consulta de expedientes)
+        topic_obj = case["topic"]
+
+    return {
+        "query": {"dpi": dpi, "phone": phone, "name": name, "case_code": case_code, "topic": topic},
+        "citizen": _compact_citizen(citizen),
+        "citizen_candidates": [_compact_citizen(c) for c in citizen_candidates],
+        "topic": topic_obj,
+        "topic_candidates": topic_candidates,
+        "case": _without_last_visit(case) if case else None,
+        "cases": [_without_last_visit(c) for c in cases],
+        "last_visit": last_visit,
+    }
+
+
+def normalize_search(result: dict) -> dict:
+    """
+    Misma respuesta con citizen/topic/case (y candidatos) como ids; cada
+    entidad una sola vez en "included" (citizens, topics, cases).
+    """
+    included = Included()
+    case_relations = {"topic": ("topics", {})}
+    return {
+        "query": result["query"],
+        "citizen": included.ref("citizens", result["citizen"]),
+        "citizen_candidates": [included.ref("citizens", c) for c in result["citizen_candidates"]],
+        "topic": included.ref("topics", result["topic"]),
+        "topic_candidates": [included.ref("topics", t) for t in result["topic_candidates"]],
+        "case": included.ref("cases", normalize(result["case"], case_relations, included) if result["case"] else None),
+        "cases": [included.ref("cases", normalize(c, case_relations, included)) for c in result["cases"]],
+        "last_visit": result["last_visit"],
+        "included": included.data,
+    }
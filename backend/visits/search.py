@@ -0,0 +1,143 @@
+"""
+Búsqueda de ciudadanos por nombre.
+
+Citizen.name_search guarda el nombre normalizado (minúsculas, sin tildes ni
+espacios repetidos) y se mantiene en cada escritura. En PostgreSQL tiene un
+índice GIN con gin_trgm_ops, así que el LIKE '%texto%' y la similitud
+trigram usan índice en lugar de recorrer la tabla.
+
+Uso:
+    Citizen.objects.filter(name_search__normalized="Pérez")
+    Visit.objects.filter(case__citizen__name_search__normalized="perez")
+    rank_by_name(qs, "Perez", "case__citizen__")
+"""
+import unicodedata
+
+from django.db import connection
+from django.db.models import CharField
+from django.db.models.lookups import Contains
+
+
+def normalize_name(value: str | None) -> str:
+    """
+    "  José   PÉREZ " -> "jose perez". La ñ se reduce a n (igual que unaccent).
+    """
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.lower().split())
+
+
+@CharField.register_lookup
+class NormalizedContains(Contains):
+    """
+    `campo__normalized=texto`: normaliza el texto buscado y aplica LIKE '%texto%'
+    (sensible a mayúsculas, por eso el campo ya debe estar normalizado).
+    """
+    lookup_name = "normalized"
+
+    def get_prep_lookup(self):
+        if isinstance(self.rhs, str):
+            self.rhs = normalize_name(self.rhs)
+        return super().get_prep_lookup()
+
+    def get_rhs_op(self, connection, rhs):
+        # Mismo operador que contains (LIKE); solo se usa con valores literales
+        return connection.operators["contains"] % rhs
+
+
+def rank_by_name(queryset, term: str, prefix: str = ""):
+    """
+    Ordena por similitud trigram contra el nombre normalizado (PostgreSQL).
+    En otros motores conserva un orden alfabético estable.
+    """
+    field = f"{prefix}name_search"
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        return queryset.annotate(
+            name_rank=TrigramSimilarity(field, normalize_name(term))
+        ).order_by("-name_rank", field, f"{prefix}id")
+    return queryset.order_by(field, f"{prefix}id")
+
+
+# ---- Documento de búsqueda por visita (PostgreSQL) ----
+#
+# Visit.search_document es un tsvector desnormalizado con badge_code, código de
+# expediente, nombre y DPI del ciudadano, tema, unidad destino y motivo. Se usa
+# la configuración 'simple' (sin stemming: nombres y códigos no deben
+# reducirse) y unaccent, para que el texto buscado se normalice igual.
+# En otros motores el campo queda vacío y la búsqueda usa icontains.
+
+SEARCH_CONFIG = "simple"
+
+_REFRESH_SQL = f"""
+UPDATE visits_visit AS v SET search_document =
+    setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(v.badge_code, '') || ' ' || c.code_persistente), 'A')
+ || setweight(to_tsvector('{SEARCH_CONFIG}', z.name_search || ' ' || coalesce(z.dpi, '') || ' ' || coalesce(z.passport, '')), 'A')
+ || setweight(to_tsvector('{SEARCH_CONFIG}', unaccent(t.name || ' ' || v.target_unit)), 'B')
+ || setweight(to_tsvector('{SEARCH_CONFIG}', unaccent(v.reason)), 'C')
+FROM visits_visitcase AS c, visits_citizen AS z, catalog_topic AS t
+WHERE c.id = v.case_id AND z.id = c.citizen_id AND t.id = c.topic_id AND {{where}}
+"""
+
+_REFRESH_FILTERS = {
+    "visit_ids": "v.id = ANY(%s)",
+    "case_ids": "c.id = ANY(%s)",
+    "citizen_ids": "z.id = ANY(%s)",
+    "topic_ids": "t.id = ANY(%s)",
+}
+
+
+def search_documents_enabled() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def refresh_search_documents(*, id_range: tuple[int, int] | None = None, **ids) -> int:
+    """
+    Recalcula Visit.search_document con un solo UPDATE.
+    Filtros: visit_ids, case_ids, citizen_ids, topic_ids (listas) o id_range=(desde, hasta].
+    Retorna las filas actualizadas (0 fuera de PostgreSQL).
+    """
+    if not search_documents_enabled():
+        return 0
+    clauses, params = [], []
+    for name, values in ids.items():
+        values = [int(v) for v in values or ()]
+        if values:
+            clauses.append(_REFRESH_FILTERS[name])
+            params.append(values)
+    if id_range is not None:
+        clauses.append("v.id > %s AND v.id <= %s")
+        params += list(id_range)
+    if not clauses:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(_REFRESH_SQL.format(where=" AND ".join(clauses)), params)
+        return cursor.rowcount
+
+
+def search_query_text(term: str) -> str:
+    """
+    Texto libre -> tsquery con prefijo en cada palabra: "jose per" -> "jose:* & per:*".
+    """
+    words = "".join(ch if ch.isalnum() else " " for ch in normalize_name(term)).split()
+    return " & ".join(f"{w}:*" for w in words)
+
+
+def full_text_search(queryset, term: str, rank: bool = True):
+    """
+    Filtra visitas contra search_document; con rank=True ordena por relevancia.
+    """
+    from django.contrib.postgres.search import SearchQuery, SearchRank
+
+    text = search_query_text(term)
+    if not text:
+        return queryset
+    query = SearchQuery(text, search_type="raw", config=SEARCH_CONFIG)
+    queryset = queryset.filter(search_document=query)
+    if rank:
+        queryset = (queryset.annotate(search_rank=SearchRank("search_document", query))
+                    .order_by("-search_rank", "-checkin_at", "-id"))
+    return queryset
@@ -1,19 +1,24 @@
+from datetime import timedelta
+
 from rest_framework import serializers
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
-from .models import Citizen, VisitCase, Visit, CASE_CLOSED, CASE_OPEN
-from catalog.models import Topic
+from .models import Citizen, VisitCase, Visit, EVENT_CHECKIN, EVENT_TYPES
+from .services import checkin, checkin_many, citizen_key, clean_citizen_data, ingest_events
+from catalog.cache import topic_catalog
+from auditlog.utils import get_client_ip
+from core.fieldsets import SparseFieldsetSerializerMixin
 
 User = get_user_model()
 
-class CitizenSerializer(serializers.ModelSerializer):
+class CitizenSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Citizen
         fields = ["id", "dpi", "passport", "name", "phone", "origin", "created_at", "updated_at"]
         read_only_fields = ["id", "created_at", "updated_at"]
         # 👇 IMPORTANTE: no validar unicidad aquí, la BD ya la garantiza y
-        # VisitCreateSerializer.create() hace get_or_create(...)
+        # VisitCreateSerializer.create() hace un upsert (visits/services.py)
         extra_kwargs = {
             "dpi": {"validators": []},
             "passport": {"validators": []},
@@ -27,7 +32,7 @@ class CitizenSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class VisitCaseSerializer(serializers.ModelSerializer):
+class VisitCaseSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     citizen = CitizenSerializer(read_only=True)
     topic = serializers.PrimaryKeyRelatedField(read_only=True)
 
@@ -41,7 +46,7 @@ class VisitCaseSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class VisitSerializer(serializers.ModelSerializer):
+class VisitSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     case = VisitCaseSerializer(read_only=True)
     intake_user = serializers.PrimaryKeyRelatedField(read_only=True)
 
@@ -71,82 +76,209 @@ class VisitCreateSerializer(serializers.Serializer):
     # Si el expediente está CERRADO, se permite reabrir con justificación
     reopen_justification = serializers.CharField(required=False, allow_blank=True, default="")
 
-    def validate_topic_id(self, value):
-        if not Topic.objects.filter(id=value, is_active=True).exists():
-            raise serializers.ValidationError("El tema especificado no existe o no está activo.")
-        return value
+    def validate(self, attrs):
+        # Desde la caché del catálogo; el Topic validado se reutiliza en create()
+        topic = topic_catalog.get(attrs["topic_id"])
+        if topic is None:
+            raise serializers.ValidationError({"topic_id": "El tema especificado no existe o no está activo."})
+        attrs["topic"] = topic
+        return attrs
 
     def create(self, validated_data):
         request = self.context["request"]
         user: User = request.user
 
-        citizen_data = validated_data.pop("citizen")
-        topic_id = validated_data.pop("topic_id")
-        reopen_justification = validated_data.pop("reopen_justification", "")
-
-        topic = Topic.objects.get(id=topic_id)
-
-        # 1) Obtiene o crea el ciudadano (prioriza dpi; si no hay, usa passport)
-        dpi = (citizen_data.get("dpi") or "").strip() or None
-        passport = (citizen_data.get("passport") or "").strip() or None
-        name = citizen_data["name"].strip()
-        phone = citizen_data.get("phone", "").strip()
-        origin = citizen_data.get("origin", "").strip()
-
-        citizen = None
-        if dpi:
-            citizen, _ = Citizen.objects.get_or_create(dpi=dpi, defaults={"name": name, "phone": phone, "origin": origin})
-        elif passport:
-            citizen, _ = Citizen.objects.get_or_create(passport=passport, defaults={"name": name, "phone": phone, "origin": origin})
-        else:
+        if not citizen_key(clean_citizen_data(validated_data["citizen"])):
             # Ya validado por CitizenSerializer, pero por seguridad:
             raise serializers.ValidationError("Debe proporcionar DPI o PASAPORTE en citizen.")
 
-        # Actualiza datos básicos si cambiaron
-        changed = False
-        if name and citizen.name != name:
-            citizen.name = name; changed = True
-        if phone != citizen.phone:
-            citizen.phone = phone; changed = True
-        if origin != citizen.origin:
-            citizen.origin = origin; changed = True
-        if changed:
-            citizen.save()
-
-        # 2) Garantiza el expediente persistente por (citizen, topic)
-        case = None
-        try:
-            case = VisitCase.objects.get(citizen=citizen, topic=topic)
-            # si está cerrado → reabrir con justificación
-            if case.state == CASE_CLOSED:
-                case.reopen(justification=reopen_justification)
-        except VisitCase.DoesNotExist:
-            # crear expediente con código persistente
-            case = VisitCase.objects.create(
-                citizen=citizen,
-                topic=topic,
-                state=CASE_OPEN,
-                opened_at=timezone.now(),
-                code_persistente="PENDIENTE"  # placeholder para obtener id y luego setear código
-            )
-            case.code_persistente = VisitCase.make_code(citizen.id, topic.id)
-            case.save(update_fields=["code_persistente"])
-
-        # 3) Crea la visita (check-in)
-        visit = Visit.objects.create(
-            case=case,
-            intake_user=user,
-            target_unit=validated_data.get("target_unit").strip(),
-            reason=validated_data.get("reason", "").strip(),
-            photo_path=validated_data.get("photo_path", "").strip(),
+        # Ciudadano, expediente y visita en una sola transacción (ver visits/services.py)
+        return checkin(
+            user,
+            citizen=validated_data["citizen"],
+            topic=validated_data["topic"],
+            target_unit=validated_data.get("target_unit"),
+            reason=validated_data.get("reason", ""),
+            photo_path=validated_data.get("photo_path", ""),
+            reopen_justification=validated_data.get("reopen_justification", ""),
+            ip=get_client_ip(request),
         )
-        return visit
 
     def to_representation(self, instance: Visit):
         return VisitSerializer(instance).data
 
 
 
+class VisitBulkCreateSerializer(serializers.Serializer):
+    """
+    Check-in grupal (delegaciones, excursiones): varios ciudadanos con el
+    mismo tema, unidad destino y motivo. Todo o nada, con errores por fila.
+    """
+    MAX_CITIZENS = 200
+
+    citizens = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=MAX_CITIZENS)
+    topic_id = serializers.IntegerField()
+    target_unit = serializers.CharField(max_length=128)
+    reason = serializers.CharField(max_length=256, required=False, allow_blank=True, default="")
+    reopen_justification = serializers.CharField(required=False, allow_blank=True, default="")
+
+    def validate_citizens(self, value):
+        errors, cleaned, seen = [], [], set()
+        has_errors = False
+        for row in value:
+            ser = CitizenSerializer(data=row)
+            if not ser.is_valid():
+                errors.append(ser.errors)
+                cleaned.append(None)
+                has_errors = True
+                continue
+            key = citizen_key(clean_citizen_data(ser.validated_data))
+            if key in seen:
+                errors.append({"non_field_errors": ["DPI/pasaporte repetido en el lote."]})
+                has_errors = True
+            else:
+                errors.append({})
+            seen.add(key)
+            cleaned.append(ser.validated_data)
+        if has_errors:
+            # Mismo formato que un ListSerializer: una entrada por fila ({} = fila válida)
+            raise serializers.ValidationError(errors)
+        return cleaned
+
+    def validate(self, attrs):
+        topic = topic_catalog.get(attrs["topic_id"])
+        if topic is None:
+            raise serializers.ValidationError({"topic_id": "El tema especificado no existe o no está activo."})
+        attrs["topic"] = topic
+        return attrs
+
+    def create(self, validated_data):
+        request = self.context["request"]
+        return checkin_many(
+            request.user,
+            [
+                {
+                    "citizen": citizen,
+                    "topic": validated_data["topic"],
+                    "target_unit": validated_data["target_unit"],
+                    "reason": validated_data.get("reason", ""),
+                    "reopen_justification": validated_data.get("reopen_justification", ""),
+                }
+                for citizen in validated_data["citizens"]
+            ],
+            ip=get_client_ip(request),
+        )
+
+
+class VisitBulkCheckoutSerializer(serializers.Serializer):
+    """
+    Check-out masivo: por ids, por badge_codes, o todas las activas con
+    entrada anterior a `before`. Exactamente uno de los tres.
+    """
+    MAX_ITEMS = 500
+
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False, max_length=MAX_ITEMS)
+    badge_codes = serializers.ListField(child=serializers.CharField(max_length=32), required=False, allow_empty=False, max_length=MAX_ITEMS)
+    before = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        given = [f for f in ("ids", "badge_codes", "before") if f in attrs]
+        if len(given) != 1:
+            raise serializers.ValidationError("Indique exactamente uno de: ids, badge_codes o before.")
+        return attrs
+
+    def get_queryset(self):
+        data = self.validated_data
+        if "ids" in data:
+            return Visit.objects.filter(id__in=data["ids"])
+        if "badge_codes" in data:
+            return Visit.objects.filter(badge_code__in=data["badge_codes"])
+        return Visit.objects.filter(checkin_at__lt=data["before"])
+
+
+class IngestEventSerializer(serializers.Serializer):
+    """
+    Un evento capturado sin conexión. Entrada: mismos datos que el check-in.
+    Salida: referencia a la visita por badge_code, visit_id o checkin_event_id
+    (event_id de una entrada enviada en este u otro lote).
+    """
+    event_id = serializers.CharField(max_length=64)
+    event_type = serializers.ChoiceField(choices=EVENT_TYPES)
+    occurred_at = serializers.DateTimeField()
+
+    citizen = CitizenSerializer(required=False)
+    topic_id = serializers.IntegerField(required=False)
+    target_unit = serializers.CharField(max_length=128, required=False)
+    reason = serializers.CharField(max_length=256, required=False, allow_blank=True, default="")
+    photo_path = serializers.CharField(max_length=255, required=False, allow_blank=True, default="")
+    reopen_justification = serializers.CharField(required=False, allow_blank=True, default="")
+
+    badge_code = serializers.CharField(max_length=32, required=False)
+    visit_id = serializers.IntegerField(required=False)
+    checkin_event_id = serializers.CharField(max_length=64, required=False)
+
+    # Tolerancia para relojes de escritorio adelantados
+    MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+    def validate_occurred_at(self, value):
+        if value > timezone.now() + self.MAX_CLOCK_SKEW:
+            raise serializers.ValidationError("La fecha del evento está en el futuro.")
+        return value
+
+    def validate(self, attrs):
+        if attrs["event_type"] == EVENT_CHECKIN:
+            missing = [f for f in ("citizen", "topic_id", "target_unit") if f not in attrs]
+            if missing:
+                raise serializers.ValidationError({f: "Requerido para eventos de entrada." for f in missing})
+        elif not any(attrs.get(f) for f in ("badge_code", "visit_id", "checkin_event_id")):
+            raise serializers.ValidationError("La salida debe indicar badge_code, visit_id o checkin_event_id.")
+        return attrs
+
+
+class VisitIngestSerializer(serializers.Serializer):
+    """
+    Lote de eventos sin conexión. Los eventos inválidos no detienen el lote:
+    se reportan con status "error" y el resto se aplica.
+    """
+    MAX_EVENTS = 500
+
+    events = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=MAX_EVENTS)
+
+    def create(self, validated_data):
+        request = self.context["request"]
+        raw = validated_data["events"]
+        parsed, errors = [], {}
+        for i, row in enumerate(raw):
+            ser = IngestEventSerializer(data=row)
+            if ser.is_valid():
+                parsed.append((i, ser.validated_data))
+            else:
+                errors[i] = ser.errors
+
+        # Temas de todas las entradas desde la caché del catálogo
+        topic_ids = {e["topic_id"] for _, e in parsed if e["event_type"] == EVENT_CHECKIN}
+        topics = topic_catalog.in_bulk(topic_ids)
+        valid = []
+        for i, e in parsed:
+            if e["event_type"] == EVENT_CHECKIN:
+                e["topic"] = topics.get(e["topic_id"])
+                if e["topic"] is None:
+                    errors[i] = {"topic_id": ["El tema especificado no existe o no está activo."]}
+                    continue
+            valid.append((i, e))
+
+        applied = ingest_events(request.user, [e for _, e in valid], ip=get_client_ip(request))
+        results = [None] * len(raw)
+        for (i, _), res in zip(valid, applied):
+            results[i] = res
+        for i, err in errors.items():
+            results[i] = {
+                "event_id": raw[i].get("event_id"), "status": "error",
+                "visit_id": None, "badge_code": None, "detail": err,
+            }
+        return results
+
+
 class PhotoUploadSerializer(serializers.Serializer):
     """
     Permite subir imagen vía:
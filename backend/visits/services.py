@@ -0,0 +1,504 @@
+"""
+Motor de check-in: resuelve ciudadano, expediente y visita en una sola
+transacción y con un número fijo de sentencias SQL, sin importar si es
+una visita o un lote.
+
+Presupuesto por lote (PostgreSQL):
+  1. UPSERT de ciudadanos por DPI y/o por pasaporte (INSERT ... ON CONFLICT)
+     y SELECT de las filas guardadas
+  2. SELECT de expedientes existentes (citizen, topic)
+  3. UPDATE de expedientes cerrados que se reabren (solo si aplica)
+  4. INSERT de expedientes nuevos (solo si aplica)
+  5. SELECT nextval(...) para reservar ids/badge_code de las visitas
+  6. INSERT de las visitas con badge_code ya asignado
+  7. UPSERT de los contadores de ocupación (visits/counters.py)
+  8. UPSERT del resumen diario (reports/rollup.py)
+  9. INSERT de la bitácora (case_created + visit_checkin)
+ 10. UPDATE del documento de búsqueda de las visitas nuevas y de todas las
+     visitas de los ciudadanos que ya existían (visits/search.py)
+
+En motores sin secuencias (SQLite en dev) el paso 5 se sustituye por un
+UPDATE de badge_code posterior al INSERT.
+"""
+import uuid
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from auditlog.utils import log_actions
+from reports.rollup import bump_daily_stats
+from .counters import bump_occupancy
+from .search import normalize_name, refresh_search_documents
+from .suggest import citizen_index
+from .models import (
+    Citizen, VisitCase, Visit, IngestedEvent, CASE_CLOSED, CASE_OPEN, EVENT_CHECKIN, EVENT_CHECKOUT,
+)
+
+CITIZEN_UPDATE_FIELDS = ["name", "name_search", "phone", "origin", "updated_at"]
+
+
+def clean_citizen_data(data: dict) -> dict:
+    """
+    Normaliza los datos de ciudadano que llegan del serializer.
+    """
+    return {
+        "dpi": (data.get("dpi") or "").strip() or None,
+        "passport": (data.get("passport") or "").strip() or None,
+        "name": (data.get("name") or "").strip(),
+        "phone": (data.get("phone") or "").strip(),
+        "origin": (data.get("origin") or "").strip(),
+    }
+
+
+def citizen_key(data: dict):
+    """
+    Llave de identidad del ciudadano: prioriza DPI; si no hay, pasaporte.
+    """
+    if data.get("dpi"):
+        return ("dpi", data["dpi"])
+    if data.get("passport"):
+        return ("passport", data["passport"])
+    return None
+
+
+def reserve_visit_ids(count: int) -> list[int] | None:
+    """
+    Reserva `count` ids de la secuencia de Visit (PostgreSQL) en una sola
+    sentencia, para insertar las visitas con badge_code ya calculado.
+    Retorna None si el motor no tiene secuencias.
+    """
+    if count <= 0 or connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+            [Visit._meta.db_table, count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _upsert_citizens(cleaned: list[dict]) -> dict:
+    """
+    INSERT ... ON CONFLICT por DPI y por pasaporte. Actualiza nombre,
+    teléfono y procedencia de los existentes. Retorna ({key: Citizen} con las
+    filas guardadas, ids de los ciudadanos que ya existían y se actualizaron).
+    """
+    by_key = {}
+    for data in cleaned:
+        # Si la llave se repite en el lote, gana la última versión de los datos
+        by_key[citizen_key(data)] = data
+
+    out = {}
+    for field in ("dpi", "passport"):
+        objs = []
+        for (kind, value), data in by_key.items():
+            if kind != field:
+                continue
+            # Igual que el flujo original: el pasaporte solo se guarda si no hay DPI
+            objs.append(Citizen(**{
+                field: value,
+                "name": data["name"],
+                "name_search": normalize_name(data["name"]),
+                "phone": data["phone"],
+                "origin": data["origin"],
+            }))
+        if not objs:
+            continue
+        Citizen.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=[field],
+            update_fields=CITIZEN_UPDATE_FIELDS,
+        )
+        for obj in objs:
+            out[(field, getattr(obj, field))] = obj
+    # Los objetos del INSERT no traen las columnas que el upsert conservó: se recargan
+    stored = Citizen.objects.in_bulk([obj.pk for obj in out.values()])
+    # Una fila existente conserva su created_at; la insertada trae el del objeto
+    updated = {obj.pk for obj in out.values() if stored[obj.pk].created_at != obj.created_at}
+    out = {key: stored[obj.pk] for key, obj in out.items()}
+    if citizen_index.ready:
+        # bulk_create no dispara post_save: el índice de sugerencias se actualiza aquí
+        saved = list(out.values())
+        transaction.on_commit(lambda: citizen_index.add(saved))
+    return out, updated
+
+
+def _ensure_cases(pairs: dict, now) -> tuple[dict, list[VisitCase]]:
+    """
+    Garantiza un expediente abierto por cada (citizen, topic).
+    `pairs` mapea (citizen_id, topic_id) -> (citizen, topic, reopen_justification).
+    Retorna ({(citizen_id, topic_id): VisitCase}, expedientes_creados).
+    """
+    citizen_ids = {c for c, _ in pairs}
+    topic_ids = {t for _, t in pairs}
+    existing = {
+        (case.citizen_id, case.topic_id): case
+        for case in VisitCase.objects.filter(citizen_id__in=citizen_ids, topic_id__in=topic_ids)
+        if (case.citizen_id, case.topic_id) in pairs
+    }
+
+    # Reapertura de expedientes cerrados (agrupada por justificación)
+    to_reopen = {}
+    for key, case in existing.items():
+        if case.state == CASE_CLOSED:
+            justification = pairs[key][2] or ""
+            to_reopen.setdefault(justification, []).append(case)
+    for justification, cases in to_reopen.items():
+        VisitCase.objects.filter(id__in=[c.id for c in cases]).update(
+            state=CASE_OPEN, opened_at=now, closed_at=None, closed_reason="",
+            last_reopen_reason=justification, updated_at=now,
+        )
+        for case in cases:
+            case.state = CASE_OPEN
+            case.opened_at = now
+            case.closed_at = None
+            case.closed_reason = ""
+            case.last_reopen_reason = justification
+            case.updated_at = now
+
+    # Expedientes nuevos: el código persistente es determinista, no requiere id previo
+    new_cases = [
+        VisitCase(
+            citizen=citizen,
+            topic=topic,
+            state=CASE_OPEN,
+            opened_at=now,
+            code_persistente=VisitCase.make_code(citizen.id, topic.id),
+        )
+        for key, (citizen, topic, _) in pairs.items()
+        if key not in existing
+    ]
+    if new_cases:
+        VisitCase.objects.bulk_create(
+            new_cases,
+            update_conflicts=True,
+            unique_fields=["citizen", "topic"],
+            update_fields=["updated_at"],
+        )
+        for case in new_cases:
+            existing[(case.citizen_id, case.topic_id)] = case
+
+    for (citizen_id, topic_id), case in existing.items():
+        citizen, topic, _ = pairs[(citizen_id, topic_id)]
+        case.citizen = citizen
+        case.topic = topic
+    return existing, new_cases
+
+
+def _insert_visits(visits: list[Visit], now):
+    """
+    Inserta las visitas con badge_code. En PostgreSQL los ids se reservan
+    antes del INSERT; en otros motores se completa el badge_code después.
+    """
+    ids = reserve_visit_ids(len(visits))
+    if ids is not None:
+        for visit, visit_id in zip(visits, ids):
+            visit.id = visit_id
+            visit.badge_code = Visit.make_badge_code(visit_id, now.year)
+        Visit.objects.bulk_create(visits)
+        return
+
+    if not connection.features.can_return_rows_from_bulk_insert:
+        for visit in visits:
+            visit._audit_logged = True  # checkin_many registra el check-in (sin duplicar desde la señal)
+            visit.save()
+        return
+
+    # badge_code es único: marcador temporal hasta conocer el id
+    for visit in visits:
+        visit.badge_code = f"TMP-{uuid.uuid4().hex}"[:32]
+    Visit.objects.bulk_create(visits)
+    for visit in visits:
+        visit.badge_code = Visit.make_badge_code(visit.id, now.year)
+    Visit.objects.bulk_update(visits, ["badge_code"])
+
+
+def record_checkins(visits, sign: int = 1):
+    """
+    Contadores de ocupación y resumen diario para visitas registradas.
+    `visits` requiere checkin_at, target_unit y case.topic_id.
+    """
+    bump_occupancy(checkins=[v.checkin_at for v in visits], sign=sign)
+    bump_daily_stats(checkins=[(v.checkin_at, v.case.topic_id, v.target_unit) for v in visits], sign=sign)
+
+
+def record_checkouts(visits, sign: int = 1):
+    """
+    Contadores de ocupación y resumen diario para visitas cerradas.
+    Acepta instancias o dicts con checkin_at, checkout_at, topic_id y target_unit.
+    """
+    rows = [
+        (v["checkin_at"], v["checkout_at"], v["topic_id"], v["target_unit"]) if isinstance(v, dict)
+        else (v.checkin_at, v.checkout_at, v.case.topic_id, v.target_unit)
+        for v in visits
+    ]
+    bump_occupancy(checkouts=[r[1] for r in rows], sign=sign)
+    bump_daily_stats(checkouts=rows, sign=sign)
+
+
+def checkin_many(user, entries: list[dict], ip: str | None = None) -> list[Visit]:
+    """
+    Registra varias visitas en una transacción.
+    Cada entrada: citizen (dict), topic (Topic), target_unit, reason,
+    photo_path, reopen_justification y opcionalmente checkin_at.
+    Retorna las visitas en el mismo orden de `entries`.
+    """
+    if not entries:
+        return []
+    now = timezone.now()
+
+    with transaction.atomic():
+        cleaned = [clean_citizen_data(e["citizen"]) for e in entries]
+        citizens, updated_citizens = _upsert_citizens(cleaned)
+
+        pairs = {}
+        for entry, data in zip(entries, cleaned):
+            citizen = citizens[citizen_key(data)]
+            topic = entry["topic"]
+            pairs.setdefault((citizen.id, topic.id), (citizen, topic, entry.get("reopen_justification", "")))
+        cases, new_cases = _ensure_cases(pairs, now)
+
+        visits = []
+        for entry, data in zip(entries, cleaned):
+            citizen = citizens[citizen_key(data)]
+            case = cases[(citizen.id, entry["topic"].id)]
+            visits.append(Visit(
+                case=case,
+                intake_user=user,
+                checkin_at=entry.get("checkin_at") or now,
+                target_unit=(entry.get("target_unit") or "").strip(),
+                reason=(entry.get("reason") or "").strip(),
+                photo_path=(entry.get("photo_path") or "").strip(),
+            ))
+        _insert_visits(visits, now)
+        record_checkins(visits)
+
+        log_actions(
+            [
+                {
+                    "action": "case_created",
+                    "entity": "VisitCase",
+                    "entity_id": case.id,
+                    "payload": {"code_persistente": case.code_persistente, "citizen_id": case.citizen_id, "topic_id": case.topic_id},
+                }
+                for case in new_cases
+            ] + [
+                {
+                    "user": user,
+                    "action": "visit_checkin",
+                    "entity": "Visit",
+                    "entity_id": visit.id,
+                    "payload": {"badge_code": visit.badge_code, "case_id": visit.case_id},
+                    "ip": ip,
+                }
+                for visit in visits
+            ]
+        )
+        # bulk_create no dispara post_save (search_citizen_saved): las visitas
+        # anteriores de los ciudadanos actualizados se recalculan junto con las nuevas
+        refresh_search_documents(visit_ids=[v.id for v in visits if v.case.citizen_id not in updated_citizens])
+        refresh_search_documents(citizen_ids=sorted(updated_citizens))
+    return visits
+
+
+def checkin(user, *, citizen: dict, topic, target_unit: str, reason: str = "",
+            photo_path: str = "", reopen_justification: str = "", ip: str | None = None) -> Visit:
+    """
+    Check-in individual (POST /api/visits/visits/).
+    """
+    return checkin_many(user, [{
+        "citizen": citizen,
+        "topic": topic,
+        "target_unit": target_unit,
+        "reason": reason,
+        "photo_path": photo_path,
+        "reopen_justification": reopen_justification,
+    }], ip=ip)[0]
+
+
+def log_checkouts(user, visits, ip: str | None = None, extra: dict | None = None):
+    """
+    Bitácora de salidas en un solo INSERT. `visits` puede ser instancias o
+    dicts con id, badge_code y case_id. `extra` se agrega al payload.
+    """
+    def _get(v, name):
+        return v[name] if isinstance(v, dict) else getattr(v, name)
+
+    log_actions([
+        {
+            "user": user,
+            "action": "visit_checkout",
+            "entity": "Visit",
+            "entity_id": _get(v, "id"),
+            "payload": {"badge_code": _get(v, "badge_code"), "case_id": _get(v, "case_id"), **(extra or {})},
+            "ip": ip,
+        }
+        for v in visits
+    ])
+
+
+def checkout_visits(user, queryset, at=None, ip: str | None = None, extra: dict | None = None) -> list[dict]:
+    """
+    Check-out por conjunto: bloquea las visitas abiertas de `queryset`, las
+    cierra con un solo UPDATE ... WHERE checkout_at IS NULL y escribe la
+    bitácora en un solo INSERT. Retorna [{id, badge_code, case_id}] cerradas.
+    """
+    at = at or timezone.now()
+    with transaction.atomic():
+        rows = list(
+            queryset.filter(checkout_at__isnull=True)
+            .select_for_update(of=("self",))
+            .values("id", "badge_code", "case_id", "checkin_at", "target_unit", topic_id=F("case__topic_id"))
+        )
+        if not rows:
+            return []
+        Visit.objects.filter(id__in=[r["id"] for r in rows], checkout_at__isnull=True).update(
+            checkout_at=at, updated_at=timezone.now(),
+        )
+        record_checkouts([dict(r, checkout_at=at) for r in rows])
+        log_checkouts(user, rows, ip=ip, extra=extra)
+    return [{"id": r["id"], "badge_code": r["badge_code"], "case_id": r["case_id"]} for r in rows]
+
+
+def checkout_one(user, visit: Visit, ip: str | None = None) -> bool:
+    """
+    Check-out individual con UPDATE condicional (sin carrera entre lectura y
+    escritura). Retorna False si la visita ya tenía checkout; en ese caso no
+    se escribe nada.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        updated = Visit.objects.filter(pk=visit.pk, checkout_at__isnull=True).update(checkout_at=now, updated_at=now)
+        if not updated:
+            return False
+        visit.checkout_at = now
+        visit.updated_at = now
+        record_checkouts([visit])
+        log_checkouts(user, [visit], ip=ip)
+    return True
+
+
+def ingest_events(user, events: list[dict], ip: str | None = None) -> list[dict]:
+    """
+    Aplica, en orden y en una transacción, eventos capturados sin conexión.
+    Cada evento ya validado trae event_id, event_type y occurred_at; los de
+    entrada traen además los datos de check-in (con `topic` resuelto) y los
+    de salida una referencia: badge_code, visit_id o checkin_event_id.
+
+    Retorna un resultado por evento: {event_id, status, visit_id, badge_code, detail}
+    con status "applied", "duplicate" o "error".
+    """
+    results = [{"event_id": e["event_id"], "status": "applied", "visit_id": None, "badge_code": None} for e in events]
+
+    def _fail(i, detail):
+        results[i]["status"] = "error"
+        results[i]["detail"] = detail
+
+    with transaction.atomic():
+        # 1) Duplicados (ya recibidos antes o repetidos en el lote) y entradas
+        #    previas referenciadas por las salidas, en una sola consulta
+        lookup = {e["event_id"] for e in events} | {e["checkin_event_id"] for e in events if e.get("checkin_event_id")}
+        known = {ev.event_id: ev for ev in IngestedEvent.objects.select_related("visit").filter(event_id__in=lookup)}
+        fresh, batch_ids = [], set()
+        for i, e in enumerate(events):
+            prev = known.get(e["event_id"])
+            if prev is not None:
+                results[i]["status"] = "duplicate"
+                if prev.visit_id:
+                    results[i]["visit_id"] = prev.visit_id
+                    results[i]["badge_code"] = prev.visit.badge_code
+                continue
+            if e["event_id"] in batch_ids:
+                results[i]["status"] = "duplicate"
+                continue
+            batch_ids.add(e["event_id"])
+            fresh.append(i)
+
+        # 2) Registro de eventos primero: un reenvío concurrente choca con el índice único
+        ledger = {
+            events[i]["event_id"]: IngestedEvent(
+                event_id=events[i]["event_id"],
+                event_type=events[i]["event_type"],
+                occurred_at=events[i]["occurred_at"],
+            )
+            for i in fresh
+        }
+        IngestedEvent.objects.bulk_create(ledger.values())
+
+        # 3) Entradas en bloque (checkin_at = hora original del evento)
+        checkin_idx = [i for i in fresh if events[i]["event_type"] == EVENT_CHECKIN]
+        visits = checkin_many(user, [dict(events[i], checkin_at=events[i]["occurred_at"]) for i in checkin_idx], ip=ip)
+        created_by_event = {}
+        for i, visit in zip(checkin_idx, visits):
+            created_by_event[events[i]["event_id"]] = (i, visit)
+            ledger[events[i]["event_id"]].visit = visit
+            results[i]["visit_id"] = visit.id
+            results[i]["badge_code"] = visit.badge_code
+
+        # 4) Salidas: resolver referencias con una sola consulta (bloqueando las filas)
+        checkout_idx = [i for i in fresh if events[i]["event_type"] == EVENT_CHECKOUT]
+        badge_codes = {events[i]["badge_code"] for i in checkout_idx if events[i].get("badge_code")}
+        visit_ids = {events[i]["visit_id"] for i in checkout_idx if events[i].get("visit_id")}
+        visit_ids |= {
+            known[ref].visit_id for ref in (events[i].get("checkin_event_id") for i in checkout_idx)
+            if ref in known and known[ref].event_type == EVENT_CHECKIN and known[ref].visit_id
+        }
+        targets = {}
+        if badge_codes or visit_ids:
+            qs = (Visit.objects.select_related("case").select_for_update(of=("self",))
+                  .filter(Q(badge_code__in=badge_codes) | Q(pk__in=visit_ids)))
+            targets = {v.id: v for v in qs}
+        by_badge = {v.badge_code: v for v in targets.values()}
+
+        closed = {}
+        for i in checkout_idx:
+            e = events[i]
+            visit = None
+            if e.get("checkin_event_id"):
+                created = created_by_event.get(e["checkin_event_id"])
+                if created is not None:
+                    if created[0] > i:
+                        _fail(i, "La salida es anterior a su entrada en el lote.")
+                        continue
+                    visit = created[1]
+                elif e["checkin_event_id"] in known:
+                    visit = targets.get(known[e["checkin_event_id"]].visit_id)
+            elif e.get("badge_code"):
+                visit = by_badge.get(e["badge_code"])
+            elif e.get("visit_id"):
+                visit = targets.get(e["visit_id"])
+            if visit is None:
+                _fail(i, "No existe la visita referenciada.")
+                continue
+
+            results[i]["visit_id"] = visit.id
+            results[i]["badge_code"] = visit.badge_code
+            ledger[e["event_id"]].visit = visit
+            if visit.checkout_at or visit.id in closed:
+                _fail(i, "La visita ya tiene checkout registrado.")
+                continue
+            if e["occurred_at"] < visit.checkin_at:
+                _fail(i, "La hora de salida es anterior a la entrada.")
+                continue
+            visit.checkout_at = e["occurred_at"]
+            closed[visit.id] = visit
+
+        if closed:
+            now = timezone.now()
+            for visit in closed.values():
+                visit.updated_at = now
+            Visit.objects.bulk_update(closed.values(), ["checkout_at", "updated_at"])
+            record_checkouts(closed.values())
+            log_checkouts(user, closed.values(), ip=ip)
+
+        # 5) Enlaza cada evento con su visita; los fallidos se descartan para poder reintentarlos
+        failed = [r["event_id"] for r in results if r["status"] == "error"]
+        if failed:
+            IngestedEvent.objects.filter(event_id__in=failed).delete()
+        linked = [ev for ev in ledger.values() if ev.visit is not None and ev.event_id not in failed]
+        if linked:
+            IngestedEvent.objects.bulk_update(linked, ["visit"])
+
+    return results
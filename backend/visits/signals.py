@@ -0,0 +1,43 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from catalog.models import Topic
+from .models import Citizen, Visit
+from .search import refresh_search_documents, search_documents_enabled
+from .suggest import citizen_index
+
+
+@receiver(post_save, sender=Citizen)
+def suggest_citizen_saved(sender, instance: Citizen, **kwargs):
+    # Si el índice no está cargado, la precarga ya leerá este registro
+    if citizen_index.ready:
+        transaction.on_commit(lambda: citizen_index.add([instance]))
+
+
+@receiver(post_delete, sender=Citizen)
+def suggest_citizen_deleted(sender, instance: Citizen, **kwargs):
+    if citizen_index.ready:
+        transaction.on_commit(lambda: citizen_index.remove([instance.pk]))
+
+
+# ---- Documento de búsqueda de visitas (solo PostgreSQL) ----
+SEARCH_FIELDS = {"badge_code", "target_unit", "reason", "case", "case_id"}
+
+
+@receiver(post_save, sender=Visit)
+def search_visit_saved(sender, instance: Visit, created, update_fields=None, **kwargs):
+    if search_documents_enabled() and (created or update_fields is None or SEARCH_FIELDS & set(update_fields)):
+        refresh_search_documents(visit_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Citizen)
+def search_citizen_saved(sender, instance: Citizen, created, update_fields=None, **kwargs):
+    if search_documents_enabled() and not created:
+        refresh_search_documents(citizen_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Topic)
+def search_topic_saved(sender, instance: Topic, created, **kwargs):
+    if search_documents_enabled() and not created:
+        refresh_search_documents(topic_ids=[instance.pk])
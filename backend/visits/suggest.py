@@ -0,0 +1,189 @@
+"""
+Índice en memoria para autocompletar ciudadanos en recepción
+(GET /api/visits/citizens/suggest/?q=).
+
+- Claves por prefijo: nombre normalizado (completo y desde cada palabra),
+  DPI, pasaporte y teléfono (solo dígitos). Listas ordenadas + bisect.
+- Se precarga al arrancar el proceso web (core/wsgi.py, en segundo plano) con
+  los CITIZEN_SUGGEST_MAX_CITIZENS ciudadanos más recientes; al superar ese
+  tope se descartan los menos recientes, así la memoria queda acotada.
+- Se actualiza con cada guardado de Citizen (señales + upsert del check-in)
+  después del commit. Los cambios hechos por otros procesos se incorporan
+  leyendo los ciudadanos modificados cada CITIZEN_SUGGEST_REFRESH_SECONDS.
+- Mientras no está cargado, suggest() retorna None y la vista consulta la BD.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils import timezone
+
+from .search import normalize_name
+
+logger = logging.getLogger(__name__)
+
+WARM_BATCH_SIZE = 5000
+
+
+def _digits(value: str | None) -> str:
+    return "".join(ch for ch in (value or "") if ch.isdigit())
+
+
+def citizen_keys(name: str, dpi: str | None, passport: str | None, phone: str | None) -> tuple[list, list]:
+    """
+    Retorna (claves_de_nombre, claves_de_identificador) de un ciudadano.
+    """
+    words = normalize_name(name).split()
+    name_keys = [" ".join(words[i:]) for i in range(len(words))]
+    ident_keys = [k for k in (_digits(dpi), normalize_name(passport), _digits(phone)) if k]
+    return name_keys, ident_keys
+
+
+class CitizenSuggestIndex:
+    def __init__(self, max_citizens: int | None = None):
+        self.max_citizens = max_citizens
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._names = []      # [(clave, id)] ordenadas
+        self._idents = []
+        self._docs = OrderedDict()  # id -> (nombre, ident, claves_nombre, claves_ident); orden = recencia
+        self.ready = False
+        self._watermark = None
+        self._last_refresh = 0.0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_citizens or getattr(settings, "CITIZEN_SUGGEST_MAX_CITIZENS", 200_000)
+
+    def __len__(self):
+        return len(self._docs)
+
+    # ---- escritura ----
+    def _remove(self, citizen_id):
+        doc = self._docs.pop(citizen_id, None)
+        if doc is None:
+            return
+        for keys, bucket in ((doc[2], self._names), (doc[3], self._idents)):
+            for key in keys:
+                pos = bisect_left(bucket, (key, citizen_id))
+                if pos < len(bucket) and bucket[pos] == (key, citizen_id):
+                    del bucket[pos]
+
+    def _add(self, citizen_id, name, dpi, passport, phone):
+        self._remove(citizen_id)
+        name_keys, ident_keys = citizen_keys(name, dpi, passport, phone)
+        for key in name_keys:
+            insort(self._names, (key, citizen_id))
+        for key in ident_keys:
+            insort(self._idents, (key, citizen_id))
+        self._docs[citizen_id] = (name, dpi or passport or "", name_keys, ident_keys)
+        while len(self._docs) > self.capacity:
+            self._remove(next(iter(self._docs)))
+
+    def add(self, citizens):
+        """
+        Agrega/actualiza ciudadanos (instancias o dicts con id, name, dpi, passport, phone).
+        """
+        with self._lock:
+            for c in citizens:
+                get = c.get if isinstance(c, dict) else lambda f, c=c: getattr(c, f)
+                self._add(get("id"), get("name"), get("dpi"), get("passport"), get("phone"))
+
+    def remove(self, citizen_ids):
+        with self._lock:
+            for citizen_id in citizen_ids:
+                self._remove(citizen_id)
+
+    # ---- carga ----
+    def warm(self):
+        """
+        Carga los ciudadanos más recientes (hasta la capacidad).
+        """
+        from .models import Citizen
+
+        started = timezone.now()
+        fields = ("id", "name", "dpi", "passport", "phone")
+        qs = Citizen.objects.order_by("-updated_at", "-id").values_list(*fields)[: self.capacity]
+        rows = list(qs.iterator(chunk_size=WARM_BATCH_SIZE))
+        with self._lock:
+            self._reset()
+            # Del más antiguo al más reciente, para que la recencia del OrderedDict sea correcta
+            names, idents = [], []
+            for cid, name, dpi, passport, phone in reversed(rows):
+                name_keys, ident_keys = citizen_keys(name, dpi, passport, phone)
+                names += [(k, cid) for k in name_keys]
+                idents += [(k, cid) for k in ident_keys]
+                self._docs[cid] = (name, dpi or passport or "", name_keys, ident_keys)
+            self._names = sorted(names)
+            self._idents = sorted(idents)
+            self._watermark = started
+            self._last_refresh = time.monotonic()
+            self.ready = True
+        logger.info("Índice de sugerencias cargado: %s ciudadanos", len(self._docs))
+
+    def warm_async(self):
+        def _run():
+            try:
+                self.warm()
+            except Exception:
+                # Sin índice la vista sigue funcionando contra la BD
+                logger.exception("No se pudo precargar el índice de sugerencias")
+
+        threading.Thread(target=_run, name="citizen-suggest-warm", daemon=True).start()
+
+    def refresh(self, force: bool = False):
+        """
+        Incorpora los ciudadanos modificados por otros procesos desde la última lectura.
+        """
+        interval = getattr(settings, "CITIZEN_SUGGEST_REFRESH_SECONDS", 30)
+        if not self.ready or (not force and time.monotonic() - self._last_refresh < interval):
+            return
+        from .models import Citizen
+
+        with self._lock:
+            since, self._watermark = self._watermark, timezone.now()
+            self._last_refresh = time.monotonic()
+        rows = Citizen.objects.filter(updated_at__gte=since).values("id", "name", "dpi", "passport", "phone")
+        self.add(list(rows))
+
+    # ---- lectura ----
+    @staticmethod
+    def _scan(bucket, prefix, limit, out):
+        pos = bisect_left(bucket, (prefix,))
+        while pos < len(bucket) and len(out) < limit:
+            key, cid = bucket[pos]
+            if not key.startswith(prefix):
+                break
+            out.setdefault(cid, None)
+            pos += 1
+
+    def suggest(self, q: str, limit: int = 8):
+        """
+        Top-k [{id, name, ident}] cuyo nombre, DPI, pasaporte o teléfono empieza
+        con q. Retorna None si el índice aún no está cargado.
+        """
+        if not self.ready:
+            return None
+        self.refresh()
+        prefix = normalize_name(q)
+        digits = _digits(q)
+        if not prefix:
+            return []
+        found = {}
+        with self._lock:
+            if digits and not any(ch.isalpha() for ch in prefix):
+                # Solo números (DPI o teléfono, con o sin guiones)
+                self._scan(self._idents, digits, limit, found)
+            else:
+                self._scan(self._idents, prefix, limit, found)
+                self._scan(self._names, prefix, limit, found)
+            docs = [(cid, self._docs.get(cid)) for cid in found]
+        return [{"id": cid, "name": doc[0], "ident": doc[1]} for cid, doc in docs if doc]
+
+
+citizen_index = CitizenSuggestIndex()
@@ -1,5 +1,647 @@
-from django.test import TestCase
+import base64
+import json
+from datetime import datetime, time, timedelta
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from auditlog.models import AuditLog
+from catalog.cache import topic_catalog
+from catalog.models import Topic
+from .models import Citizen, IdempotencyKey, VisitCase, Visit, OccupancyCounter, CASE_CLOSED, CASE_OPEN
+from .projections import visit_rows
+from .resolver import MAX_CASES
+from .search import search_query_text
+from .serializers import CitizenSerializer, VisitSerializer
+from .suggest import CitizenSuggestIndex, citizen_index
+
+User = get_user_model()
+
+VISITS_URL = "/api/visits/visits/"
+
 
 class VisitsSmokeTest(TestCase):
     def test_smoke(self):
         self.assertTrue(True)
+
+
+class CheckinTest(TestCase):
+    # Presupuesto por check-in: upsert ciudadano + select ciudadano + select expediente
+    # + insert expediente + insert visita + badge_code + contadores + resumen diario
+    # + bitácora
+    # + savepoint (2). El topic sale de la caché del catálogo.
+    CHECKIN_QUERIES = 11
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="recepcion", password="x")
+        self.topic = Topic.objects.create(code="TRAM-001", name="Constancia", unit="Secretaría")
+        topic_catalog.active()  # caché caliente, como en un worker ya iniciado
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def payload(self, **citizen):
+        data = {"dpi": "1234567", "name": "Ana Pérez", "phone": "5555-5555", "origin": "Zona 1"}
+        data.update(citizen)
+        return {"citizen": data, "topic_id": self.topic.id, "target_unit": "Tesorería", "reason": "Pago"}
+
+    def test_checkin_creates_citizen_case_and_visit(self):
+        res = self.client.post(VISITS_URL, self.payload(), format="json")
+        self.assertEqual(res.status_code, 201, res.data)
+        visit = Visit.objects.get()
+        self.assertEqual(visit.badge_code, Visit.make_badge_code(visit.id))
+        self.assertEqual(res.data["badge_code"], visit.badge_code)
+        case = visit.case
+        self.assertEqual(case.code_persistente, VisitCase.make_code(case.citizen_id, self.topic.id))
+        self.assertEqual(res.data["case"]["citizen"]["name"], "Ana Pérez")
+        self.assertEqual(
+            set(AuditLog.objects.exclude(action="user_created").values_list("action", flat=True)),
+            {"case_created", "visit_checkin"},
+        )
+
+    def test_checkin_query_budget(self):
+        with self.assertNumQueries(self.CHECKIN_QUERIES):
+            res = self.client.post(VISITS_URL, self.payload(), format="json")
+        self.assertEqual(res.status_code, 201, res.data)
+        # El segundo check-in reutiliza expediente: una sentencia menos
+        with self.assertNumQueries(self.CHECKIN_QUERIES - 1):
+            res = self.client.post(VISITS_URL, self.payload(name="Ana María Pérez"), format="json")
+        self.assertEqual(res.status_code, 201, res.data)
+        self.assertEqual(Citizen.objects.get().name, "Ana María Pérez")
+        self.assertEqual(VisitCase.objects.count(), 1)
+        self.assertEqual(Visit.objects.count(), 2)
+
+    def test_checkin_returns_stored_citizen(self):
+        existing = Citizen.objects.create(dpi="1234567", passport="P-77", name="Ana")
+        Citizen.objects.filter(pk=existing.pk).update(created_at=timezone.now() - timedelta(days=30))
+        existing.refresh_from_db()
+        res = self.client.post(VISITS_URL, self.payload(), format="json")
+        self.assertEqual(res.status_code, 201, res.data)
+        citizen = res.data["case"]["citizen"]
+        self.assertEqual(citizen["id"], existing.pk)
+        self.assertEqual(citizen["passport"], "P-77")
+        self.assertEqual(citizen["name"], "Ana Pérez")
+        self.assertEqual(citizen["created_at"], CitizenSerializer(existing).data["created_at"])
+
+    def test_checkin_refreshes_search_documents_of_updated_citizens(self):
+        existing = Citizen.objects.create(dpi="1234567", name="Ana")
+        with mock.patch("visits.services.refresh_search_documents") as refresh:
+            res = self.client.post(f"{VISITS_URL}bulk/", {
+                "citizens": [{"dpi": "1234567", "name": "Ana Pérez"}, {"dpi": "7654321", "name": "Luis"}],
+                "topic_id": self.topic.id, "target_unit": "Tesorería",
+            }, format="json")
+        self.assertEqual(res.status_code, 201, res.data)
+        new_visit = Visit.objects.get(case__citizen__dpi="7654321")
+        self.assertEqual(refresh.call_args_list, [
+            mock.call(visit_ids=[new_visit.id]),
+            mock.call(citizen_ids=[existing.pk]),
+        ])
+
+    def test_checkin_reopens_closed_case(self):
+        self.client.post(VISITS_URL, self.payload(), format="json")
+        VisitCase.objects.update(state=CASE_CLOSED)
+        data = self.payload()
+        data["reopen_justification"] = "Nuevo trámite"
+        res = self.client.post(VISITS_URL, data, format="json")
+        self.assertEqual(res.status_code, 201, res.data)
+        case = VisitCase.objects.get()
+        self.assertEqual(case.state, CASE_OPEN)
+        self.assertEqual(case.last_reopen_reason, "Nuevo trámite")
+
+    def test_checkin_rejects_inactive_topic(self):
+        self.topic.is_active = False
+        self.topic.save()
+        res = self.client.post(VISITS_URL, self.payload(), format="json")
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("topic_id", res.data)
+
+
+class BulkCheckinTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="recepcion", password="x")
+        self.topic = Topic.objects.create(code="TOUR-001", name="Visita guiada", unit="Comunicación")
+        topic_catalog.active()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def payload(self, citizens):
+        return {"citizens": citizens, "topic_id": self.topic.id, "target_unit": "Salón", "reason": "Excursión"}
+
+    def test_bulk_checkin_returns_all_badges(self):
+        Citizen.objects.create(dpi="1000001", name="Existente")
+        citizens = [{"dpi": f"{1000000 + i}", "name": f"Alumno {i}"} for i in range(1, 21)]
+        citizens.append({"passport": "P-1", "name": "Docente"})
+        with self.assertNumQueries(12):
+            res = self.client.post(f"{VISITS_URL}bulk/", self.payload(citizens), format="json")
+        self.assertEqual(res.status_code, 201, res.data)
+        self.assertEqual(res.data["count"], 21)
+        badges = [v["badge_code"] for v in res.data["results"]]
+        self.assertEqual(len(set(badges)), 21)
+        self.assertEqual(res.data["results"][0]["case"]["citizen"]["name"], "Alumno 1")
+        self.assertEqual(Citizen.objects.count(), 21)
+        self.assertEqual(VisitCase.objects.count(), 21)
+        self.assertEqual(AuditLog.objects.filter(action="visit_checkin").count(), 21)
+
+    def test_bulk_checkin_reports_row_errors(self):
+        citizens = [
+            {"dpi": "2000001", "name": "Ok"},
+            {"name": "Sin identificación"},
+            {"dpi": "2000001", "name": "Repetido"},
+        ]
+        res = self.client.post(f"{VISITS_URL}bulk/", self.payload(citizens), format="json")
+        self.assertEqual(res.status_code, 400)
+        errors = res.data["citizens"]
+        self.assertEqual(errors[0], {})
+        self.assertTrue(errors[1])
+        self.assertTrue(errors[2])
+        self.assertFalse(Visit.objects.exists())
+
+
+class IngestTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="recepcion", password="x")
+        self.topic = Topic.objects.create(code="TRAM-002", name="Licencia", unit="Catastro")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def checkin_event(self, event_id, dpi, at):
+        return {
+            "event_id": event_id, "event_type": "checkin", "occurred_at": at,
+            "citizen": {"dpi": dpi, "name": f"Ciudadano {dpi}"},
+            "topic_id": self.topic.id, "target_unit": "Catastro",
+        }
+
+    def test_ingest_applies_in_order_and_deduplicates(self):
+        events = [
+            self.checkin_event("e1", "3000001", "2026-01-05T08:00:00-06:00"),
+            self.checkin_event("e2", "3000002", "2026-01-05T08:05:00-06:00"),
+            {"event_id": "e3", "event_type": "checkout", "occurred_at": "2026-01-05T09:00:00-06:00", "checkin_event_id": "e1"},
+            {"event_id": "e4", "event_type": "checkout", "occurred_at": "2026-01-05T09:10:00-06:00", "badge_code": "NO-EXISTE"},
+            {"event_id": "e5", "event_type": "checkin", "occurred_at": "2026-01-05T09:20:00-06:00"},
+        ]
+        res = self.client.post(f"{VISITS_URL}ingest/", {"events": events}, format="json")
+        self.assertEqual(res.status_code, 200, res.data)
+        statuses = [r["status"] for r in res.data["results"]]
+        self.assertEqual(statuses, ["applied", "applied", "applied", "error", "error"])
+
+        first = Visit.objects.get(pk=res.data["results"][0]["visit_id"])
+        self.assertEqual(first.checkin_at.isoformat(), "2026-01-05T14:00:00+00:00")
+        self.assertEqual(first.checkout_at.isoformat(), "2026-01-05T15:00:00+00:00")
+        self.assertEqual(res.data["results"][2]["badge_code"], first.badge_code)
+
+        # Reenvío del mismo lote: nada nuevo, se mapea a las mismas visitas
+        res2 = self.client.post(f"{VISITS_URL}ingest/", {"events": events[:3]}, format="json")
+        self.assertEqual([r["status"] for r in res2.data["results"]], ["duplicate"] * 3)
+        self.assertEqual(res2.data["results"][0]["visit_id"], first.id)
+        self.assertEqual(Visit.objects.count(), 2)
+
+        # Una salida posterior puede referenciar una entrada de un lote anterior
+        later = {"event_id": "e6", "event_type": "checkout", "occurred_at": "2026-01-05T10:00:00-06:00", "checkin_event_id": "e2"}
+        res3 = self.client.post(f"{VISITS_URL}ingest/", {"events": [later]}, format="json")
+        self.assertEqual(res3.data["results"][0]["status"], "applied")
+        self.assertFalse(Visit.objects.filter(checkout_at__isnull=True).exists())
+
+
+class IdempotencyTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="recepcion", password="x")
+        self.topic = Topic.objects.create(code="TRAM-003", name="Permiso", unit="Obras")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.payload = {
+            "citizen": {"dpi": "4000001", "name": "Luis"},
+            "topic_id": self.topic.id, "target_unit": "Obras",
+        }
+
+    def test_retried_checkin_is_replayed(self):
+        headers = {"HTTP_IDEMPOTENCY_KEY": "abc-123"}
+        first = self.client.post(VISITS_URL, self.payload, format="json", **headers)
+        self.assertEqual(first.status_code, 201)
+        with self.assertNumQueries(1):  # solo la lectura de la respuesta guardada
+            second = self.client.post(VISITS_URL, self.payload, format="json", **headers)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(second.data["badge_code"], first.data["badge_code"])
+        self.assertEqual(Visit.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY_WAIT_SECONDS=0)
+    def test_retry_after_conflict_keeps_key_and_is_replayed(self):
+        # El cliente reintenta con la misma llave tras un 409 (primera petición en curso)
+        headers = {"HTTP_IDEMPOTENCY_KEY": "abc-409"}
+        first = self.client.post(VISITS_URL, self.payload, format="json", **headers)
+        record = IdempotencyKey.objects.get(key="abc-409")
+        IdempotencyKey.objects.filter(pk=record.pk).update(status_code=None)
+        conflict = self.client.post(VISITS_URL, self.payload, format="json", **headers)
+        self.assertEqual(conflict.status_code, 409)
+
+        IdempotencyKey.objects.filter(pk=record.pk).update(status_code=record.status_code)
+        retry = self.client.post(VISITS_URL, self.payload, format="json", **headers)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.data["badge_code"], first.data["badge_code"])
+        self.assertEqual(Visit.objects.count(), 1)
+
+    def test_key_reused_on_other_endpoint_is_rejected(self):
+        headers = {"HTTP_IDEMPOTENCY_KEY": "abc-456"}
+        res = self.client.post(VISITS_URL, self.payload, format="json", **headers)
+        badge = res.data["badge_code"]
+        res = self.client.patch(f"{VISITS_URL}checkout/", {"badge_code": badge}, format="json", **headers)
+        self.assertEqual(res.status_code, 422)
+
+    def test_retried_checkout_writes_single_audit_row(self):
+        res = self.client.post(VISITS_URL, self.payload, format="json")
+        url = f"{VISITS_URL}{res.data['id']}/checkout/"
+        headers = {"HTTP_IDEMPOTENCY_KEY": "out-1"}
+        self.assertEqual(self.client.patch(url, format="json", **headers).status_code, 200)
+        self.assertEqual(self.client.patch(url, format="json", **headers).status_code, 200)
+        # Sin llave, el segundo checkout se rechaza sin escribir bitácora
+        self.assertEqual(self.client.patch(url, format="json").status_code, 400)
+        self.assertEqual(AuditLog.objects.filter(action="visit_checkout").count(), 1)
+
+
+class BulkCheckoutTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="seguridad", password="x")
+        topic = Topic.objects.create(code="TRAM-004", name="Audiencia", unit="Alcaldía")
+        citizen = Citizen.objects.create(dpi="5000001", name="Eva")
+        self.case = VisitCase.objects.create(citizen=citizen, topic=topic, code_persistente="CASE-X")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_visit(self, **kwargs):
+        return Visit.objects.create(case=self.case, intake_user=self.user, target_unit="Alcaldía", **kwargs)
+
+    def test_bulk_checkout_by_badge_codes(self):
+        a, b = self.make_visit(), self.make_visit()
+        done = self.make_visit(checkout_at=timezone.now())
+        AuditLog.objects.all().delete()
+        payload = {"badge_codes": [a.badge_code, b.badge_code, done.badge_code, "VIS-0000-000000"]}
+        res = self.client.post(f"{VISITS_URL}checkout/bulk/", payload, format="json")
+        self.assertEqual(res.status_code, 200, res.data)
+        self.assertEqual(res.data["count"], 2)
+        self.assertEqual(res.data["skipped"], [done.badge_code, "VIS-0000-000000"])
+        self.assertFalse(Visit.objects.filter(checkout_at__isnull=True).exists())
+        self.assertEqual(AuditLog.objects.filter(action="visit_checkout").count(), 2)
+
+    def test_bulk_checkout_requires_single_selector(self):
+        res = self.client.post(f"{VISITS_URL}checkout/bulk/", {"ids": [1], "before": "2026-01-01T00:00:00Z"}, format="json")
+        self.assertEqual(res.status_code, 400)
+
+    def test_auto_checkout_closes_at_closing_hour(self):
+        tz = timezone.get_current_timezone()
+        yesterday = timezone.localdate() - timedelta(days=1)
+        morning = timezone.make_aware(datetime.combine(yesterday, time(9)), tz)
+        forgotten = self.make_visit(checkin_at=morning)
+        call_command("auto_checkout", "--hour", "18", stdout=StringIO())
+        forgotten.refresh_from_db()
+        self.assertEqual(timezone.localtime(forgotten.checkout_at, tz).hour, 18)
+        self.assertEqual(timezone.localtime(forgotten.checkout_at, tz).date(), yesterday)
+        # Segunda ejecución: nada que cerrar
+        out = StringIO()
+        call_command("auto_checkout", "--hour", "18", stdout=out)
+        self.assertIn("No hay visitas abiertas", out.getvalue())
+
+
+class OccupancyTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="recepcion", password="x")
+        self.topic = Topic.objects.create(code="TRAM-005", name="Consulta", unit="Atención")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_stats_follow_checkins_and_checkouts(self):
+        for dpi in ("6000001", "6000002", "6000003"):
+            payload = {"citizen": {"dpi": dpi, "name": "X"}, "topic_id": self.topic.id, "target_unit": "Atención"}
+            res = self.client.post(VISITS_URL, payload, format="json")
+        self.client.patch(f"{VISITS_URL}{res.data['id']}/checkout/", format="json")
+
+        with self.assertNumQueries(1):
+            stats = self.client.get(f"{VISITS_URL}stats/").data
+        self.assertEqual(stats, {"activos": 2, "entradas_hoy": 3, "salidas_hoy": 1})
+
+        self.client.delete(f"{VISITS_URL}{res.data['id']}/")
+        self.assertEqual(self.client.get(f"{VISITS_URL}stats/").data["entradas_hoy"], 2)
+
+    def test_stats_and_recent_conditional_get(self):
+        payload = {"citizen": {"dpi": "6000010", "name": "X"}, "topic_id": self.topic.id, "target_unit": "Atención"}
+        res = self.client.post(VISITS_URL, payload, format="json")
+        etags = {p: self.client.get(f"{VISITS_URL}{p}/")["ETag"] for p in ("stats", "recent", "active")}
+        for path, etag in etags.items():
+            self.assertEqual(self.client.get(f"{VISITS_URL}{path}/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.patch(f"{VISITS_URL}{res.data['id']}/checkout/", format="json")
+        for path, etag in etags.items():
+            self.assertEqual(self.client.get(f"{VISITS_URL}{path}/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_rebuild_fixes_drift(self):
+        payload = {"citizen": {"dpi": "6000009", "name": "X"}, "topic_id": self.topic.id, "target_unit": "Atención"}
+        self.client.post(VISITS_URL, payload, format="json")
+        OccupancyCounter.objects.update(checkins=42)
+        out = StringIO()
+        call_command("rebuild_occupancy", "--check", stdout=out)
+        self.assertIn("Claves con diferencia: 2", out.getvalue())
+        self.assertEqual(OccupancyCounter.objects.filter(checkins=42).count(), 2)
+        out = StringIO()
+        call_command("rebuild_occupancy", stdout=out)
+        self.assertIn("2 corregidas", out.getvalue())
+        self.assertEqual(self.client.get(f"{VISITS_URL}stats/").data["activos"], 1)
+
+
+class NameSearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="recepcion", password="x")
+        self.topic = Topic.objects.create(code="TRAM-006", name="Consulta", unit="Atención")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for dpi, name in (("8000001", "José Pérez"), ("8000002", "Ana Peña"), ("8000003", "Luis Ortiz")):
+            payload = {"citizen": {"dpi": dpi, "name": name}, "topic_id": self.topic.id, "target_unit": "Atención"}
+            self.client.post(VISITS_URL, payload, format="json")
+
+    def test_name_search_is_maintained_on_write(self):
+        self.assertEqual(Citizen.objects.get(dpi="8000001").name_search, "jose perez")
+        citizen = Citizen.objects.get(dpi="8000002")
+        citizen.name = "Ána  PEÑA López"
+        citizen.save(update_fields=["name"])
+        citizen.refresh_from_db()
+        self.assertEqual(citizen.name_search, "ana pena lopez")
+
+    def test_lookups_ignore_accents_and_case(self):
+        res = self.client.get("/api/visits/search/", {"name": "perez"})
+        self.assertEqual(res.data["citizen"]["dpi"], "8000001")
+        res = self.client.get("/api/visits/citizens/", {"search": "PEÑA"})
+        self.assertEqual([c["dpi"] for c in res.data["results"]], ["8000002"])
+        res = self.client.get(VISITS_URL, {"citizen_name": "jósé"})
+        self.assertEqual(res.data["count"], 1)
+        res = self.client.get("/api/visits/cases/", {"citizen_name": "ortiz"})
+        self.assertEqual(res.data["count"], 1)
+
+
+class CitizenSuggestTest(TestCase):
+    URL = "/api/visits/citizens/suggest/"
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="recepcion", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Citizen.objects.create(dpi="9000001", name="María José Pérez", phone="5555-1234")
+        Citizen.objects.create(passport="X12345", name="John Smith")
+        self.addCleanup(citizen_index._reset)
+
+    def test_falls_back_to_db_until_warm(self):
+        self.assertFalse(citizen_index.ready)
+        res = self.client.get(self.URL, {"q": "jose"})
+        self.assertEqual([r["ident"] for r in res.data], ["9000001"])
+
+    def test_index_serves_prefixes_without_queries(self):
+        citizen_index.warm()
+        with self.assertNumQueries(0):
+            by_name = self.client.get(self.URL, {"q": "PEREZ"}).data
+            by_dpi = self.client.get(self.URL, {"q": "90000"}).data
+            by_phone = self.client.get(self.URL, {"q": "5555-12"}).data
+            by_passport = self.client.get(self.URL, {"q": "x123"}).data
+        self.assertEqual(by_name, [{"id": by_name[0]["id"], "name": "María José Pérez", "ident": "9000001"}])
+        self.assertEqual(by_dpi, by_name)
+        self.assertEqual(by_phone, by_name)
+        self.assertEqual(by_passport[0]["ident"], "X12345")
+
+    def test_index_follows_saves_and_is_bounded(self):
+        citizen_index.warm()
+        with self.captureOnCommitCallbacks(execute=True):
+            Citizen.objects.create(dpi="9000003", name="Pedro Páramo")
+        self.assertEqual(citizen_index.suggest("paramo")[0]["ident"], "9000003")
+
+        small = CitizenSuggestIndex(max_citizens=2)
+        small.warm()
+        small.add([{"id": 999, "name": "Nuevo", "dpi": "1", "passport": None, "phone": ""}])
+        self.assertEqual(len(small), 2)
+        self.assertEqual(small.suggest("nuevo")[0]["id"], 999)
+
+
+class VisitFullTextSearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="recepcion", password="x")
+        self.topic = Topic.objects.create(code="TRAM-007", name="Licencia de construcción", unit="Obras")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for dpi, name, reason in (("8100001", "Lucía Gómez", "Revisión de planos"), ("8100002", "Carlos Díaz", "Pago")):
+            payload = {"citizen": {"dpi": dpi, "name": name}, "topic_id": self.topic.id,
+                       "target_unit": "Obras", "reason": reason}
+            self.client.post(VISITS_URL, payload, format="json")
+
+    def test_query_text(self):
+        self.assertEqual(search_query_text("  Lucía  GÓM "), "lucia:* & gom:*")
+        self.assertEqual(search_query_text("VIS-2026-000001"), "vis:* & 2026:* & 000001:*")
+        self.assertEqual(search_query_text("'&|!"), "")
+
+    def test_search_param(self):
+        res = self.client.get(VISITS_URL, {"search": "planos"})
+        self.assertEqual([v["reason"] for v in res.data["results"]], ["Revisión de planos"])
+
+    @skipUnless(connection.vendor == "postgresql", "search_document solo existe en PostgreSQL")
+    def test_ranked_full_text(self):
+        res = self.client.get(VISITS_URL, {"search": "lucia construccion"})
+        self.assertEqual(res.data["count"], 1)
+        Visit.objects.update(search_document=None)
+        call_command("backfill_visit_search", stdout=StringIO())
+        self.assertEqual(self.client.get(VISITS_URL, {"search": "diaz"}).data["count"], 1)
+
+
+class SearchResolverTest(TestCase):
+    URL = "/api/visits/search/"
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="recepcion", password="x")
+        self.topic = Topic.objects.create(code="TRAM-008", name="Catastro", unit="Catastro")
+        self.other = Topic.objects.create(code="TRAM-009", name="Tesorería", unit="Tesorería")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for topic in (self.topic, self.other):
+            payload = {"citizen": {"dpi": "8200001", "name": "Rosa Méndez", "phone": "5555-0000"},
+                       "topic_id": topic.id, "target_unit": topic.unit}
+            self.last = self.client.post(VISITS_URL, payload, format="json").data
+        payload = {"citizen": {"dpi": "8200002", "name": "Rosa Mena", "phone": "5555-0000"},
+                   "topic_id": self.topic.id, "target_unit": "Catastro"}
+        self.client.post(VISITS_URL, payload, format="json")
+
+    def test_dpi_and_topic_resolve_case_in_two_queries(self):
+        with self.assertNumQueries(2):
+            data = self.client.get(self.URL, {"dpi": "8200001", "topic": "TRAM-008"}).data
+        self.assertEqual(data["citizen"]["name"], "Rosa Méndez")
+        self.assertEqual(data["topic"], {"id": self.topic.id, "code": "TRAM-008", "name": "Catastro"})
+        self.assertEqual(data["case"]["code_persistente"], f"CASE-{data['citizen']['id']}-{self.topic.id}")
+        self.assertEqual([c["topic_id"] for c in data["cases"]], [self.topic.id])
+        self.assertNotIn("citizen", data["case"])
+
+    def test_candidates_and_case_code(self):
+        with self.assertNumQueries(1):
+            data = self.client.get(self.URL, {"phone": "5555-0000"}).data
+        self.assertIsNone(data["citizen"])
+        self.assertEqual({c["dpi"] for c in data["citizen_candidates"]}, {"8200001", "8200002"})
+
+        data = self.client.get(self.URL, {"phone": "5555-0000", "name": "mendez"}).data
+        self.assertEqual(data["citizen"]["dpi"], "8200001")
+        self.assertEqual(data["last_visit"]["badge_code"], self.last["badge_code"])
+
+        code = self.last["case"]["code_persistente"]
+        with self.assertNumQueries(2):
+            data = self.client.get(self.URL, {"case_code": code.lower()}).data
+        self.assertEqual(data["case"]["code_persistente"], code)
+        self.assertEqual(data["topic"]["name"], "Tesorería")
+        self.assertEqual(data["last_visit"]["badge_code"], self.last["badge_code"])
+
+    def test_case_older_than_case_cap_is_resolved(self):
+        citizen = Citizen.objects.get(dpi="8200001")
+        old = VisitCase.objects.get(citizen=citizen, topic=self.topic)
+        VisitCase.objects.filter(pk=old.pk).update(opened_at=timezone.now() - timedelta(days=365))
+        topics = Topic.objects.bulk_create([
+            Topic(code=f"TRAM-9{i:02d}", name=f"Tema {i}", unit="Varios") for i in range(MAX_CASES)
+        ])
+        VisitCase.objects.bulk_create([
+            VisitCase(citizen=citizen, topic=t, code_persistente=VisitCase.make_code(citizen.id, t.id)) for t in topics
+        ])
+        data = self.client.get(self.URL, {"case_code": old.code_persistente}).data
+        self.assertEqual(data["case"]["id"], old.id)
+        self.assertEqual([c["id"] for c in data["cases"]], [old.id])
+        data = self.client.get(self.URL, {"dpi": "8200001", "topic": "TRAM-008"}).data
+        self.assertEqual(data["case"]["id"], old.id)
+
+
+class VisitProjectionTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="recepcion", password="x")
+        self.topic = Topic.objects.create(code="TRAM-009", name="Licencias", unit="Obras")
+        topic_catalog.active()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for dpi in ("8300001", "8300002", "8300003"):
+            payload = {"citizen": {"dpi": dpi, "name": "Ana Pérez", "origin": "Mixco"},
+                       "topic_id": self.topic.id, "target_unit": "Obras", "reason": "Trámite"}
+            self.last = self.client.post(VISITS_URL, payload, format="json").data
+        self.client.patch(f"{VISITS_URL}{self.last['id']}/checkout/", format="json")
+
+    def test_same_json_as_serializer(self):
+        qs = Visit.objects.select_related("case", "case__citizen").order_by("-checkin_at", "-id")
+        expected = [dict(r) for r in VisitSerializer(qs, many=True).data]
+        self.assertEqual(visit_rows(qs), expected)
+        self.assertEqual(list(visit_rows(qs)[0]), list(expected[0]))
+        self.assertEqual(list(visit_rows(qs)[0]["case"]), list(expected[0]["case"]))
+
+    def test_list_recent_active_use_one_query(self):
+        expected = [dict(r) for r in VisitSerializer(Visit.objects.order_by("-checkin_at", "-id"), many=True).data]
+        with self.assertNumQueries(1):
+            res = self.client.get(VISITS_URL, {"pagination": "cursor"})
+        self.assertEqual(res.data["results"], expected)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(VISITS_URL).data["results"], expected)
+        with self.assertNumQueries(2):  # validador del ETag + listado
+            self.assertEqual(self.client.get(f"{VISITS_URL}recent/").data, expected)
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.client.get(f"{VISITS_URL}active/").data), 2)
+
+
+class SparseFieldsetTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="recepcion", password="x")
+        self.topic = Topic.objects.create(code="TRAM-010", name="Permisos", unit="Obras")
+        topic_catalog.active()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for dpi in ("8400001", "8400002", "8400003"):
+            payload = {"citizen": {"dpi": dpi, "name": "Luis Ajú", "phone": "5555-1111"},
+                       "topic_id": self.topic.id, "target_unit": "Obras", "reason": "Licencia"}
+            self.last = self.client.post(VISITS_URL, payload, format="json").data
+
+    def test_active_with_nested_fields_skips_columns(self):
+        fields = "id,badge_code,checkin_at,target_unit,case.citizen.name"
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(f"{VISITS_URL}active/", {"fields": fields})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(list(res.data[0]), ["id", "case", "checkin_at", "target_unit", "badge_code"])
+        self.assertEqual(res.data[0]["case"], {"citizen": {"name": "Luis Ajú"}})
+        sql = ctx.captured_queries[-1]["sql"]
+        self.assertNotIn("closed_reason", sql)
+        self.assertNotIn("phone", sql)
+
+    def test_list_omit_and_cursor(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(VISITS_URL, {"omit": "case,reason,photo_path", "pagination": "cursor", "page_size": 2})
+        self.assertNotIn("JOIN", ctx.captured_queries[-1]["sql"])
+        self.assertNotIn("case", res.data["results"][0])
+        self.assertIn("badge_code", res.data["results"][0])
+        nxt = self.client.get(res.data["next"])
+        self.assertEqual(len(nxt.data["results"]), 1)
+        self.assertNotIn("reason", nxt.data["results"][0])
+
+    def test_cursor_with_invalid_values_is_404(self):
+        for values in (["n", "not-a-date", 1], ["n", "2026-01-01T00:00:00Z", "x"], ["p", None, {}]):
+            token = base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+            res = self.client.get(VISITS_URL, {"cursor": token})
+            self.assertEqual(res.status_code, 404, values)
+            self.assertEqual(res.data["detail"], "Cursor inválido.")
+
+    def test_retrieve_and_cases_use_serializer_fieldsets(self):
+        res = self.client.get(f"{VISITS_URL}{self.last['id']}/", {"fields": "badge_code,case.code_persistente"})
+        self.assertEqual(res.data, {"case": {"code_persistente": self.last["case"]["code_persistente"]},
+                                    "badge_code": self.last["badge_code"]})
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get("/api/visits/cases/", {"fields": "code_persistente,citizen.name"})
+        self.assertEqual(res.data["results"][0]["citizen"], {"name": "Luis Ajú"})
+        self.assertNotIn("closed_reason", ctx.captured_queries[-1]["sql"])
+
+        res = self.client.get("/api/visits/citizens/", {"omit": "created_at,updated_at,origin"})
+        self.assertEqual(set(res.data["results"][0]), {"id", "dpi", "passport", "name", "phone"})
+
+    def test_unknown_field_is_rejected(self):
+        res = self.client.get(f"{VISITS_URL}active/", {"fields": "badge_code,case.citizen.salary"})
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.data["fields"], ["Campo desconocido: case.citizen.salary"])
+        res = self.client.get("/api/visits/cases/", {"fields": "state.name"})
+        self.assertEqual(res.status_code, 400)
+
+
+class SideloadTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="recepcion", password="x")
+        self.topics = [Topic.objects.create(code=f"TRAM-02{i}", name=f"Trámite {i}", unit="Obras") for i in range(3)]
+        topic_catalog.active()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for topic in self.topics:
+            payload = {"citizen": {"dpi": "8500001", "name": "Elena Cux"},
+                       "topic_id": topic.id, "target_unit": "Obras"}
+            self.last = self.client.post(VISITS_URL, payload, format="json").data
+        self.citizen_id = self.last["case"]["citizen"]["id"]
+
+    def test_cases_citizen_included_once(self):
+        plain = self.client.get("/api/visits/cases/").data
+        with self.assertNumQueries(2):
+            data = self.client.get("/api/visits/cases/", {"sideload": "1"}).data
+        self.assertEqual(data["count"], 3)
+        self.assertEqual({c["citizen"] for c in data["results"]}, {self.citizen_id})
+        self.assertEqual(data["included"], {"citizens": {str(self.citizen_id): plain["results"][0]["citizen"]}})
+        self.assertEqual([c["code_persistente"] for c in data["results"]],
+                         [c["code_persistente"] for c in plain["results"]])
+
+    def test_visits_nested_relations_included(self):
+        data = self.client.get(VISITS_URL, {"sideload": "true", "pagination": "cursor"}).data
+        self.assertEqual(len(data["results"]), 3)
+        self.assertEqual(len(data["included"]["cases"]), 3)
+        self.assertEqual(list(data["included"]["citizens"]), [str(self.citizen_id)])
+        case = data["included"]["cases"][str(data["results"][0]["case"])]
+        self.assertEqual(case["citizen"], self.citizen_id)
+
+    def test_search_normalized(self):
+        data = self.client.get("/api/visits/search/", {"dpi": "8500001", "sideload": "1"}).data
+        self.assertEqual(data["citizen"], self.citizen_id)
+        self.assertEqual(len(data["cases"]), 3)
+        self.assertEqual(set(data["included"]), {"citizens", "cases", "topics"})
+        self.assertEqual(len(data["included"]["topics"]), 3)
+        case = data["included"]["cases"][str(data["cases"][0])]
+        self.assertIn(case["topic"], [t.id for t in self.topics])
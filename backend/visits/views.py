@@ -3,27 +3,40 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
+from django_filters.rest_framework import DjangoFilterBackend
+from django.db import IntegrityError, transaction
 from django.db.models import Q, Max
 
-from catalog.models import Topic
 from .models import Citizen, VisitCase, Visit
 from .serializers import (
-    CitizenSerializer, VisitCaseSerializer, VisitSerializer, VisitCreateSerializer
+    CitizenSerializer, VisitCaseSerializer, VisitSerializer, VisitCreateSerializer,
+    VisitBulkCreateSerializer, VisitIngestSerializer, VisitBulkCheckoutSerializer,
 )
-from .filters import VisitFilter, VisitCaseFilter
+from .filters import VisitFilter, VisitCaseFilter, VisitSearchFilter
 from django.conf import settings
 from .serializers import PhotoUploadSerializer
 from .utils import _parse_base64, save_image_file, read_inmemory_uploadedfile
+from .services import checkout_one, checkout_visits, record_checkins, record_checkouts
+from .counters import read_occupancy
+from .search import normalize_name, rank_by_name
+from .resolver import normalize_search, resolve_search
+from .projections import VISIT_RELATIONS, shape_visits, visit_projection, visit_rows, visit_values
+from .suggest import citizen_index
+from .idempotency import idempotent
+from core.conditional import conditional
+from core.fieldsets import FIELDSET_PARAMETERS, SparseFieldsetMixin
+from core.sideload import SIDELOAD_PARAMETER, Included, normalize_rows, sideload_serializer, wants_sideload, with_included
+from core.pagination import KeysetOrPagePagination
 from django.utils import timezone
 
 from django.http import HttpResponse
 from .pdf import render_badge_pdf
 
-from auditlog.utils import log_action, get_client_ip
+from auditlog.utils import get_client_ip
 
 from django.utils import timezone
 from datetime import datetime
-from reports.utils import make_datetime_range
 
 from drf_spectacular.utils import (
     extend_schema, extend_schema_view, OpenApiParameter, OpenApiResponse,
@@ -35,45 +48,148 @@ class VisitsPlaceholderAPIView(APIView):
         return Response({"ok": True, "app": "visits"})
 
 # ---- Citizen (solo lectura básica; la creación ocurre desde el check-in) ----
-class CitizenViewSet(mixins.ListModelMixin,
+@extend_schema_view(list=extend_schema(parameters=FIELDSET_PARAMETERS), retrieve=extend_schema(parameters=FIELDSET_PARAMETERS))
+class CitizenViewSet(SparseFieldsetMixin,
+                     mixins.ListModelMixin,
                      mixins.RetrieveModelMixin,
                      viewsets.GenericViewSet):
     queryset = Citizen.objects.all().order_by("name")
     serializer_class = CitizenSerializer
     permission_classes = [IsAuthenticated]
-    search_fields = ["name", "dpi", "passport", "phone", "origin"]
+    search_fields = ["name_search__normalized", "dpi", "passport", "phone", "origin"]
     ordering_fields = ["name", "created_at"]
     ordering = ["name"]
+    pagination_class = KeysetOrPagePagination
+    cursor_ordering = ("name", "id")
+    SUGGEST_DEFAULT_LIMIT = 8
+    SUGGEST_MAX_LIMIT = 20
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # Con ?search= y sin orden explícito, los nombres más parecidos primero
+        term = (self.request.query_params.get("search") or "").strip()
+        if term and "ordering" not in self.request.query_params:
+            queryset = rank_by_name(queryset, term)
+        return queryset
+
+    @extend_schema(
+        summary="Autocompletar ciudadanos",
+        description="Coincidencias por prefijo de nombre (sin tildes), DPI, pasaporte o teléfono. "
+                    "Respuesta ligera: [{id, name, ident}].",
+        parameters=[
+            OpenApiParameter("q", OpenApiTypes.STR, OpenApiParameter.QUERY, required=True),
+            OpenApiParameter("limit", OpenApiTypes.INT, OpenApiParameter.QUERY),
+        ],
+    )
+    @action(detail=False, methods=["get"])
+    def suggest(self, request):
+        q = (request.query_params.get("q") or "").strip()
+        raw_limit = request.query_params.get("limit") or ""
+        limit = int(raw_limit) if raw_limit.isdigit() and int(raw_limit) > 0 else self.SUGGEST_DEFAULT_LIMIT
+        limit = min(limit, self.SUGGEST_MAX_LIMIT)
+        if not q:
+            return Response([])
+
+        results = citizen_index.suggest(q, limit)
+        if results is None:
+            # Índice aún cargando: misma búsqueda por prefijo contra la BD
+            norm = normalize_name(q)
+            rows = (Citizen.objects
+                    .filter(Q(name_search__startswith=norm) | Q(name_search__contains=f" {norm}")
+                            | Q(dpi__startswith=q) | Q(passport__istartswith=q) | Q(phone__startswith=q))
+                    .order_by("name_search", "id")
+                    .values("id", "name", "dpi", "passport")[:limit])
+            results = [{"id": r["id"], "name": r["name"], "ident": r["dpi"] or r["passport"] or ""} for r in rows]
+        return Response(results)
 
 
 # ---- VisitCase (lectura; se crea/gestiona desde VisitCreate) ----
-class VisitCaseViewSet(mixins.ListModelMixin,
+@extend_schema_view(list=extend_schema(parameters=[*FIELDSET_PARAMETERS, SIDELOAD_PARAMETER]),
+                    retrieve=extend_schema(parameters=FIELDSET_PARAMETERS))
+class VisitCaseViewSet(SparseFieldsetMixin,
+                       mixins.ListModelMixin,
                        mixins.RetrieveModelMixin,
                        viewsets.GenericViewSet):
     queryset = VisitCase.objects.select_related("citizen", "topic").all()
     serializer_class = VisitCaseSerializer
     permission_classes = [IsAuthenticated]
     filterset_class = VisitCaseFilter
-    search_fields = ["code_persistente", "citizen__name", "citizen__dpi", "topic__name"]
+    search_fields = ["code_persistente", "citizen__name_search__normalized", "citizen__dpi", "topic__name"]
     ordering_fields = ["opened_at", "updated_at", "state"]
     ordering = ["-opened_at"]
+    pagination_class = KeysetOrPagePagination
+    cursor_ordering = ("-opened_at", "-id")
+
+    def list(self, request, *args, **kwargs):
+        if not wants_sideload(request):
+            return super().list(request, *args, **kwargs)
+        # Normalizado: cada ciudadano se serializa una vez y va en "included"
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        included = Included()
+        rows = sideload_serializer(self.get_serializer(page if page is not None else queryset, many=True),
+                                   {"citizen": "citizens"}, included)
+        if page is not None:
+            return with_included(self.get_paginated_response(rows), included)
+        return Response({"results": rows, "included": included.data})
 
 
 # ---- Visit (incluye create con lógica de expediente) ----
-class VisitViewSet(viewsets.ModelViewSet):
+@extend_schema_view(
+    list=extend_schema(parameters=[*FIELDSET_PARAMETERS, SIDELOAD_PARAMETER]),
+    retrieve=extend_schema(parameters=FIELDSET_PARAMETERS),
+    recent=extend_schema(parameters=FIELDSET_PARAMETERS), active=extend_schema(parameters=FIELDSET_PARAMETERS),
+)
+class VisitViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Visit.objects.select_related("case", "case__citizen", "case__topic", "intake_user").all()
     serializer_class = VisitSerializer
     permission_classes = [IsAuthenticated]
     filterset_class = VisitFilter
-    search_fields = ["badge_code", "case__code_persistente", "case__citizen__name", "target_unit", "reason"]
+    filter_backends = [DjangoFilterBackend, OrderingFilter, VisitSearchFilter]
+    search_fields = ["badge_code", "case__code_persistente", "case__citizen__name_search__normalized", "target_unit", "reason"]
     ordering_fields = ["checkin_at", "checkout_at", "badge_code"]
     ordering = ["-checkin_at"]
+    pagination_class = KeysetOrPagePagination
+    cursor_ordering = ("-checkin_at", "-id")
+    fieldset_actions = ("list", "retrieve", "recent", "active")
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            record_checkins([instance], sign=-1)
+            if instance.checkout_at:
+                record_checkouts([instance], sign=-1)
 
     def get_serializer_class(self):
         if self.action in ["create"]:
             return VisitCreateSerializer
+        if self.action in ["bulk_create"]:
+            return VisitBulkCreateSerializer
+        if self.action in ["ingest"]:
+            return VisitIngestSerializer
+        if self.action in ["checkout_bulk"]:
+            return VisitBulkCheckoutSerializer
         return VisitSerializer
 
+    def list(self, request, *args, **kwargs):
+        # Lectura rápida (visits/projections.py): mismo JSON que VisitSerializer,
+        # recortado con ?fields= / ?omit=
+        projection = visit_projection(self.get_fieldset())
+        cursor = [f.lstrip("-") for f in self.cursor_ordering]
+        queryset = visit_values(self.filter_queryset(self.get_queryset()), projection, extra=cursor)
+        page = self.paginate_queryset(queryset)
+        rows = shape_visits(page if page is not None else queryset, projection)
+        if wants_sideload(request):
+            included = Included()
+            rows = normalize_rows(rows, VISIT_RELATIONS, included)
+            if page is None:
+                return Response({"results": rows, "included": included.data})
+            return with_included(self.get_paginated_response(rows), included)
+        if page is not None:
+            return self.get_paginated_response(rows)
+        return Response(rows)
+
+    @idempotent
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, context={"request": request})
         serializer.is_valid(raise_exception=True)
@@ -81,58 +197,92 @@ class VisitViewSet(viewsets.ModelViewSet):
         out = VisitSerializer(visit).data
         return Response(out, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=["post"], url_path="bulk")
+    @idempotent
+    def bulk_create(self, request):
+        """
+        POST /api/visits/visits/bulk/
+        { "citizens": [{...}, ...], "topic_id", "target_unit", "reason", "reopen_justification" }
+        Registra a todo el grupo en una transacción y devuelve todos los gafetes.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        visits = serializer.save()
+        out = VisitSerializer(visits, many=True).data
+        return Response({"count": len(out), "results": out}, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["post"], url_path="ingest")
+    def ingest(self, request):
+        """
+        POST /api/visits/visits/ingest/
+        { "events": [{ "event_id", "event_type": "checkin"|"checkout", "occurred_at", ... }, ...] }
+        Reenvío en lote de eventos capturados sin conexión (respeta la hora original
+        y descarta event_id ya recibidos). Devuelve un resultado por evento.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            results = serializer.save()
+        except IntegrityError:
+            # Otro reenvío del mismo lote se está aplicando en paralelo
+            return Response({"detail": "Lote en proceso; reintente en unos segundos."}, status=status.HTTP_409_CONFLICT)
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+    # Validadores de GET condicional (core/conditional.py): ids + updated_at de las
+    # filas listadas, sin serializar. Cambios solo en ciudadano/tema no cambian el ETag.
+    def _recent_validator(self, request):
+        return list(Visit.objects.order_by("-checkin_at").values_list("id", "updated_at")[:20])
+
+    def _active_validator(self, request):
+        return list(Visit.objects.filter(checkout_at__isnull=True).order_by("id").values_list("id", "updated_at"))
+
+    def _stats_validator(self, request):
+        # La lectura de contadores es la misma respuesta; se reutiliza en stats()
+        self._occupancy = read_occupancy()
+        return sorted(self._occupancy.items())
+
     @action(detail=False, methods=["get"], url_path="recent")
+    @conditional(_recent_validator)
     def recent(self, request):
         qs = self.get_queryset().order_by("-checkin_at")[:20]
-        ser = VisitSerializer(qs, many=True)
-        return Response(ser.data, status=200)
+        return Response(visit_rows(qs, visit_projection(self.get_fieldset())), status=200)
     
     # ✅ NUEVO ENDPOINT: listar visitantes activos
     @action(detail=False, methods=["get"], url_path="active")
+    @conditional(_active_validator)
     def active(self, request):
         """
         GET /api/visits/visits/active/
         Retorna todas las visitas sin checkout (visitantes activos).
         """
         qs = self.get_queryset().filter(checkout_at__isnull=True)
-        serializer = self.get_serializer(qs, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(visit_rows(qs, visit_projection(self.get_fieldset())), status=status.HTTP_200_OK)
     
-    # Helper interno: marca checkout, valida idempotencia
+    # Helper interno: marca checkout (ver services.checkout_one); un checkout
+    # repetido se rechaza sin escribir bitácora.
     def _perform_checkout(self, visit, request=None):
-        if visit.checkout_at:
+        closed = checkout_one(
+            getattr(request, "user", None), visit,
+            ip=get_client_ip(request) if request else None,
+        )
+        if not closed:
             return None, {"detail": "La visita ya tiene checkout registrado."}
-        from django.utils import timezone
-        visit.checkout_at = timezone.now()
-        visit.save(update_fields=["checkout_at", "updated_at"])
-
-        # Auditoría con usuario + IP
-        try:
-            log_action(
-                user=getattr(request, "user", None),
-                action="visit_checkout",
-                entity="Visit",
-                entity_id=str(visit.id),
-                payload={"badge_code": visit.badge_code, "case_id": visit.case_id},
-                ip=get_client_ip(request) if request else None,
-            )
-        except Exception:
-            pass
-
         return visit, None
 
     @action(detail=True, methods=["patch"], url_path="checkout")
+    @idempotent
     def checkout_by_id(self, request, pk=None):
         """
         PATCH /api/visits/visits/{id}/checkout/
         """
         visit = self.get_object()
-        updated, error = self._perform_checkout(visit)
+        updated, error = self._perform_checkout(visit, request)
         if error:
             return Response(error, status=status.HTTP_400_BAD_REQUEST)
         return Response(VisitSerializer(updated).data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["patch"], url_path="checkout")
+    @idempotent
     def checkout_by_badge(self, request):
         """
         PATCH /api/visits/visits/checkout/?badge_code=...  (o JSON { "badge_code": "..." })
@@ -141,15 +291,40 @@ class VisitViewSet(viewsets.ModelViewSet):
         if not badge_code:
             return Response({"detail": "Debe proporcionar 'badge_code'."}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            visit = Visit.objects.get(badge_code=badge_code)
+            visit = self.get_queryset().get(badge_code=badge_code)
         except Visit.DoesNotExist:
             return Response({"detail": "No existe una visita con ese badge_code."}, status=status.HTTP_404_NOT_FOUND)
 
-        updated, error = self._perform_checkout(visit)
+        updated, error = self._perform_checkout(visit, request)
         if error:
             return Response(error, status=status.HTTP_400_BAD_REQUEST)
         return Response(VisitSerializer(updated).data, status=status.HTTP_200_OK)
     
+    @action(detail=False, methods=["post"], url_path="checkout/bulk")
+    @idempotent
+    def checkout_bulk(self, request):
+        """
+        POST /api/visits/visits/checkout/bulk/
+        { "ids": [...] } | { "badge_codes": [...] } | { "before": "<ISO datetime>" }
+        Cierra las visitas activas indicadas con un solo UPDATE.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        closed = checkout_visits(request.user, serializer.get_queryset(), ip=get_client_ip(request))
+
+        data = serializer.validated_data
+        skipped = []
+        if "ids" in data:
+            done = {r["id"] for r in closed}
+            skipped = [i for i in data["ids"] if i not in done]
+        elif "badge_codes" in data:
+            done = {r["badge_code"] for r in closed}
+            skipped = [b for b in data["badge_codes"] if b not in done]
+        return Response(
+            {"count": len(closed), "results": closed, "skipped": skipped},
+            status=status.HTTP_200_OK,
+        )
+
     @action(detail=True, methods=["get"], url_path=r"badge\.pdf")
     def badge_pdf(self, request, pk=None):
         """
@@ -171,30 +346,17 @@ class VisitViewSet(viewsets.ModelViewSet):
 
     
     @action(detail=False, methods=["get"], url_path="stats")
+    @conditional(_stats_validator)
     def stats(self, request):
         """
         GET /api/visits/visits/stats/
         Retorna estadísticas para el dashboard.
         """
-        # 1. Visitantes activos (sin checkout)
-        activos = Visit.objects.filter(checkout_at__isnull=True).count()
-        
-        # 2. Usar la utilidad de reportes para el rango de "hoy"
-        tz = timezone.get_current_timezone()
-        # (from_str=None, to_str=None) por defecto usa el día de hoy
-        dt_from, dt_to = make_datetime_range(None, None, tz) 
-
-        # 3. Entradas de hoy (checkin en el rango de hoy)
-        entradas_hoy = Visit.objects.filter(checkin_at__gte=dt_from, checkin_at__lt=dt_to).count()
-        
-        # 4. Salidas de hoy (checkout en el rango de hoy)
-        salidas_hoy = Visit.objects.filter(checkout_at__gte=dt_from, checkout_at__lt=dt_to).count()
-
-        data = {
-            "activos": activos,
-            "entradas_hoy": entradas_hoy,
-            "salidas_hoy": salidas_hoy
-        }
+        # Contadores incrementales (visits/counters.py): lectura O(1),
+        # sin COUNT(*) sobre Visit. Si se desfasan: manage.py rebuild_occupancy
+        data = getattr(self, "_occupancy", None)
+        if data is None:
+            data = read_occupancy()
         return Response(data, status=status.HTTP_200_OK)
     
     
@@ -239,106 +401,18 @@ class SearchAPIView(APIView):
     """
     GET /api/visits/search/?dpi=&phone=&name=&case_code=&topic=
     - topic: acepta id numérico, o código/nombre (icontains)
-    Retorna: citizen, citizen_candidates, topic, topic_candidates, case, cases, last_visit
+    Retorna (compacto): citizen, citizen_candidates, topic, topic_candidates, case, cases, last_visit.
+    Con ?sideload=1: referencias por id y entidades en "included".
+    Como máximo 2 consultas; ver visits/resolver.py.
     """
     permission_classes = [IsAuthenticated]
 
-    def get_topic_from_param(self, topic_param: str | None):
-        if not topic_param:
-            return None, []
-        topic = None
-        candidates = []
-        # Si es número, intenta por id
-        if topic_param.isdigit():
-            topic = Topic.objects.filter(id=int(topic_param), is_active=True).first()
-            if topic:
-                return topic, []
-        # Buscar por code o name (icontains)
-        qs = Topic.objects.filter(is_active=True).filter(
-            Q(code__iexact=topic_param) | Q(name__icontains=topic_param)
-        )[:10]
-        candidates = list(qs)
-        if len(candidates) == 1:
-            topic = candidates[0]
-            candidates = []
-        return topic, candidates
-
     def get(self, request):
-        dpi = (request.query_params.get("dpi") or "").strip()
-        phone = (request.query_params.get("phone") or "").strip()
-        name = (request.query_params.get("name") or "").strip()
-        case_code = (request.query_params.get("case_code") or "").strip()
-        topic_param = (request.query_params.get("topic") or "").strip()
-
-        # --- Topic (claro o candidatos) ---
-        topic, topic_candidates = self.get_topic_from_param(topic_param)
-
-        # --- Citizen (claro o candidatos) ---
-        citizen = None
-        citizen_candidates = []
-
-        # Prioridad: dpi exacto > phone exacto > name icontains
-        if dpi:
-            citizen = Citizen.objects.filter(dpi__iexact=dpi).first()
-        if not citizen and phone:
-            # varios podrían tener el mismo phone; listamos candidatos
-            cands = Citizen.objects.filter(phone__iexact=phone)[:10]
-            if cands.count() == 1:
-                citizen = cands.first()
-            else:
-                citizen_candidates = list(cands)
-        if not citizen and name:
-            # buscar por nombre
-            cands = Citizen.objects.filter(name__icontains=name)[:10]
-            if cands.count() == 1:
-                citizen = cands.first()
-            else:
-                citizen_candidates = list(cands)
-
-        # Si viene case_code, úsalo para fijar case (y de ahí citizen/topic)
-        case = None
-        cases = []
-        last_visit = None
-
-        if case_code:
-            case = VisitCase.objects.select_related("citizen", "topic").filter(code_persistente__iexact=case_code).first()
-            if case:
-                citizen = citizen or case.citizen
-                topic = topic or case.topic
-
-        # Si ya tengo citizen (y quizá topic), arma el set de cases
-        if citizen:
-            qs_cases = VisitCase.objects.select_related("citizen", "topic").filter(citizen=citizen)
-            if topic:
-                qs_cases = qs_cases.filter(topic=topic)
-            cases = list(qs_cases.order_by("-opened_at")[:50])
-            # Si topic único → intenta definir case principal
-            if not case and topic:
-                case = qs_cases.order_by("-opened_at").first()
-            # last_visit: del case si hay; si no, de ese citizen
-            if case:
-                last_visit = Visit.objects.filter(case=case).order_by("-checkin_at").first()
-            else:
-                last_visit = Visit.objects.filter(case__citizen=citizen).order_by("-checkin_at").first()
-        else:
-            # Sin citizen claro pero con topic: no hay cases definidos; last_visit no aplica
-            pass
-
-        # Serialización
-        out = {
-            "query": {
-                "dpi": dpi,
-                "phone": phone,
-                "name": name,
-                "case_code": case_code,
-                "topic": topic_param,
-            },
-            "citizen": CitizenSerializer(citizen).data if citizen else None,
-            "citizen_candidates": CitizenSerializer(citizen_candidates, many=True).data if citizen_candidates else [],
-            "topic": {"id": topic.id, "code": topic.code, "name": topic.name} if topic else None,
-            "topic_candidates": [{"id": t.id, "code": t.code, "name": t.name} for t in topic_candidates] if topic_candidates else [],
-            "case": VisitCaseSerializer(case).data if case else None,
-            "cases": VisitCaseSerializer(cases, many=True).data if cases else [],
-            "last_visit": VisitSerializer(last_visit).data if last_visit else None,
+        params = {
+            key: (request.query_params.get(key) or "").strip()
+            for key in ("dpi", "phone", "name", "case_code", "topic")
         }
-        return Response(out, status=200)
\ No newline at end of file
+        result = resolve_search(**params)
+        if wants_sideload(request):
+            result = normalize_search(result)
+        return Response(result, status=200)
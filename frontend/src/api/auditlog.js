@@ -9,6 +9,8 @@ const AUDIT_PATH = import.meta.env.VITE_AUDIT_PATH || '/api/auditlog/logs/'
  * - user: id numérico (opcional)
  * - search: busca en entity, entity_id, user__username, ip
  * - page / page_size: paginación
+ * - cursor: modo keyset (?pagination=cursor). Pase '' para la primera página y
+ *   luego el cursor de cursorFrom(data.next / data.previous). Sin count.
  */
 export async function listAuditLogs({
   action = '',
@@ -17,14 +19,23 @@ export async function listAuditLogs({
   search = '',
   ordering = '-ts',
   page = 1,
-  page_size = 25
+  page_size = 25,
+  cursor = null
 } = {}) {
-  const params = { ordering, page, page_size }
+  const params = cursor === null
+    ? { ordering, page, page_size }
+    : { pagination: 'cursor', page_size, ...(cursor ? { cursor } : {}) }
   if (action) params.action = action
   if (entity) params.entity = entity
   if (user) params.user = user   // id numérico si lo tienes
   if (search) params.search = search
 
   const { data } = await api.get(AUDIT_PATH, { params })
-  return data           // { count, next, previous, results: [...] }
+  return data           // { count, next, previous, results: [...] } (sin count en modo cursor)
+}
+
+/** Extrae el cursor de un enlace next/previous del backend (o null). */
+export function cursorFrom(link) {
+  if (!link) return null
+  return new URL(link, window.location.origin).searchParams.get('cursor')
 }
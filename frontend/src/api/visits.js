@@ -4,6 +4,25 @@ const VISITS_PATH = import.meta.env.VITE_VISITS_PATH || '/api/visits/visits/'
 const SEARCH_PATH = import.meta.env.VITE_VISITS_SEARCH_PATH || '/api/visits/search/'
 const PHOTO_UPLOAD_PATH = import.meta.env.VITE_VISITS_PHOTO_UPLOAD_PATH || '/api/visits/photos/upload/'
 const DASHBOARD_STATS_PATH = '/api/visits/visits/stats/'
+const CITIZENS_PATH = import.meta.env.VITE_CITIZENS_PATH || '/api/visits/citizens/'
+
+// Idempotency-Key: una llave por operación lógica. Si el llamador reintenta
+// (p.ej. tras un error de red) debe reutilizar la misma llave.
+export function newIdempotencyKey() {
+  return crypto.randomUUID()
+}
+
+// 409: la primera petición con esta llave sigue en curso; 429: límite de
+// solicitudes. Ninguno es definitivo: el reintento debe llevar la misma llave.
+const RETRY_SAME_KEY_STATUSES = [409, 429]
+
+// Un 4xx definitivo (validación, permisos...) cierra la operación: el siguiente
+// envío ya es otra y lleva llave nueva. Errores de red, 5xx, 409 y 429 se
+// reintentan con la misma llave.
+export function isFinalClientError(err) {
+  const status = err?.response?.status
+  return status >= 400 && status < 500 && !RETRY_SAME_KEY_STATUSES.includes(status)
+}
 
 export async function searchVisitContext({ dpi = '', phone = '', name = '', topic = '', case_code = '' } = {}) {
   const params = {}
@@ -30,7 +49,8 @@ export async function createVisit({
   target_unit,
   reason = '',
   photo_path = '',
-  reopen_justification = ''
+  reopen_justification = '',
+  idempotencyKey = newIdempotencyKey()
 }) {
   const payload = {
     citizen: {
@@ -46,21 +66,72 @@ export async function createVisit({
     photo_path,
     reopen_justification
   }
-  const { data } = await api.post(VISITS_PATH, payload)
+  const { data } = await api.post(VISITS_PATH, payload, {
+    headers: { 'Idempotency-Key': idempotencyKey }
+  })
   return data // VisitSerializer
 }
 
+/** Check-in grupal: mismos tema/unidad/motivo para todos (POST /visits/bulk/) */
+export async function createVisitsBulk({
+  citizens,   // [{ dpi?, passport?, name, phone?, origin? }, ...]
+  topic_id,
+  target_unit,
+  reason = '',
+  reopen_justification = '',
+  idempotencyKey = newIdempotencyKey()
+}) {
+  const payload = { citizens, topic_id, target_unit, reason, reopen_justification }
+  const { data } = await api.post(`${VISITS_PATH}bulk/`, payload, {
+    headers: { 'Idempotency-Key': idempotencyKey }
+  })
+  return data // { count, results: [VisitSerializer, ...] }
+}
+
+/**
+ * Reenvío de eventos capturados sin conexión (POST /visits/ingest/).
+ * events: [{ event_id, event_type: 'checkin'|'checkout', occurred_at, ... }]
+ * Se envían en bloques; el backend descarta event_id ya recibidos, por lo que
+ * reintentar un bloque completo es seguro.
+ */
+export const INGEST_CHUNK_SIZE = 500
+
+export async function ingestEvents(events, chunkSize = INGEST_CHUNK_SIZE) {
+  const results = []
+  for (let i = 0; i < events.length; i += chunkSize) {
+    const { data } = await api.post(`${VISITS_PATH}ingest/`, { events: events.slice(i, i + chunkSize) })
+    results.push(...(data?.results || []))
+  }
+  return results // [{ event_id, status: 'applied'|'duplicate'|'error', visit_id, badge_code, detail? }]
+}
+
 /** FE-06: checkout por badge_code (PATCH /visits/checkout/) */
-export async function checkoutByBadge(badge_code) {
+export async function checkoutByBadge(badge_code, idempotencyKey = newIdempotencyKey()) {
   const url = `${VISITS_PATH}checkout/`
-  const { data } = await api.patch(url, { badge_code })
+  const { data } = await api.patch(url, { badge_code }, {
+    headers: { 'Idempotency-Key': idempotencyKey }
+  })
   return data // VisitSerializer actualizado (con checkout_at)
 }
 
+/**
+ * Checkout masivo (POST /visits/checkout/bulk/). Usar UNO de:
+ * { ids: [...] } | { badge_codes: [...] } | { before: ISO datetime }
+ */
+export async function checkoutBulk(selector, idempotencyKey = newIdempotencyKey()) {
+  const { data } = await api.post(`${VISITS_PATH}checkout/bulk/`, selector, {
+    headers: { 'Idempotency-Key': idempotencyKey }
+  })
+  return data // { count, results: [{ id, badge_code, case_id }], skipped }
+}
+
+// Campos que usa la tabla de Activos (?fields=: el backend solo consulta esas columnas)
+const ACTIVE_VISIT_FIELDS = 'id,badge_code,checkin_at,target_unit,reason,case.citizen.name'
+
 // FE-NEW: listar visitas activas (sin checkout)
-export async function listActiveVisits() {
+export async function listActiveVisits(fields = ACTIVE_VISIT_FIELDS) {
   const url = `/api/visits/visits/active/`
-  const { data } = await api.get(url)
+  const { data } = await api.get(url, { params: fields ? { fields } : {} })
   return data
 }
 
@@ -68,4 +139,18 @@ export async function listActiveVisits() {
 export async function getDashboardStats() {
   const { data } = await api.get(DASHBOARD_STATS_PATH)
   return data // { activos, entradas_hoy, salidas_hoy }
-}
\ No newline at end of file
+}
+// Listado de visitas con paginación por cursor (keyset): estable en páginas profundas.
+// Primera página: cursor = ''. Siguiente/anterior: cursorFrom(data.next / data.previous) de api/auditlog.
+export async function listVisits({ cursor = '', page_size = 25, ...filters } = {}) {
+  const params = { pagination: 'cursor', page_size, ...filters }
+  if (cursor) params.cursor = cursor
+  const { data } = await api.get(VISITS_PATH, { params })
+  return data // { next, previous, results }
+}
+
+// Autocompletar ciudadanos (índice en memoria del backend): respuesta ligera para cada tecla
+export async function suggestCitizens(q, limit = 8) {
+  const { data } = await api.get(`${CITIZENS_PATH}suggest/`, { params: { q, limit } })
+  return data // [{ id, name, ident }]
+}
@@ -1,7 +1,7 @@
 import React from 'react'
 import {
   Paper, Box, Stack, Typography, TextField, Button, Alert, Divider,
-  Table, TableHead, TableRow, TableCell, TableBody, IconButton, Chip, Tooltip, Pagination
+  Table, TableHead, TableRow, TableCell, TableBody, IconButton, Chip, Tooltip
 } from '@mui/material'
 import SearchIcon from '@mui/icons-material/Search'
 import RestartAltIcon from '@mui/icons-material/RestartAlt'
@@ -10,7 +10,7 @@ import { AdapterDateFns } from '@mui/x-date-pickers/AdapterDateFns'
 import { LocalizationProvider, DatePicker } from '@mui/x-date-pickers'
 import { es } from 'date-fns/locale'
 import { format, startOfDay, endOfDay } from 'date-fns'
-import { listAuditLogs } from '../api/auditlog'
+import { listAuditLogs, cursorFrom } from '../api/auditlog'
 import RequireRole from '../hooks/RequireRole'
 
 export default function AuditLog() {
@@ -33,8 +33,9 @@ function AuditLogScreen() {
 
   // datos
   const [rows, setRows] = React.useState([])
-  const [count, setCount] = React.useState(0)
-  const [page, setPage] = React.useState(1)
+  // Paginación por cursor: la página N cuesta lo mismo que la primera
+  const [cursor, setCursor] = React.useState('')
+  const [links, setLinks] = React.useState({ next: null, previous: null })
   const [pageSize] = React.useState(25)
   const [loading, setLoading] = React.useState(false)
   const [error, setError] = React.useState('')
@@ -46,7 +47,7 @@ function AuditLogScreen() {
       const data = await listAuditLogs({
         action, entity,
         search: userSearch,         // backend: busca en username/ip/entity
-        page, page_size: pageSize,
+        cursor, page_size: pageSize,
         ...opts
       })
       let items = data.results || []
@@ -60,10 +61,10 @@ function AuditLogScreen() {
         })
       }
       setRows(items)
-      setCount(data.count || items.length)
+      setLinks({ next: cursorFrom(data.next), previous: cursorFrom(data.previous) })
     } catch (e) {
       setError('No se pudieron cargar los registros.',e.message)
-      setRows([]); setCount(0)
+      setRows([]); setLinks({ next: null, previous: null })
     } finally {
       setLoading(false)
     }
@@ -72,17 +73,17 @@ function AuditLogScreen() {
   React.useEffect(() => {
     fetchLogs()
     // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [page])
+  }, [cursor])
 
   const onSearch = () => {
-    setPage(1)
-    fetchLogs({ page: 1 })
+    setCursor('')
+    fetchLogs({ cursor: '' })
   }
 
   const onReset = () => {
     setAction(''); setEntity(''); setUserSearch(''); setFrom(null); setTo(null)
-    setPage(1)
-    fetchLogs({ page: 1 })
+    setCursor('')
+    fetchLogs({ cursor: '', action: '', entity: '', search: '' })
   }
 
   return (
@@ -161,13 +162,13 @@ function AuditLogScreen() {
         </Box>
 
         {/* Paginación */}
-        <Stack direction="row" justifyContent="flex-end" mt={2}>
-          <Pagination
-            count={Math.max(1, Math.ceil((count || 0) / pageSize))}
-            page={page}
-            onChange={(_, p) => setPage(p)}
-            size="small"
-          />
+        <Stack direction="row" justifyContent="flex-end" spacing={1} mt={2}>
+          <Button size="small" disabled={loading || !links.previous} onClick={() => setCursor(links.previous)}>
+            Anteriores
+          </Button>
+          <Button size="small" disabled={loading || !links.next} onClick={() => setCursor(links.next)}>
+            Siguientes
+          </Button>
         </Stack>
 
         {/* Modal simple para payload */}
@@ -11,7 +11,7 @@ import { useForm } from 'react-hook-form'
 import { z } from 'zod'
 import { zodResolver } from '@hookform/resolvers/zod'
 import { listActiveTemas } from '../api/temas'
-import { searchVisitContext, uploadPhotoBase64, createVisit } from '../api/visits'
+import { searchVisitContext, uploadPhotoBase64, createVisit, newIdempotencyKey, isFinalClientError } from '../api/visits'
 import RequireRole from '../hooks/RequireRole'
 import { useLocation } from 'react-router-dom'
 
@@ -87,6 +87,8 @@ function CheckinForm() {
     const [cameraReady, setCameraReady] = React.useState(false)
 
     const [lastVisit, setLastVisit] = React.useState(null) // { id, badge_code }
+    // Idempotency-Key del check-in en curso: se conserva entre reintentos
+    const submitKeyRef = React.useRef(null)
 
 
     const [snack, setSnack] = React.useState({ open: false, text: '' })
@@ -374,6 +376,7 @@ function CheckinForm() {
     // ---- Guardar (create visit)
     const onSubmit = async (form) => {
         setErrorMsg(''); setInfoMsg('')
+        if (!submitKeyRef.current) submitKeyRef.current = newIdempotencyKey()
         try {
             // 1) Subir foto si existe dataURL
             let photo_path = ''
@@ -398,8 +401,10 @@ function CheckinForm() {
                 target_unit: form.target_unit,
                 reason: form.reason || '',
                 photo_path,
-                reopen_justification: form.reopen_justification || ''
+                reopen_justification: form.reopen_justification || '',
+                idempotencyKey: submitKeyRef.current
             })
+            submitKeyRef.current = null
 
             // 3) Guardar referencia y feedback
             const badge = visit?.badge_code || 'SIN-COD'
@@ -416,6 +421,7 @@ function CheckinForm() {
 
         } catch (e) {
             console.error('Create visit error:', e?.response?.data)
+            if (isFinalClientError(e)) submitKeyRef.current = null
             setErrorMsg(extractBackendErrors(e))
         }
     }
@@ -428,6 +434,7 @@ function CheckinForm() {
         })
         setPreviewUrl('')
         setInfoMsg(''); setErrorMsg('')
+        submitKeyRef.current = null
         if (videoStream) stopCamera()
     }
 
@@ -7,7 +7,7 @@ import SearchIcon from '@mui/icons-material/Search'
 import { z } from 'zod'
 import { useForm } from 'react-hook-form'
 import { zodResolver } from '@hookform/resolvers/zod'
-import { checkoutByBadge } from '../api/visits'
+import { checkoutByBadge, newIdempotencyKey, isFinalClientError } from '../api/visits'
 import RequireRole from '../hooks/RequireRole'
 
 const schema = z.object({
@@ -47,17 +47,22 @@ function CheckoutForm() {
   const [okMsg, setOkMsg] = React.useState('')
   const [errMsg, setErrMsg] = React.useState('')
   const [visit, setVisit] = React.useState(null)
+  // Idempotency-Key de la salida en curso: { code, key }, se conserva entre reintentos
+  const submitKeyRef = React.useRef(null)
 
   const onSubmit = async (form) => {
     setOkMsg(''); setErrMsg(''); setVisit(null)
+    const code = (form.badge_code || '').trim()
+    if (submitKeyRef.current?.code !== code) submitKeyRef.current = { code, key: newIdempotencyKey() }
     try {
-      const code = (form.badge_code || '').trim()
-      const data = await checkoutByBadge(code)
+      const data = await checkoutByBadge(code, submitKeyRef.current.key)
+      submitKeyRef.current = null
       setVisit(data)
       const when = data?.checkout_at?.replace('T',' ').slice(0,16) || 'ahora'
       setOkMsg(`Salida registrada (${when}).`)
       setValue('badge_code', '')
     } catch (e) {
+      if (isFinalClientError(e)) submitKeyRef.current = null
       const msg = flattenError(e)
       // UX: si ya tenía salida, el backend manda "La visita ya tiene checkout registrado."
       setErrMsg(msg)
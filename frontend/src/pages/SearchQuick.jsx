@@ -11,7 +11,7 @@ import NumbersIcon from '@mui/icons-material/Numbers'
 import BadgeIcon from '@mui/icons-material/Badge'
 import PhoneIphoneIcon from '@mui/icons-material/PhoneIphone'
 import { useNavigate } from 'react-router-dom'
-import { searchVisitContext } from '../api/visits'
+import { searchVisitContext, suggestCitizens } from '../api/visits'
 import RequireRole from '../hooks/RequireRole'
 
 const MODES = [
@@ -37,22 +37,51 @@ function QuickSearchScreen() {
   const [loading, setLoading] = React.useState(false)
   const [error, setError] = React.useState('')
   const [data, setData] = React.useState(null)
+  const [suggestions, setSuggestions] = React.useState([])
+  const skipSuggest = React.useRef(false)
   const navigate = useNavigate()
 
-  const runSearch = async () => {
+  // Sugerencias mientras se escribe (endpoint ligero, no /search/)
+  React.useEffect(() => {
+    const term = q.trim()
+    if (skipSuggest.current) { skipSuggest.current = false; return }
+    if (mode === 'code' || term.length < 2) { setSuggestions([]); return }
+    let cancelled = false
+    const t = setTimeout(async () => {
+      try {
+        const items = await suggestCitizens(term)
+        if (!cancelled) setSuggestions(items)
+      } catch {
+        if (!cancelled) setSuggestions([])
+      }
+    }, 150)
+    return () => { cancelled = true; clearTimeout(t) }
+  }, [q, mode])
+
+  const pickSuggestion = (s) => {
+    const byDpi = /^[0-9]+$/.test(s.ident || '')
+    const nextMode = byDpi ? 'dpi' : 'name'
+    const value = byDpi ? s.ident : s.name
+    skipSuggest.current = true
+    setMode(nextMode); setQ(value); setSuggestions([])
+    runSearch(nextMode, value)
+  }
+
+  const runSearch = async (searchMode = mode, value = q) => {
     setError(''); setLoading(true); setData(null)
+    const term = value.trim()
     try {
       const params = { dpi: '', phone: '', name: '', case_code: '', topic: '' }
-      if (mode === 'dpi') params.dpi = q.trim()
-      if (mode === 'phone') params.phone = q.trim()
-      if (mode === 'name') params.name = q.trim()
-      if (mode === 'code') {
+      if (searchMode === 'dpi') params.dpi = term
+      if (searchMode === 'phone') params.phone = term
+      if (searchMode === 'name') params.name = term
+      if (searchMode === 'code') {
         // Acepta CASE-..., VIS-..., TRAM-... o id numérico
         // Para reutilizar el backend:
         // - case_code (CASE-XXX) va en case_code
         // - topic acepta id, code o name → lo pasamos en topic si no parece CASE
-        if (/^CASE-/i.test(q.trim())) params.case_code = q.trim()
-        else params.topic = q.trim()
+        if (/^CASE-/i.test(term)) params.case_code = term
+        else params.topic = term
       }
       const res = await searchVisitContext(params)
       setData(res)
@@ -66,6 +95,7 @@ function QuickSearchScreen() {
   const onSubmit = (e) => {
     e.preventDefault()
     if (!q.trim()) return
+    setSuggestions([])
     runSearch()
   }
 
@@ -104,14 +134,14 @@ function QuickSearchScreen() {
     </Card>
   )
 
-  const CaseCard = ({ caseObj, last_visit }) => (
+  const CaseCard = ({ caseObj, citizen, last_visit }) => (
     <Card variant="outlined">
       <CardContent>
         <Typography variant="subtitle1" gutterBottom>
           Expediente: {caseObj.code_persistente}
         </Typography>
         <Stack direction="row" spacing={1} flexWrap="wrap">
-          <Chip size="small" label={`Ciudadano: ${caseObj.citizen?.name || '—'}`} />
+          <Chip size="small" label={`Ciudadano: ${citizen?.name || '—'}`} />
           <Chip size="small" label={`Tema: ${caseObj.topic?.name || '—'}`} />
           <Chip size="small" label={`Estado: ${caseObj.state}`} />
           {last_visit?.badge_code && <Chip size="small" label={`Últ. VIS: ${last_visit.badge_code}`} />}
@@ -122,11 +152,11 @@ function QuickSearchScreen() {
           size="small"
           startIcon={<LaunchIcon />}
           onClick={() => toCheckin({
-            dpi: caseObj.citizen?.dpi,
-            name: caseObj.citizen?.name,
-            phone: caseObj.citizen?.phone,
-            origin: caseObj.citizen?.origin,
-            topic_id: caseObj.topic
+            dpi: citizen?.dpi,
+            name: citizen?.name,
+            phone: citizen?.phone,
+            origin: citizen?.origin,
+            topic_id: caseObj.topic_id
           })}
         >
           Nueva visita
@@ -169,6 +199,21 @@ function QuickSearchScreen() {
         </Stack>
       </form>
 
+      {suggestions.length > 0 && (
+        <Stack direction="row" spacing={1} mt={1} flexWrap="wrap">
+          {suggestions.map(s => (
+            <Chip
+              key={s.id}
+              size="small"
+              variant="outlined"
+              label={s.ident ? `${s.name} · ${s.ident}` : s.name}
+              onClick={() => pickSuggestion(s)}
+              clickable
+            />
+          ))}
+        </Stack>
+      )}
+
       <Stack direction="row" spacing={1} mt={1} mb={2} flexWrap="wrap">
         {MODES.map(m => (
           <Chip
@@ -200,7 +245,7 @@ function QuickSearchScreen() {
             {/* Caso principal */}
             {data.case && (
               <Grid item xs={12} md={6}>
-                <CaseCard caseObj={data.case} last_visit={data.last_visit} />
+                <CaseCard caseObj={data.case} citizen={data.citizen} last_visit={data.last_visit} />
               </Grid>
             )}
           </Grid>